@@ -1,10 +1,19 @@
+import argparse
+import json
 import pandas as pd
 import os
+import time
 import glob # Used for finding files matching a pattern
 import re # Import regex module
+import sqlite3
 import logging # Using logging for clearer output
 from itertools import product # To generate all combinations
 import numpy as np # Needed for np.nan if used for Notes/Email
+from lead_schema import (REVIEW_AGE_COLUMN, SCRAPED_AT_COLUMN, add_address_columns, as_str, concat_leads, in_countries, lower_text,
+                         memory_usage_mb, not_equal_ci, read_leads_excel, review_age_days, state_codes, title_text,
+                         to_rating, to_review_count)
+from fuzzy_dedup import drop_fuzzy_duplicates
+from pipeline_profile import PipelineProfiler, add_profile_args, run_profiled
 
 # =================== CONFIGURATION (Combined) =================== #
 
@@ -37,15 +46,41 @@ SOURCE_FILE_COLUMN = "Source File" # This is the column name for the source
 FINAL_DEDUPLICATION_COLUMN = "Phone Number"
 OUTPUT_FILENAME = "test.xlsx"
 ZIP_CHECK_LENGTH = 30
+# After the exact phone dedup, also drop near-duplicates (same zip, similar name/street, other phone);
+# opt-in with --fuzzy_dedup, as it removes leads from the delivery
+FUZZY_DEDUPLICATION = os.environ.get("FINDLEADS_FUZZY_DEDUP", "0") == "1"
+
+# --- Email Enrichment ---
+# Crawl each lead's Website (home + contact pages) to fill the Email column; results are cached per site
+ENRICH_EMAILS = os.environ.get("FINDLEADS_ENRICH_EMAILS", "0") == "1"
+EMAIL_CACHE_FILE = os.path.join(OUTPUT_FOLDER_NAME, "email_cache.json")
+
+# --- Delivery Ledger ---
+# Leads already sent per customer and zip (SQLite). With --customer every delivery is recorded;
+# --delta additionally limits the output to leads that are new or changed since the last delivery.
+LEDGER_FILE = os.path.join(OUTPUT_FOLDER_NAME, "delivery_ledger.sqlite3")
+DELIVERY_CUSTOMER = None
+DELTA_MODE = False
+
+# --- Profiling ---
+# Per-stage time/rows/memory, enabled with --profile
+profiler = PipelineProfiler("findleads")
 # Example zip codes - replace with your actual list or reading from a file if preferred
 zip_codes_input = "28006, 28012, 28025, 28027, 28031, 28032, 28034, 28036, 28052, 28054, 28056, 28075, 28078, 28079, 28081, 28083, 28097, 28098, 28101, 28104, 28105, 28107, 28108, 28110, 28112, 28120, 28134, 28163, 28164, 28173, 28174, 28202, 28203, 28204, 28205, 28206, 28207, 28208, 28209, 28210, 28211, 28212, 28213, 28214, 28215, 28216, 28217, 28223, 28226, 28227, 28244, 28262, 28269, 28270, 28273, 28274, 28277, 28278, 28280, 28282, 29704, 29707, 29708, 29710, 29715, 29730, 29732, 29733"
 
+def build_zip_pattern(codes):
+    return '|'.join([r'\b' + re.escape(code) + r'\b' for code in codes]) if codes else ''
+
 zip_codes = [zip_code.strip() for zip_code in zip_codes_input.split(',') if zip_code.strip()]
-zip_pattern = '|'.join([r'\b' + re.escape(code) + r'\b' for code in zip_codes]) if zip_codes else ''
+zip_pattern = build_zip_pattern(zip_codes)
 
 # --- Filters/Formatting ---
 US_Filter = ["United States"]
-State_Filter=['WA']
+# Two-letter state codes to keep (empty = all states); rewritten per job by findleadsProcessor
+State_Filter = []
+STATE_CODES = state_codes(State_Filter)  # 'Washington' / 'wa' -> 'WA', as stored in the State column
+# Drop leads whose latest review is older than this many days; None = no recency filter
+MAX_REVIEW_AGE_DAYS = None
 unwanted_value_filters = {
     "# of Reviews": 'No reviews', "Rating": 'No ratings', "Latest Review": 'No review date',
     "Latest Review Date": 'No review date', "Phone Number": 'No phone number', "Business Address": 'No address'
@@ -63,7 +98,14 @@ column_widths = {
     "Business Address": 50,
     "Phone Number": 15,
     "Notes": 20,  # Added width for Notes
-    "Email": 25   # Added width for Email
+    "Email": 25,  # Added width for Email
+    "Street": 30,
+    "City": 18,
+    "State": 8,
+    "Zip": 8,
+    "Country": 15,
+    SCRAPED_AT_COLUMN: 22,
+    REVIEW_AGE_COLUMN: 12
 }
 
 # =================== HELPER FUNCTIONS =================== #
@@ -124,8 +166,8 @@ def clean_and_filter_dataframe(df, filename="Unknown"):
     str_cols_to_lower = ["Type of Business", "Sub-Category"]
     for col in str_cols_to_lower:
         if col in df.columns:
-            # Handle potential non-string data gracefully before lowercasing
-            df[col] = df[col].astype(str).str.lower()
+            # Handle potential non-string data gracefully before lowercasing (per category, not per row)
+            df[col] = lower_text(as_str(df[col]))
         else:
              logging.debug(f"File: {filename} - Column '{col}' not found for lowercasing.")
 
@@ -135,8 +177,8 @@ def clean_and_filter_dataframe(df, filename="Unknown"):
     for col, value in unwanted_value_filters.items():
         if col in df.columns:
             if isinstance(value, str):
-                # Convert column to string and lowercase for comparison
-                df = df[df[col].astype(str).str.lower() != value.lower()]
+                # Case-insensitive string comparison (evaluated per category on categorical columns)
+                df = df[not_equal_ci(df[col], value)]
             else:
                 df = df[df[col] != value]
     filtered_placeholder_count = count_before_placeholder_filter - len(df)
@@ -145,12 +187,14 @@ def clean_and_filter_dataframe(df, filename="Unknown"):
 
     # --- Clean Numeric/Date Columns ---
     if "# of Reviews" in df.columns:
-        df["# of Reviews"] = df["# of Reviews"].astype(str).str.replace(',', '', regex=False)
-        df["# of Reviews"] = pd.to_numeric(df["# of Reviews"], errors='coerce').fillna(0).astype(int)
+        df["# of Reviews"] = to_review_count(df["# of Reviews"])
+
+    if "Rating" in df.columns:
+        df["Rating"] = to_rating(df["Rating"])
 
     if "Latest Review" in df.columns:
         # Ensure it's string type before using .str methods
-        df["Latest Review"] = df["Latest Review"].astype(str)
+        df["Latest Review"] = as_str(df["Latest Review"])
         df["Latest Review"] = df["Latest Review"].str.replace(r'on\s*\n*Google', '', regex=True).str.strip()
         count_before_ago_filter = len(df)
         # Filter rows that contain 'ago', handling NaN values
@@ -162,6 +206,14 @@ def clean_and_filter_dataframe(df, filename="Unknown"):
         # Fillna with the original value for rows that already matched the pattern or didn't contain 'ago' but passed the filter (shouldn't happen with na=False)
         df["Latest Review"] = df["Latest Review"].str.extract(r'^(.*?\bago\b)', expand=False).fillna(df["Latest Review"])
         df["Latest Review"] = df["Latest Review"].str.strip()
+        # Recomputed on every run: ages in archived files are anchored to their Scraped At, not to today
+        df[REVIEW_AGE_COLUMN] = review_age_days(df["Latest Review"], df.get(SCRAPED_AT_COLUMN))
+        if MAX_REVIEW_AGE_DAYS is not None:
+            count_before_age_filter = len(df)
+            df = df[df[REVIEW_AGE_COLUMN].le(MAX_REVIEW_AGE_DAYS).fillna(False).astype(bool)]
+            filtered_age_count = count_before_age_filter - len(df)
+            if filtered_age_count > 0:
+                logging.debug(f"File: {filename} - Removed {filtered_age_count} rows with reviews older than {MAX_REVIEW_AGE_DAYS} days.")
 
 
     # --- Business Type Filtering (using lowercase column) ---
@@ -180,28 +232,24 @@ def clean_and_filter_dataframe(df, filename="Unknown"):
     # --- Other Filters ---
     if "Business Address" in df.columns:
         count_before_addr_filter = len(df)
-        df = df[df["Business Address"].astype(str).str.contains(",", na=False)]
+        df = df[as_str(df["Business Address"]).str.contains(",", na=False)]
         filtered_addr_count = count_before_addr_filter - len(df)
         if filtered_addr_count > 0:
              logging.debug(f"File: {filename} - Removed {filtered_addr_count} rows with address missing comma.")
+        # Street/city/state/zip/country parsed once (older archive files do not carry them yet)
+        df = add_address_columns(df)
         count_before_us_filter = len(df)
-        # Ensure ADDRESS_COLUMN exists before filtering
-        if ADDRESS_COLUMN in df.columns:
-            df = df[df[ADDRESS_COLUMN].astype(str).str.contains('|'.join(US_Filter), case=True, na=False)]
-            filtered_us_count = count_before_us_filter - len(df)
-            if filtered_us_count > 0:
-                logging.debug(f"File: {filename} - Removed {filtered_us_count} rows not matching US filter.")
-        else:
-            logging.debug(f"File: {filename} - Column '{ADDRESS_COLUMN}' not found for US filter.")
-            
-        # if ADDRESS_COLUMN in df.columns:
-        #     df = df[df[ADDRESS_COLUMN].astype(str).str.contains('|'.join(State_Filter), case=True, na=False)]
-        #     filtered_us_count = count_before_us_filter - len(df)
-        #     print('DoneXYZ')
-        #     if filtered_us_count > 0:
-        #         logging.debug(f"File: {filename} - Removed {filtered_us_count} rows not matching State filter.")
-        # else:
-        #     logging.debug(f"File: {filename} - Column '{ADDRESS_COLUMN}' not found for State filter.")
+        df = df[in_countries(df, US_Filter)]
+        filtered_us_count = count_before_us_filter - len(df)
+        if filtered_us_count > 0:
+            logging.debug(f"File: {filename} - Removed {filtered_us_count} rows not matching US filter.")
+
+        if STATE_CODES:
+            count_before_state_filter = len(df)
+            df = df[df["State"].isin(STATE_CODES)]
+            filtered_state_count = count_before_state_filter - len(df)
+            if filtered_state_count > 0:
+                logging.debug(f"File: {filename} - Removed {filtered_state_count} rows not matching State filter.")
 
 
     if "# of Reviews" in df.columns:
@@ -218,13 +266,37 @@ def clean_and_filter_dataframe(df, filename="Unknown"):
         if col in df.columns:
             # Fill NA *before* title casing to avoid errors, then replace NaT/NaN if needed
             # Ensure column is string type before applying .str.title()
-            df[col] = df[col].fillna('').astype(str).str.title()
+            df[col] = title_text(df[col])
 
 
     final_count = len(df)
     logging.debug(f"File: {filename} - Finished cleaning/filtering. Kept {final_count} out of {initial_count} rows.")
     return df
 
+def read_and_clean(file_path, filename):
+    """Reads one archive workbook with the lead schema and runs clean_and_filter_dataframe on it."""
+    # Lead schema: usecols, categoricals for repetitive fields, Arrow-backed strings for free text
+    with profiler.stage("read") as stage:
+        df = read_leads_excel(file_path)
+        stage["rows_out"] = len(df)
+    logging.info(f"  Read {len(df)} rows ({memory_usage_mb(df)} MB).")
+    with profiler.stage("clean", len(df)) as stage:
+        df_cleaned = clean_and_filter_dataframe(df, filename)
+        stage["rows_out"] = len(df_cleaned)
+    return df_cleaned
+
+def select_job_rows(df):
+    """
+    Rows of a shared-scan frame (cleaned with every batched job's business types and states) that this job's
+    own business type and state filters keep; the same rows clean_and_filter_dataframe would have kept for it.
+    """
+    if "Type of Business" in df.columns and TARGET_BUSINESS_TYPES_SET:
+        # The column is Title Cased by now; the targets are lowercase like the column was during cleaning
+        df = df[lower_text(df["Type of Business"]).isin(TARGET_BUSINESS_TYPES_SET)]
+    if STATE_CODES and "State" in df.columns:
+        df = df[df["State"].isin(STATE_CODES)]
+    return df
+
 def get_sort_group(row):
     """
     Assigns a group ID for sorting based on Title Cased 'Type of Business'.
@@ -244,7 +316,12 @@ def get_sort_group(row):
 
 # =================== MAIN SCRIPT LOGIC =================== #
 
-def find_leads_by_zip():
+def find_leads_by_zip(shared_scan=None):
+    """
+    Collects, deduplicates and writes the leads for the configured zips and business types. With
+    shared_scan (file path -> frame already cleaned for a whole batch, see run_batch) the archive is not
+    read again. Returns the number of leads in the output, or None when the run could not start.
+    """
     target_zip_codes_set = set(zip_codes) # Use set for efficient lookup
     if not target_zip_codes_set:
         logging.error("No zip codes defined. Exiting.")
@@ -299,15 +376,15 @@ def find_leads_by_zip():
             logging.info(f"Processing [{file_type_label}]: {filename}")
 
             try:
-                # Define potential string columns to avoid dtype guessing issues
-                potential_str_cols = [
-                    ADDRESS_COLUMN, "Phone Number", "Type of Business", "Sub-Category",
-                    "Name of Business", "Website", "Latest Review", "# of Reviews", "Rating"
-                ]
-                dtype_spec = {col: str for col in potential_str_cols}
-                df = pd.read_excel(file_path, engine='openpyxl', dtype=dtype_spec)
-                logging.info(f"  Read {len(df)} rows.")
-                df_cleaned = clean_and_filter_dataframe(df.copy(), filename)
+                scanned = shared_scan.get(file_path) if shared_scan is not None else None
+                if isinstance(scanned, Exception):
+                    raise scanned
+                if scanned is not None:
+                    # Read and cleaned once for the whole batch; keep this job's business types and states
+                    df_cleaned = select_job_rows(scanned)
+                    logging.info(f"  {len(df_cleaned)} of {len(scanned)} cleaned rows from the shared scan.")
+                else:
+                    df_cleaned = read_and_clean(file_path, filename)
 
                 if df_cleaned.empty:
                     logging.info(f"  * No leads after cleaning/filtering.")
@@ -323,19 +400,21 @@ def find_leads_by_zip():
                     zip_filtered_df = df_cleaned # Keep all cleaned if address missing, but log warning
                 else:
                     logging.info(f"  Filtering {len(df_cleaned)} cleaned rows by zip code...")
-                    address_str_series = df_cleaned[ADDRESS_COLUMN].astype(str).fillna('')
-                    # Apply zip check only to the end of the string if it's long enough
-                    check_series = address_str_series.apply(lambda x: x[-ZIP_CHECK_LENGTH:] if len(x) >= ZIP_CHECK_LENGTH else x)
-                    mask = check_series.str.contains(zip_pattern, case=False, na=False, regex=True)
-                    zip_filtered_df = df_cleaned[mask].copy() # Use .copy() to avoid SettingWithCopyWarning
+                    with profiler.stage("zip_match", len(df_cleaned)) as stage:
+                        address_str_series = as_str(df_cleaned[ADDRESS_COLUMN]).fillna('')
+                        # Apply zip check only to the end of the string if it's long enough
+                        check_series = address_str_series.apply(lambda x: x[-ZIP_CHECK_LENGTH:] if len(x) >= ZIP_CHECK_LENGTH else x)
+                        mask = check_series.str.contains(zip_pattern, case=False, na=False, regex=True)
+                        zip_filtered_df = df_cleaned[mask].copy() # Use .copy() to avoid SettingWithCopyWarning
+                        stage["rows_out"] = len(zip_filtered_df)
                     logging.info(f"  Found {len(zip_filtered_df)} rows matching zip criteria.")
 
                 if not zip_filtered_df.empty:
                     found_count = len(zip_filtered_df)
                     # Assign source name based on whether it's a default file or not
                     source_name = SCRAPED_NEW_SOURCE_NAME if is_default_file else filename
-                    # Use .loc to assign the source file name safely
-                    zip_filtered_df.loc[:, SOURCE_FILE_COLUMN] = source_name
+                    # One category per source keeps this column at a byte per row
+                    zip_filtered_df[SOURCE_FILE_COLUMN] = pd.Categorical([source_name] * found_count)
 
                     if is_default_file:
                         default_file_leads.append(zip_filtered_df)
@@ -363,18 +442,21 @@ def find_leads_by_zip():
                  logging.warning(f"Source column '{SOURCE_FILE_COLUMN}' missing in a partial DataFrame before concat.")
                  # Add it with a placeholder if needed
                  df_part[SOURCE_FILE_COLUMN] = "Unknown Source During Concat"
-         final_df = pd.concat(all_dfs_to_concat, ignore_index=True)
-         logging.info(f"Total combined leads before deduplication: {len(final_df)}")
+         with profiler.stage("combine", total_leads_found_list + total_leads_found_default) as stage:
+             final_df = concat_leads(all_dfs_to_concat)
+             stage["rows_out"] = len(final_df)
+         logging.info(f"Total combined leads before deduplication: {len(final_df)} ({memory_usage_mb(final_df)} MB)")
     else:
          logging.warning("No leads found matching criteria in any processed file.")
 
 
     # --- Prioritized Deduplication ---
+    profiler.begin("dedup", len(final_df))
     if FINAL_DEDUPLICATION_COLUMN in final_df.columns and not final_df.empty:
         logging.info(f"Performing prioritized deduplication on '{FINAL_DEDUPLICATION_COLUMN}'...")
         initial_count = len(final_df)
         # Ensure the deduplication column is string and stripped
-        final_df[FINAL_DEDUPLICATION_COLUMN] = final_df[FINAL_DEDUPLICATION_COLUMN].astype(str).str.strip()
+        final_df[FINAL_DEDUPLICATION_COLUMN] = as_str(final_df[FINAL_DEDUPLICATION_COLUMN]).str.strip()
         # Drop rows where the deduplication key is missing or empty AFTER stripping
         final_df = final_df.dropna(subset=[FINAL_DEDUPLICATION_COLUMN])
         final_df = final_df[final_df[FINAL_DEDUPLICATION_COLUMN] != '']
@@ -389,7 +471,7 @@ def find_leads_by_zip():
                   final_df = final_df.drop_duplicates(subset=[FINAL_DEDUPLICATION_COLUMN], keep='first')
              else:
                  # Prioritize non-"Scraped New" sources (priority 0) over "Scraped New" (priority 1)
-                 final_df['_source_priority'] = final_df[SOURCE_FILE_COLUMN].apply(lambda x: 0 if x != SCRAPED_NEW_SOURCE_NAME else 1)
+                 final_df['_source_priority'] = np.where(final_df[SOURCE_FILE_COLUMN] == SCRAPED_NEW_SOURCE_NAME, 1, 0)
                  # Sort by the deduplication key, then by priority (lower priority number kept)
                  final_df = final_df.sort_values(by=[FINAL_DEDUPLICATION_COLUMN, '_source_priority'], ascending=[True, True])
                  # Keep the first occurrence after sorting (which will be the highest priority source)
@@ -404,8 +486,22 @@ def find_leads_by_zip():
     elif not final_df.empty:
         logging.warning(f"Deduplication column '{FINAL_DEDUPLICATION_COLUMN}' not found. Skipping prioritized deduplication.")
 
+    if FUZZY_DEDUPLICATION and not final_df.empty:
+        # Same priority rule: the archived copy of a business wins over a "Scraped New" one
+        if SOURCE_FILE_COLUMN in final_df.columns:
+            priority = np.where(final_df[SOURCE_FILE_COLUMN] == SCRAPED_NEW_SOURCE_NAME, 1, 0)
+            final_df = final_df.iloc[np.argsort(priority, kind='stable')]
+        final_df, fuzzy_stats = drop_fuzzy_duplicates(final_df)
+        profiler.step("fuzzy_dedup", len(final_df))
+        if fuzzy_stats["duplicates"] > 0:
+            logging.info(f"  Removed {fuzzy_stats['duplicates']} near-duplicate leads (same zip, similar name/address; "
+                         f"{fuzzy_stats['comparisons']} candidate comparisons).")
+
+
+    profiler.end(len(final_df))
 
     # --- Check for Missing Zip Codes (Overall) ---
+    profiler.begin("missing_zip_check", len(final_df))
     logging.info("--- Checking for Target Zip Codes With No Leads (Any Business Type) ---")
     found_zips_in_final_df = set()
     if ADDRESS_COLUMN in final_df.columns and not final_df.empty and zip_pattern:
@@ -442,10 +538,12 @@ def find_leads_by_zip():
         elif found_zips_in_final_df: # Only log success if zips were actually found
             logging.info("  All target zip codes have at least one lead (of some business type).")
     logging.info("--- End Overall Zip Code Check ---")
+    profiler.end(len(final_df))
 
 
     # --- Check for Missing Business Type / Zip Code COMBINATIONS & Generate Queries (Consolidated RV Group) ---
     logging.info("--- Checking for Missing Business Type/Zip Code Combinations (Consolidated RV Group) & Generating Queries ---")
+    profiler.begin("missing_combinations", len(final_df))
     missing_queries = []
     if TARGET_BUSINESS_TYPES_BASE_LIST and target_zip_codes_set and zip_pattern:
         # Separate base list into 'other' types and the consolidated RV group representative
@@ -552,9 +650,11 @@ def find_leads_by_zip():
         if not zip_pattern: log_reasons.append("zip pattern could not be generated")
         logging.info(f"  Skipping check for missing combinations ({', '.join(log_reasons)}).")
     logging.info("--- End Missing Combination Check ---")
+    profiler.end(len(final_df))
 
 
     # --- Final Sorting ---
+    profiler.begin("sort", len(final_df))
     if not final_df.empty:
         # Ensure 'Type of Business' exists and is Title Case before sorting
         if "Type of Business" not in final_df.columns:
@@ -588,7 +688,22 @@ def find_leads_by_zip():
         logging.info("Sorting complete.")
     else:
         logging.info("Skipping final sorting as DataFrame is empty.")
-
+    profiler.end(len(final_df))
+
+
+    # --- Delta Against Earlier Deliveries ---
+    ledger = None
+    delta_stats = None
+    if DELIVERY_CUSTOMER:
+        # Imported here so the ledger is only opened for customer deliveries
+        from delivery_ledger import DeliveryLedger
+        ledger = DeliveryLedger(os.path.join(current_directory, LEDGER_FILE))
+        if DELTA_MODE and not final_df.empty:
+            with profiler.stage("delta", len(final_df)) as stage:
+                final_df, delta_stats = ledger.delta(final_df, DELIVERY_CUSTOMER)
+                stage["rows_out"] = len(final_df)
+            logging.info(f"Delta for '{DELIVERY_CUSTOMER}': {delta_stats['new']} new, {delta_stats['changed']} changed, "
+                         f"{delta_stats['already_delivered']} already delivered leads left out.")
 
     # --- Save Final Result (Excel) ---
     if not final_df.empty:
@@ -601,6 +716,15 @@ def find_leads_by_zip():
         if 'Email' not in final_df.columns:
             final_df['Email'] = ""  # Add as empty string
             logging.info("Added empty 'Email' column to the final DataFrame.")
+        if ENRICH_EMAILS:
+            # Imported here so aiohttp is only needed when enrichment is switched on
+            from email_enricher import EmailCache, EmailEnricher, enrich_dataframe
+            logging.info("Enriching 'Email' from the 'Website' column...")
+            with profiler.stage("enrich_emails", len(final_df)) as stage:
+                enricher = EmailEnricher(EmailCache(EMAIL_CACHE_FILE))
+                filled_emails = enrich_dataframe(final_df, enricher)
+                stage["rows_out"] = filled_emails
+            logging.info(f"Filled {filled_emails} emails ({enricher.stats}).")
 
         # --- Define Final Column Order ---
         # Use the user-requested column order
@@ -637,6 +761,8 @@ def find_leads_by_zip():
         final_df_to_save = final_df[final_output_columns]
 
         logging.info(f"Saving final DataFrame with columns: {', '.join(final_output_columns)} to '{output_file_path}'...")
+        profiler.begin("write", len(final_df_to_save))
+        saved = False
         try:
             with pd.ExcelWriter(output_file_path, engine='xlsxwriter') as writer:
                 final_df_to_save.to_excel(writer, index=False, sheet_name='Combined Leads')
@@ -648,16 +774,160 @@ def find_leads_by_zip():
                      width = column_widths.get(col_name, 15)
                      worksheet.set_column(i, i, width)
             logging.info(f"Successfully saved leads to '{output_file_path}'! ✅")
+            saved = True
         except PermissionError:
             logging.error(f"Could not save '{output_file_path}'. Permission denied. Check if the file is open or if you have write access to the folder.")
         except KeyError as ke:
              logging.error(f"Column error during final save preparation: {ke}. Ensure all columns in 'output_columns_order' are handled correctly.")
         except Exception as e:
             logging.exception(f"Error saving final Excel file to '{output_file_path}': {e}")
+        profiler.end(len(final_df_to_save))
+        if saved and ledger is not None:
+            try:
+                delivery_id = ledger.record(final_df_to_save, DELIVERY_CUSTOMER, output_file_path, delta_stats)
+                logging.info(f"Recorded delivery {delivery_id} of {len(final_df_to_save)} leads for '{DELIVERY_CUSTOMER}'.")
+            except sqlite3.Error as e:
+                logging.error(f"Saved '{output_file_path}', but could not record the delivery for '{DELIVERY_CUSTOMER}' "
+                              f"in the ledger: {e}")
     else:
         logging.warning(f"Final DataFrame empty. Nothing to save to '{output_file_path}'.")
+    if ledger is not None:
+        ledger.close()
+    return len(final_df)
+
+# =================== BATCH MODE =================== #
+
+def job_queries_filename(job_id):
+    """queriesToSearch_<jobId>.txt: batched jobs share Outputs/, so each writes its own queries file."""
+    stem, ext = os.path.splitext(QUERIES_FILENAME)
+    return f"{stem}_{re.sub(r'[^A-Za-z0-9_.-]', '_', str(job_id))}{ext}"
+
+def job_settings(job, job_id=None):
+    """
+    Module settings for one queued find-leads job (its job.data: businessTypes, zipCodes, states,
+    outputFile, clientName, delta), with this file's values where the job leaves one out, like
+    findleadsProcessor's rewrite of this file. With job_id the missing-combination queries go to the
+    job's own file.
+    """
+    business_types = job.get("businessTypes") or []
+    types_set, base_list = generate_target_business_types(
+        ", ".join(business_types) if business_types else TARGET_BUSINESS_TYPES_INPUT)
+    codes = [str(code).strip() for code in job.get("zipCodes") or [] if str(code).strip()] or list(zip_codes)
+    customer = job.get("clientName") or None
+    return {
+        "TARGET_BUSINESS_TYPES_SET": types_set,
+        "TARGET_BUSINESS_TYPES_BASE_LIST": base_list,
+        "zip_codes": codes,
+        "zip_pattern": build_zip_pattern(codes),
+        "STATE_CODES": state_codes(job.get("states") or []),
+        "OUTPUT_FILENAME": os.path.basename(job.get("outputFile") or OUTPUT_FILENAME),
+        "QUERIES_FILENAME": job_queries_filename(job_id) if job_id is not None else QUERIES_FILENAME,
+        "DELIVERY_CUSTOMER": customer,
+        "DELTA_MODE": bool(job.get("delta")) and bool(customer),
+    }
+
+def apply_settings(settings):
+    global TARGET_BUSINESS_TYPES_SET, TARGET_BUSINESS_TYPES_BASE_LIST, zip_codes, zip_pattern, STATE_CODES
+    global OUTPUT_FILENAME, QUERIES_FILENAME, DELIVERY_CUSTOMER, DELTA_MODE
+    TARGET_BUSINESS_TYPES_SET = settings["TARGET_BUSINESS_TYPES_SET"]
+    TARGET_BUSINESS_TYPES_BASE_LIST = settings["TARGET_BUSINESS_TYPES_BASE_LIST"]
+    zip_codes = settings["zip_codes"]
+    zip_pattern = settings["zip_pattern"]
+    STATE_CODES = settings["STATE_CODES"]
+    OUTPUT_FILENAME = settings["OUTPUT_FILENAME"]
+    QUERIES_FILENAME = settings["QUERIES_FILENAME"]
+    DELIVERY_CUSTOMER = settings["DELIVERY_CUSTOMER"]
+    DELTA_MODE = settings["DELTA_MODE"]
+
+def scan_archive(skip_filenames=()):
+    """file path -> cleaned frame (or the exception reading it raised) for every workbook in Files/."""
+    input_folder_path = os.path.join(os.getcwd(), INPUT_FOLDER_NAME)
+    scanned = {}
+    for file_path in glob.glob(os.path.join(input_folder_path, '*.xlsx')):
+        filename = os.path.basename(file_path)
+        if filename.lower() in skip_filenames:
+            continue
+        logging.info(f"Scanning [Shared]: {filename}")
+        try:
+            scanned[file_path] = read_and_clean(file_path, filename)
+        except Exception as e:
+            scanned[file_path] = e
+    return scanned
+
+def run_batch(jobs):
+    """
+    Runs several find-leads jobs over one archive scan. Every workbook is read and cleaned once, keeping
+    the union of the jobs' business types and states (cleaning is row by row, so a wider filter followed
+    by each job's own selection keeps the same rows). Each job then selects its rows and runs zip
+    matching, dedup, the missing-zip checks, sorting, delta and the write as a single run would.
+    Returns job id -> {"status", "leads", "outputFile", "queriesFile", "error"}; queriesFile is the job's
+    own queries file (see job_queries_filename), None when the job found every combination.
+    """
+    job_ids = [str(job.get("jobId") or index) for index, job in enumerate(jobs)]
+    settings = [job_settings(job, job_id) for job, job_id in zip(jobs, job_ids)]
+    shared = dict(settings[0])
+    # One job without a type/state filter means the scan cannot filter on it either
+    type_sets = [s["TARGET_BUSINESS_TYPES_SET"] for s in settings]
+    shared["TARGET_BUSINESS_TYPES_SET"] = set().union(*type_sets) if all(type_sets) else set()
+    state_sets = [s["STATE_CODES"] for s in settings]
+    shared["STATE_CODES"] = sorted(set().union(*state_sets)) if all(state_sets) else []
+    apply_settings(shared)
+    logging.info(f"Batch of {len(jobs)} find-leads jobs: scanning '{INPUT_FOLDER_NAME}' once.")
+    shared_scan = scan_archive({s["OUTPUT_FILENAME"].lower() for s in settings})
+
+    results = {}
+    for index, (job, job_id, job_config) in enumerate(zip(jobs, job_ids, settings)):
+        apply_settings(job_config)
+        logging.info(f"=== Batch job {index + 1}/{len(jobs)}: {job_id} -> {OUTPUT_FILENAME} ===")
+        queries_file_path = os.path.join(os.getcwd(), OUTPUT_FOLDER_NAME, QUERIES_FILENAME)
+        started = time.time()
+        try:
+            saved = find_leads_by_zip(shared_scan)
+        except Exception as e:
+            logging.exception(f"Batch job {job_id} failed: {e}")
+            results[job_id] = {"status": "failed", "leads": 0, "outputFile": job.get("outputFile"),
+                               "queriesFile": None, "error": str(e)}
+            continue
+        # find_leads_by_zip leaves the file alone when nothing is missing; an older one is not this run's
+        wrote_queries = os.path.exists(queries_file_path) and os.path.getmtime(queries_file_path) >= started
+        results[job_id] = {"status": "failed" if saved is None else "completed", "leads": saved or 0,
+                           "outputFile": job.get("outputFile"),
+                           "queriesFile": queries_file_path if wrote_queries else None,
+                           "error": "find-leads could not start (see log)" if saved is None else None}
+    return results
 
 # =================== RUN SCRIPT =================== #
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Collect leads for the target zip codes from the Files/ archive.")
+    parser.add_argument("--customer", default=None, help="Record this delivery in the ledger under this customer")
+    parser.add_argument("--delta", action="store_true",
+                        help="Only output leads that are new or changed since the customer's last delivery")
+    parser.add_argument("--fuzzy_dedup", action="store_true",
+                        help="After the exact phone number dedup, also drop near-duplicate name/address leads")
+    parser.add_argument("--batch", default=None,
+                        help="JSON list of find-leads job data to run over one shared archive scan")
+    parser.add_argument("--batch_results", default=None,
+                        help="Where --batch writes per-job results (default: next to the jobs file)")
+    add_profile_args(parser, "findleads")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    find_leads_by_zip()
\ No newline at end of file
+    args = parse_args()
+    DELIVERY_CUSTOMER = args.customer
+    FUZZY_DEDUPLICATION = FUZZY_DEDUPLICATION or args.fuzzy_dedup
+    DELTA_MODE = args.delta and bool(args.customer)
+    if args.delta and not args.customer:
+        logging.warning("--delta needs --customer; writing the full lead list.")
+    profiler = PipelineProfiler("findleads", enabled=bool(args.profile))
+    if args.batch:
+        with open(args.batch, encoding='utf-8') as f:
+            batch_jobs = json.load(f)
+        batch_results = run_profiled(lambda: run_batch(batch_jobs), args.cprofile)
+        results_path = args.batch_results or os.path.splitext(args.batch)[0] + "_results.json"
+        with open(results_path, 'w', encoding='utf-8') as f:
+            json.dump(batch_results, f, indent=1)
+        logging.info(f"Batch results for {len(batch_results)} jobs written to '{results_path}'.")
+    else:
+        run_profiled(find_leads_by_zip, args.cprofile)
+    profiler.save(args.profile)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import argparse
+import ast
+import csv
+import json
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import time
+
+import maintemp
+from place_claims import PlaceClaims
+from maps_replay_server import DEFAULT_FIXTURE_DIR, DEFAULT_PAGE_SIZE, start_replay_server
+from scraper_governor import RateGovernor
+from scraper_telemetry import ScraperTelemetry
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_QUERIES = [
+    ("apartment buildings", "apartment buildings near 28052"),
+    ("laundromats", "laundromats near 28012"),
+    ("gyms", "gyms near 28164"),
+    ("motels", "motels near 28054"),
+]
+
+# =================== BENCHMARK =================== #
+
+def count_csv_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, newline='', encoding='utf-8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def run_benchmark(queries, base_url, driver_path, max_results, output_file, lean_browser=True, extraction="dom",
+                  review_sessions=0, place_claims=False):
+    """Runs the scraper against base_url and returns throughput, per-query and per-stage latency figures."""
+    maintemp.MAPS_BASE_URL = base_url
+    maintemp.CHROMEDRIVER_PATH = driver_path
+    maintemp.MAX_QUERIES = max_results
+    maintemp.LEAN_BROWSER = lean_browser
+    maintemp.EXTRACTION_MODE = extraction
+    maintemp.REVIEW_SESSIONS = review_sessions
+    # The replay server hands every query the same recorded cards, so with claims most queries skip them all
+    maintemp.place_claims = PlaceClaims() if place_claims else None
+    maintemp.telemetry = ScraperTelemetry(enabled=False)
+    maintemp.governor = RateGovernor(rate_per_min=0)  # Measure the scraper, not the pacing
+
+    query_seconds = []
+    scrape = maintemp.scrape_google_maps
+
+    def timed_scrape(search_query, result_queue, output_file, max_results=None):
+        started = time.perf_counter()
+        try:
+            return scrape(search_query, result_queue, output_file, max_results=max_results)
+        finally:
+            query_seconds.append(time.perf_counter() - started)
+
+    lines = [f'"{business_type}", "{query}"' for business_type, query in queries]
+    maintemp.scrape_google_maps = timed_scrape
+    started = time.perf_counter()
+    try:
+        maintemp.process_queries(lines, queue.Queue(), output_file)
+    finally:
+        maintemp.scrape_google_maps = scrape
+    elapsed = time.perf_counter() - started
+
+    leads = count_csv_rows(output_file)
+    stages = maintemp.telemetry.summary()["stages"]
+    return {
+        "base_url": base_url,
+        "browser_profile": "lean" if lean_browser else "full",
+        "extraction": extraction,
+        "review_sessions": review_sessions,
+        "place_claims": place_claims,
+        "queries": len(lines),
+        "leads": leads,
+        "wall_seconds": round(elapsed, 3),
+        "leads_per_minute": round(leads / elapsed * 60, 2) if elapsed else 0.0,
+        "query_seconds": {
+            "mean": round(statistics.mean(query_seconds), 3) if query_seconds else None,
+            "median": round(statistics.median(query_seconds), 3) if query_seconds else None,
+            "max": round(max(query_seconds), 3) if query_seconds else None,
+        },
+        "stages": stages,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark maintemp.py against recorded Maps pages (no network needed).")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--base_url", default=None, help="Use an already running replay server instead of starting one")
+    parser.add_argument("--driver_path", default="", help="chromedriver binary; empty to resolve from PATH")
+    parser.add_argument("--queries", default=None, help="Queries file; defaults to a small built-in set")
+    parser.add_argument("--max_results", type=int, default=maintemp.MAX_QUERIES)
+    parser.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--repeat", type=int, default=2, help="Replicate recorded cards N times")
+    parser.add_argument("--latency_ms", type=int, default=0)
+    parser.add_argument("--full_browser", action="store_true", help="Benchmark the full (non-lean) browser profile")
+    parser.add_argument("--extraction", choices=["dom", "payload"], default="dom")
+    parser.add_argument("--review_sessions", type=int, default=0, help="Secondary review-date browsers per query")
+    parser.add_argument("--place_claims", action="store_true",
+                        help="Skip cards another query already claimed (the replayed queries all share one card set)")
+    parser.add_argument("--report", default=None, help="Write the JSON report here as well as stdout")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding='utf-8') as f:
+            queries = [ast.literal_eval(line.strip()) for line in f if line.strip()]
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_replay_server(args.fixtures, page_size=args.page_size,
+                                               repeat=args.repeat, latency_ms=args.latency_ms)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = run_benchmark(queries, base_url, args.driver_path, args.max_results,
+                                   os.path.join(tmp_dir, "LeadsApart.csv"), lean_browser=not args.full_browser, extraction=args.extraction,
+                                   review_sessions=args.review_sessions, place_claims=args.place_claims)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
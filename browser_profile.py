@@ -0,0 +1,140 @@
+import glob
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are only coordinated within one process
+    fcntl = None
+
+from selenium import webdriver
+
+# =================== CONFIGURATION =================== #
+
+FULL_WINDOW_SIZE = "1920,1080"
+LEAN_WINDOW_SIZE = "1024,768"   # Results list and place panel still render side by side
+DISK_CACHE_MB = 200             # Per cache slot; slots are reused, so the total is bounded by peak browsers
+BROWSER_CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "leadsassist-chrome-cache"))
+
+# Requests the scraper never reads from: map tiles, imagery, photos, fonts and media.
+# Scripts, styles and the XHR that carries listing data are left alone.
+BLOCKED_URL_PATTERNS = [
+    "*/maps/vt*", "*/maps/vt/*", "*khms*.googleapis.com/*", "*/kh/v=*", "*/maps/_/js/*tile*",
+    "*streetviewpixels-pa.googleapis.com/*", "*.googleusercontent.com/*", "*.ggpht.com/*",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.gstatic.com/*",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+]
+
+# Chrome content settings: 2 = block
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+    "profile.managed_default_content_settings.geolocation": 2,
+}
+
+# =================== PROFILE =================== #
+
+class CacheSlots:
+    """
+    Disk cache directories handed out by slot number. A browser takes the lowest free slot and gives it
+    back when it quits, so there are never more caches than browsers open at once, and later queries and
+    runs reuse the warm ones. A lock file per slot keeps other scraper processes on the machine off a slot
+    in use (POSIX only).
+    """
+
+    def __init__(self, root=BROWSER_CACHE_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.held = {}
+        self.swept = False
+
+    def path(self, slot):
+        return os.path.join(self.root, f"slot-{slot}")
+
+    def _sweep(self):
+        # Caches from the earlier one-per-thread layout are never reused
+        for path in glob.glob(os.path.join(self.root, "worker-*")):
+            shutil.rmtree(path, ignore_errors=True)
+        self.swept = True
+
+    def _lock(self, slot):
+        """Lock file handle (None without fcntl), or False when another process holds the slot."""
+        if fcntl is None:
+            return None
+        handle = open(os.path.join(self.root, f"slot-{slot}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        return handle
+
+    def acquire(self):
+        """(slot, cache directory) for a browser about to start."""
+        with self.lock:
+            os.makedirs(self.root, exist_ok=True)
+            if not self.swept:
+                self._sweep()
+            slot = 0
+            while True:
+                if slot not in self.held:
+                    handle = self._lock(slot)
+                    if handle is not False:
+                        self.held[slot] = handle
+                        os.makedirs(self.path(slot), exist_ok=True)
+                        return slot, self.path(slot)
+                slot += 1
+
+    def release(self, slot):
+        with self.lock:
+            handle = self.held.pop(slot, None)
+        if handle is not None:
+            handle.close()
+
+
+def build_chrome_options(lean=True, capture_network=False, cache_dir=None):
+    """
+    Headless Chrome options; lean additionally blocks images, shrinks the viewport and keeps a warm disk cache
+    in cache_dir (a CacheSlots directory; no disk cache flags without one).
+    capture_network turns on the performance log that maps_payload.PayloadCapture reads responses from.
+    """
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument(f"--window-size={LEAN_WINDOW_SIZE if lean else FULL_WINDOW_SIZE}")
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-software-rasterizer")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-logging")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_argument("--output=/dev/null")
+    chrome_options.add_argument("--single-process")
+    if lean:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-remote-fonts")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+        chrome_options.add_argument("--disable-background-networking")
+        if cache_dir:
+            chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+            chrome_options.add_argument(f"--disk-cache-size={DISK_CACHE_MB * 1024 * 1024}")
+        chrome_options.add_experimental_option("prefs", LEAN_PREFS)
+    if capture_network:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+def apply_lean_profile(driver):
+    """Blocks tile, image, font and media requests through CDP. Returns False if CDP is unavailable."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+        return True
+    except Exception as e:
+        logging.warning(f"Lean browser profile: request blocking unavailable ({type(e).__name__})")
+        return False
@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+
+import pandas as pd
+
+from known_leads import address_zip, normalize_name, normalize_phone
+from lead_schema import as_str
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_LEDGER_FILE = "./Outputs/delivery_ledger.sqlite3"
+
+# A delivered lead counts as changed when any of these differ from what the customer received: identity and
+# contact fields only. Review count, rating and the relative "2 weeks ago" text move on every re-scrape, and
+# Email is crawled after the delta runs, so its fingerprints would not match the ones recorded after.
+FINGERPRINT_COLUMNS = ["Name of Business", "Website", "Business Address", "Phone Number"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS delivered_leads (
+    customer TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    lead_key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    delivery_id TEXT NOT NULL,
+    delivered_at REAL NOT NULL,
+    PRIMARY KEY (customer, zip, lead_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ledger_deliveries (
+    delivery_id TEXT PRIMARY KEY,
+    customer TEXT NOT NULL,
+    output_file TEXT,
+    lead_count INTEGER NOT NULL,
+    new_count INTEGER NOT NULL,
+    changed_count INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_deliveries_customer ON ledger_deliveries (customer, created_at);
+"""
+
+# =================== KEYS =================== #
+
+def normalize_customer(customer):
+    return " ".join(str(customer or "").lower().split())
+
+
+def _column(df, name):
+    """Plain-string column with missing values as ''."""
+    if name not in df.columns:
+        return pd.Series("", index=df.index)
+    return as_str(df[name]).astype(str).replace("nan", "")
+
+
+def lead_keys(df):
+    """
+    (zip, lead_key, fingerprint) per row. The territory is the Zip column (parsed address), the key the
+    normalized phone, falling back to name + zip for leads without one.
+    """
+    addresses = _column(df, "Business Address")
+    zips = _column(df, "Zip").where(lambda z: z != "", addresses.map(address_zip)).fillna("")
+    phones = _column(df, "Phone Number").map(normalize_phone)
+    names = _column(df, "Name of Business").map(normalize_name)
+    keys = ["p:" + phone if phone else f"n:{name}" for phone, name in zip(phones, names)]
+    fingerprint_source = pd.Series("", index=df.index)
+    for col in FINGERPRINT_COLUMNS:
+        fingerprint_source = fingerprint_source + "\x1f" + _column(df, col).str.strip()
+    fingerprints = [hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest() for text in fingerprint_source]
+    return pd.DataFrame({"zip": zips.to_numpy(), "lead_key": keys, "fingerprint": fingerprints}, index=df.index)
+
+# =================== LEDGER =================== #
+
+class DeliveryLedger:
+    """Lead keys already delivered per customer and zip, in SQLite (primary key = the anti-join index)."""
+
+    def __init__(self, path=DEFAULT_LEDGER_FILE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _stage_candidates(self, keys):
+        self.conn.execute("DROP TABLE IF EXISTS temp.candidates")
+        self.conn.execute("CREATE TEMP TABLE candidates (pos INTEGER PRIMARY KEY, zip TEXT, lead_key TEXT, fingerprint TEXT)")
+        self.conn.executemany("INSERT INTO temp.candidates VALUES (?, ?, ?, ?)",
+                              zip(range(len(keys)), keys["zip"], keys["lead_key"], keys["fingerprint"]))
+
+    def delta(self, df, customer):
+        """
+        Rows of df not yet delivered to this customer in their zip, or delivered with different details.
+        Returns (delta_df, stats).
+        """
+        keys = lead_keys(df)
+        self._stage_candidates(keys)
+        rows = self.conn.execute(
+            """SELECT c.pos, d.lead_key IS NULL FROM temp.candidates c
+               LEFT JOIN delivered_leads d
+                 ON d.customer = ? AND d.zip = c.zip AND d.lead_key = c.lead_key
+               WHERE d.lead_key IS NULL OR d.fingerprint != c.fingerprint
+               ORDER BY c.pos""",
+            (normalize_customer(customer),)).fetchall()
+        self.conn.execute("DROP TABLE temp.candidates")
+        positions = [pos for pos, _ in rows]
+        new_count = sum(1 for _, is_new in rows if is_new)
+        stats = {"candidates": len(df), "new": new_count, "changed": len(rows) - new_count,
+                 "already_delivered": len(df) - len(rows)}
+        return df.iloc[positions], stats
+
+    def record(self, df, customer, output_file=None, stats=None):
+        """Marks df's leads as delivered to customer. Returns the delivery id."""
+        customer = normalize_customer(customer)
+        keys = lead_keys(df)
+        delivery_id = uuid.uuid4().hex
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO delivered_leads (customer, zip, lead_key, fingerprint, delivery_id, delivered_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (customer, zip, lead_key)
+                   DO UPDATE SET fingerprint = excluded.fingerprint, delivery_id = excluded.delivery_id,
+                                 delivered_at = excluded.delivered_at""",
+                ((customer, z, k, f, delivery_id, now)
+                 for z, k, f in zip(keys["zip"], keys["lead_key"], keys["fingerprint"])))
+            stats = stats or {}
+            self.conn.execute(
+                "INSERT INTO ledger_deliveries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (delivery_id, customer, output_file, len(df), stats.get("new", len(df)), stats.get("changed", 0), now))
+        return delivery_id
+
+    def forget(self, customer):
+        """Drops a customer's history so the next delivery is a full one."""
+        customer = normalize_customer(customer)
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM delivered_leads WHERE customer = ?", (customer,)).rowcount
+            self.conn.execute("DELETE FROM ledger_deliveries WHERE customer = ?", (customer,))
+        return removed
+
+    def summary(self, customer):
+        customer = normalize_customer(customer)
+        zips = self.conn.execute(
+            "SELECT zip, COUNT(*) FROM delivered_leads WHERE customer = ? GROUP BY zip ORDER BY zip", (customer,)).fetchall()
+        deliveries = self.conn.execute(
+            "SELECT delivery_id, output_file, lead_count, new_count, changed_count, created_at FROM ledger_deliveries "
+            "WHERE customer = ? ORDER BY created_at", (customer,)).fetchall()
+        return {"customer": customer, "leads_by_zip": dict(zips),
+                "deliveries": [dict(zip(("delivery_id", "output_file", "lead_count", "new", "changed", "created_at"), d))
+                               for d in deliveries]}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Inspect or reset the per-customer delivery ledger.")
+    parser.add_argument("customer")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_FILE)
+    parser.add_argument("--forget", action="store_true", help="Delete the customer's history (next delivery is full)")
+    args = parser.parse_args()
+    ledger = DeliveryLedger(args.ledger)
+    if args.forget:
+        logging.info(f"Removed {ledger.forget(args.customer)} delivered leads for '{args.customer}'")
+    else:
+        print(json.dumps(ledger.summary(args.customer), indent=2))
+    ledger.close()
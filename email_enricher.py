@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_CACHE_FILE = "./Outputs/email_cache.json"
+CACHE_TTL_DAYS = 30
+FAILURE_TTL_HOURS = 6           # Unreachable / non-200 sites are tried again after this, not after CACHE_TTL_DAYS
+CACHED_STATUSES = ("ok", "robots")
+TOTAL_CONNECTIONS = 32          # Pooled connections across all sites
+PER_HOST_CONNECTIONS = 2        # Politeness limit per site
+REQUEST_TIMEOUT_S = 10         # Per connect and per read; time spent waiting for a pooled connection is not counted
+MAX_PAGES_PER_SITE = 4          # Home page plus up to three contact/about pages
+MAX_PAGE_BYTES = 1_000_000
+USER_AGENT = "LeadsAssistAI-EmailEnricher/1.0 (+contact lookup)"
+
+WEBSITE_PLACEHOLDERS = {"", "no website", "nan", "none"}
+CONTACT_LINK_HINTS = ("contact", "about", "team", "staff", "connect", "reach")
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,24}")
+MAILTO_PATTERN = re.compile(r'mailto:([^"\'?>\s]+)', re.IGNORECASE)
+HREF_PATTERN = re.compile(r'href\s*=\s*["\']([^"\'#]+)["\']', re.IGNORECASE)
+# Things that look like emails but are asset names or tracking addresses
+IGNORED_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".css", ".js")
+IGNORED_EMAIL_DOMAINS = ("example.com", "sentry.io", "wixpress.com", "sentry-next.wixpress.com", "domain.com")
+
+# =================== EXTRACTION =================== #
+
+def normalize_website(value):
+    """'sunriseaptsnc.com' / 'https://www.x.com/' -> 'https://sunriseaptsnc.com' style site root, or None."""
+    text = str(value or "").strip()
+    if text.lower() in WEBSITE_PLACEHOLDERS:
+        return None
+    if not re.match(r"^https?://", text, re.IGNORECASE):
+        text = "http://" + text
+    parsed = urlparse(text)
+    if not parsed.netloc or "." not in parsed.netloc:
+        return None
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+
+def extract_emails(html):
+    """Emails in a page (mailto links first), lowercased, without asset names or placeholder domains."""
+    found = []
+    for match in MAILTO_PATTERN.findall(html) + EMAIL_PATTERN.findall(html):
+        email = match.strip().strip(".").lower()
+        if not EMAIL_PATTERN.fullmatch(email):
+            continue
+        if email.endswith(IGNORED_EMAIL_SUFFIXES) or email.split("@", 1)[1] in IGNORED_EMAIL_DOMAINS:
+            continue
+        if email not in found:
+            found.append(email)
+    return found
+
+
+def contact_links(html, page_url):
+    """Same-site links that look like contact/about pages, in page order."""
+    host = urlparse(page_url).netloc
+    links = []
+    for href in HREF_PATTERN.findall(html):
+        if not any(hint in href.lower() for hint in CONTACT_LINK_HINTS):
+            continue
+        url = urljoin(page_url, href)
+        if urlparse(url).netloc == host and url not in links:
+            links.append(url)
+    return links
+
+# =================== CACHE =================== #
+
+class EmailCache:
+    """
+    Per-site crawl results persisted as JSON so a site is crawled at most once per CACHE_TTL_DAYS
+    (failed crawls once per FAILURE_TTL_HOURS).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_days=CACHE_TTL_DAYS, failure_ttl_hours=FAILURE_TTL_HOURS):
+        self.path = path
+        self.ttl_s = ttl_days * 86400
+        self.failure_ttl_s = failure_ttl_hours * 3600
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable email cache '{path}': {e}")
+
+    def get(self, site):
+        entry = self.entries.get(site)
+        if not entry:
+            return None
+        ttl_s = self.ttl_s if entry.get("status") in CACHED_STATUSES else self.failure_ttl_s
+        return entry if time.time() - entry.get("fetched_at", 0) < ttl_s else None
+
+    def put(self, site, emails, status):
+        self.entries[site] = {"emails": emails, "status": status, "fetched_at": time.time()}
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+# =================== CRAWLER =================== #
+
+class EmailEnricher:
+    """
+    Crawls each site's home page and its contact/about pages with one pooled aiohttp session,
+    honouring robots.txt, per-host connection limits and request timeouts.
+    url_rewrite maps a real URL to the one actually fetched (e.g. a local stand-in server).
+    """
+
+    def __init__(self, cache=None, total_connections=TOTAL_CONNECTIONS, per_host=PER_HOST_CONNECTIONS,
+                 timeout_s=REQUEST_TIMEOUT_S, max_pages=MAX_PAGES_PER_SITE, url_rewrite=None):
+        self.cache = cache or EmailCache(None)
+        self.total_connections = total_connections
+        self.per_host = per_host
+        self.timeout_s = timeout_s
+        self.max_pages = max_pages
+        self.url_rewrite = url_rewrite or (lambda url: url)
+        self.stats = {"sites": 0, "cached": 0, "crawled": 0, "with_email": 0, "robots_blocked": 0, "failed": 0}
+
+    async def _fetch(self, session, url):
+        """Returns (status, text); text is None for non-HTML or failed responses."""
+        try:
+            async with session.get(self.url_rewrite(url), allow_redirects=True) as response:
+                if response.status != 200:
+                    return response.status, None
+                if "html" not in response.headers.get("Content-Type", "text/html") and not url.endswith("robots.txt"):
+                    return response.status, None
+                body = await response.content.read(MAX_PAGE_BYTES)
+                return response.status, body.decode(response.get_encoding() if response.charset else "utf-8", "replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError, LookupError) as e:
+            logging.debug(f"Email enrichment: {url} failed ({type(e).__name__})")
+            return None, None
+
+    async def _robots(self, session, site):
+        parser = RobotFileParser()
+        status, text = await self._fetch(session, site + "/robots.txt")
+        if status == 200 and text is not None:
+            parser.parse(text.splitlines())
+        else:
+            # Missing robots.txt allows everything; an unreachable one is treated the same way
+            parser.parse([])
+        return parser
+
+    async def crawl_site(self, session, site):
+        """(emails, status) for one site root."""
+        robots = await self._robots(session, site)
+        home = site + "/"
+        if not robots.can_fetch(USER_AGENT, home):
+            return [], "robots"
+        status, html = await self._fetch(session, home)
+        if html is None:
+            return [], f"http_{status}" if status else "unreachable"
+        emails = extract_emails(html)
+        pages = 1
+        for link in contact_links(html, home):
+            if pages >= self.max_pages:
+                break
+            if not robots.can_fetch(USER_AGENT, link):
+                continue
+            pages += 1
+            _, page_html = await self._fetch(session, link)
+            if page_html:
+                emails += [e for e in extract_emails(page_html) if e not in emails]
+        return emails, "ok"
+
+    async def enrich_sites(self, websites):
+        """Maps every website value to its list of emails (cached sites are not fetched again)."""
+        sites = {}
+        for value in websites:
+            site = normalize_website(value)
+            if site:
+                sites.setdefault(site, []).append(value)
+        results = {}
+        to_crawl = []
+        for site in sites:
+            cached = self.cache.get(site)
+            if cached is not None:
+                results[site] = cached["emails"]
+                self.stats["cached"] += 1
+            else:
+                to_crawl.append(site)
+        self.stats["sites"] += len(sites)
+
+        if to_crawl:
+            connector = aiohttp.TCPConnector(limit=self.total_connections, limit_per_host=self.per_host,
+                                             ttl_dns_cache=300)
+            # No total timeout: it would include the wait for a pooled connection, and with more sites than
+            # connections the queued ones would time out before being sent
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout_s, sock_read=self.timeout_s)
+            # Each site crawls its pages one after another, so this many sites keep the pool busy
+            slots = asyncio.Semaphore(self.total_connections)
+
+            async def crawl(session, site):
+                async with slots:
+                    return await self.crawl_site(session, site)
+
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers={"User-Agent": USER_AGENT}) as session:
+                crawled = await asyncio.gather(*(crawl(session, site) for site in to_crawl))
+            for site, (emails, status) in zip(to_crawl, crawled):
+                results[site] = emails
+                self.cache.put(site, emails, status)
+                self.stats["crawled"] += 1
+                if status == "robots":
+                    self.stats["robots_blocked"] += 1
+                elif status != "ok":
+                    self.stats["failed"] += 1
+            self.cache.save()
+
+        self.stats["with_email"] += sum(1 for emails in results.values() if emails)
+        return {value: results.get(site, []) for site, values in sites.items() for value in values}
+
+    def enrich(self, websites):
+        return asyncio.run(self.enrich_sites(websites))
+
+
+def enrich_dataframe(df, enricher, website_column="Website", email_column="Email"):
+    """Fills empty email cells from the rows' websites (emails joined with '; '). Returns the number filled."""
+    if website_column not in df.columns:
+        return 0
+    if email_column not in df.columns:
+        df[email_column] = ""
+    emails = df[email_column].fillna("").astype(str).str.strip()
+    needs_email = (emails == "") | (emails.str.lower() == "nan")
+    websites = df.loc[needs_email, website_column].dropna().astype(str)
+    found = enricher.enrich(websites.unique())
+    filled = websites.map(lambda value: "; ".join(found.get(value, [])))
+    filled = filled[filled != ""]
+    df[email_column] = df[email_column].astype(object)
+    df.loc[filled.index, email_column] = filled
+    return len(filled)
+
+
+def site_base_rewrite(site_base):
+    """'http://127.0.0.1:8765/sites' -> rewrite https://host/path to http://127.0.0.1:8765/sites/host/path."""
+    def rewrite(url):
+        parsed = urlparse(url)
+        return f"{site_base.rstrip('/')}/{parsed.netloc}{parsed.path or '/'}" + (f"?{parsed.query}" if parsed.query else "")
+    return rewrite
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Fill the Email column of a leads workbook by crawling each Website.")
+    parser.add_argument("input", help="Leads .xlsx or .csv with a Website column")
+    parser.add_argument("--output", default=None, help="Where to write the enriched file (default: overwrite input)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_FILE, help="Persistent per-site result cache")
+    parser.add_argument("--per_host", type=int, default=PER_HOST_CONNECTIONS)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT_S)
+    parser.add_argument("--site_base", default=None,
+                        help="Fetch sites from a stand-in server, e.g. http://127.0.0.1:8765/sites (maps_replay_server.py)")
+    args = parser.parse_args()
+
+    is_csv = args.input.lower().endswith(".csv")
+    df = pd.read_csv(args.input, dtype=str) if is_csv else pd.read_excel(args.input, dtype=str)
+    enricher = EmailEnricher(EmailCache(args.cache), per_host=args.per_host, timeout_s=args.timeout,
+                             url_rewrite=site_base_rewrite(args.site_base) if args.site_base else None)
+    started = time.perf_counter()
+    filled = enrich_dataframe(df, enricher)
+    output = args.output or args.input
+    if output.lower().endswith(".csv"):
+        df.to_csv(output, index=False)
+    else:
+        df.to_excel(output, index=False)
+    logging.info(f"Filled {filled} emails in {time.perf_counter() - started:.1f}s -> '{output}' ({enricher.stats})")
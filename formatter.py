@@ -1,4 +1,17 @@
+import argparse
+import csv
+import heapq
+import os
+import pickle
+import tempfile
+
 import pandas as pd
+import xlsxwriter
+
+from lead_schema import (REVIEW_AGE_COLUMN, SCRAPED_AT_COLUMN, add_address_columns, in_countries, isin_ci, lower_text,
+                         memory_usage_mb, read_leads_csv, review_age_days, state_codes, title_text)
+from fuzzy_dedup import FuzzyDeduper
+from pipeline_profile import PipelineProfiler, add_profile_args, run_profiled
 
 # =================== CONFIGURABLE VARIABLES =================== #
 
@@ -7,6 +20,14 @@ output_file = './Files/default29.xlsx'  # Output file name
 
 
 US_Filter = ["United States"]
+# Keep only these states (two-letter codes) / cities; empty = no filter
+state_filters = []
+city_names = []
+# Drop leads whose latest review is older than this many days; None = no recency filter
+max_review_age_days = None
+# Also drop near-duplicates (same zip, similar name/street) that exact phone dedup misses; off unless asked for
+# (--fuzzy_dedup), since it removes leads the customer would otherwise receive
+fuzzy_dedup = os.environ.get("FORMATTER_FUZZY_DEDUP", "0") == "1"
 
 # Business type filters with required subcategories
 business_filters = {
@@ -67,9 +88,25 @@ column_widths = {
     "Rating": 10,
     "Latest Review": 20,
     "Business Address": 50,
-    "Phone Number": 15
+    "Phone Number": 15,
+    "Street": 30,
+    "City": 18,
+    "State": 8,
+    "Zip": 8,
+    "Country": 15,
+    SCRAPED_AT_COLUMN: 22,
+    REVIEW_AGE_COLUMN: 12
 }
 
+# Rows per chunk when streaming the CSV (None = load the whole file, --chunksize overrides)
+CHUNK_SIZE = None
+
+# Stand-in key for missing phone numbers in the cross-chunk seen set (drop_duplicates treats NaNs as equal)
+MISSING_PHONE_KEY = "\x00missing"
+
+# Per-stage time/rows/memory, enabled with --profile
+profiler = PipelineProfiler("formatter")
+
 # =================== DATA PROCESSING =================== #
 
 def print_status(step_name, count):
@@ -83,111 +120,136 @@ def print_filtered_categories(df_before, df_after, step_name):
     else:
         print(f"No categories filtered out in '{step_name}'")
 
-# Open the CSV file
-df = pd.read_csv(file_path)
-print_status("Initial leads count", df.shape[0])
-df["Type of Business"] = df["Type of Business"].str.lower()
-df["Sub-Category"] = df["Sub-Category"].str.lower()
-# Rename "Latest Review Date" column to "Latest Review"
-df.rename(columns={"Latest Review Date": "Latest Review"}, inplace=True)
-print(df)
-# Drop rows with unwanted values
-filters = {
-    "# of Reviews": 'No reviews',
-    "Rating": 'No ratings',
-    "Latest Review": 'No review date',
-    "Phone Number": 'No phone number',
-    "Business Address": 'No address'
-}
-
-for col, value in filters.items():
-    df_before = df.copy()
-    df = df[df[col] != value]
-    print_status(f"After filtering '{col}' != '{value}'", df.shape[0])
-    # print_filtered_categories(df_before, df, f"Filter '{col}' != '{value}'")
-
-# Clean and convert numeric columns
-df["# of Reviews"] = df["# of Reviews"].str.replace(',', '').astype(int)
-
-# Remove "on Google" from 'Latest Review'
-df["Latest Review"] = df["Latest Review"].str.replace(r'on\s*\n*Google', '', regex=True)
-
-# Drop addresses without a comma
-df_before = df.copy()
-df = df[df["Business Address"].str.contains(",", na=False)]
-print_status("After dropping addresses without a comma", df.shape[0])
-# print_filtered_categories(df_before, df, "Drop addresses without a comma")
-
-# Keep rows where '# of Reviews' is at least 4
-df_before = df.copy()
-df = df[df["# of Reviews"] >= 4]
-print_status("After filtering reviews >= 4", df.shape[0])
-# print_filtered_categories(df_before, df, "Filter reviews >= 4")
-
-# Keep only rows where 'Latest Review' contains "ago"
-df_before = df.copy()
-df = df[df["Latest Review"].str.contains(r'\bago\b', case=False, na=False)]
-print_status("After keeping 'Latest Review' with 'ago'", df.shape[0])
-# print_filtered_categories(df_before, df, "Keep 'Latest Review' with 'ago'")
-
-# Remove any text after "ago"
-df["Latest Review"] = df["Latest Review"].str.extract(r'(.+?ago)')[0]
-
-# Remove duplicate phone numbers
-df_before = df.copy()
-df = df.drop_duplicates(subset=["Phone Number"], keep='first')
-print_status("After removing duplicate phone numbers", df.shape[0])
-# print_filtered_categories(df_before, df, "Remove duplicate phone numbers")
-
-
-# Apply US filter
-df_before = df.copy()
-df = df[df["Business Address"].str.contains('|'.join(US_Filter), case=True, na=False)]
-print_status("After US filter", df.shape[0])
-# print_filtered_categories(df_before, df, "US filter")
-
-
-# # # Apply state filters
-# df_before = df.copy()
-# df = df[df["Business Address"].str.contains('|'.join(state_filters), case=True, na=False)]
-# print_status("After state filter", df.shape[0])
-# # print_filtered_categories(df_before, df, "State filter")
-
-# # Filter based on city names
-# df_before = df.copy()
-# df = df[df["Business Address"].astype(str).str.contains('|'.join(city_names), case=False, na=False)]
-# print_status("After city filter", df.shape[0])
-# print_filtered_categories(df_before, df, "City filter")
-
-
-
-
-# Apply business type and sub-category filters
-# Only apply filters to business types that are specifically defined in business_filters
-for business_type, valid_subcategories in business_filters.items():
-    # Check if any of the leads have this specific business type
-    business_type_lower = business_type.lower()
-    has_matching_leads = df["Type of Business"].str.contains(business_type_lower, case=False, na=False).any()
-    
-    if has_matching_leads and valid_subcategories and len(valid_subcategories) > 0:
-        df_before = df.copy()
-        # Filter out leads where the Type of Business matches the filter key
-        # BUT the Sub-Category is NOT in the allowed list
-        mask = df["Type of Business"].str.contains(business_type_lower, case=False, na=False) & \
-               ~df["Sub-Category"].str.contains('|'.join(valid_subcategories), case=False, na=False)
-        df = df[~mask]
-        print_status(f"After filtering '{business_type}' (has sub-category filters)", df.shape[0])
-        print_filtered_categories(df_before, df, f"Filter '{business_type}' (has sub-category filters)")
-    elif has_matching_leads:
-        # Business type exists in data but no sub-category filters defined
-        print_status(f"Skipping filter for '{business_type}' (no sub-category filters defined)", df.shape[0])
-
-# For business types not in business_filters, no filtering is applied (they pass through as-is)
-print_status("Final count after business type filtering", df.shape[0])
-
-# Capitalize the first letter of each word in "Type of Business" and "Sub-Category"
-df["Type of Business"] = df["Type of Business"].str.title()
-df["Sub-Category"] = df["Sub-Category"].str.title()
+class StatusTotals:
+    """Sums per-step lead counts over all chunks and prints them once, in step order."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def __call__(self, step_name, count):
+        self.totals[step_name] = self.totals.get(step_name, 0) + count
+
+    def print_all(self):
+        for step_name, count in self.totals.items():
+            print_status(step_name, count)
+
+def apply_row_filters(df, report=print_status):
+    """Row-local cleaning and filtering; every row is kept or dropped on its own values."""
+    df["Type of Business"] = lower_text(df["Type of Business"])
+    df["Sub-Category"] = lower_text(df["Sub-Category"])
+    # Rename "Latest Review Date" column to "Latest Review"
+    df.rename(columns={"Latest Review Date": "Latest Review"}, inplace=True)
+
+    # Drop rows with unwanted values
+    filters = {
+        "# of Reviews": 'No reviews',
+        "Rating": 'No ratings',
+        "Latest Review": 'No review date',
+        "Phone Number": 'No phone number',
+        "Business Address": 'No address'
+    }
+
+    for col, value in filters.items():
+        df = df[df[col] != value]
+        report(f"After filtering '{col}' != '{value}'", df.shape[0])
+
+    # Clean and convert numeric columns
+    df["# of Reviews"] = df["# of Reviews"].str.replace(',', '').astype(int)
+
+    # Remove "on Google" from 'Latest Review'
+    df["Latest Review"] = df["Latest Review"].str.replace(r'on\s*\n*Google', '', regex=True)
+
+    # Drop addresses without a comma
+    df = df[df["Business Address"].str.contains(",", na=False)]
+    report("After dropping addresses without a comma", df.shape[0])
+
+    # Keep rows where '# of Reviews' is at least 4
+    df = df[df["# of Reviews"] >= 4]
+    report("After filtering reviews >= 4", df.shape[0])
+
+    # Keep only rows where 'Latest Review' contains "ago"
+    df = df[df["Latest Review"].str.contains(r'\bago\b', case=False, na=False)]
+    report("After keeping 'Latest Review' with 'ago'", df.shape[0])
+
+    # Remove any text after "ago"
+    df["Latest Review"] = df["Latest Review"].str.extract(r'(.+?ago)')[0]
+
+    # Numeric recency, so age filters and sorts are plain comparisons
+    df[REVIEW_AGE_COLUMN] = review_age_days(df["Latest Review"], df.get(SCRAPED_AT_COLUMN))
+    if max_review_age_days is not None:
+        df = df[df[REVIEW_AGE_COLUMN].le(max_review_age_days).fillna(False).astype(bool)]
+        report(f"After keeping reviews <= {max_review_age_days} days old", df.shape[0])
+    return df
+
+def drop_seen_phone_numbers(df, seen_phones, report=print_status):
+    """Cross-chunk 'keep first' dedup on Phone Number; seen_phones holds every number already kept."""
+    # NaN phones share one key, like drop_duplicates treats them
+    keys = df["Phone Number"].fillna(MISSING_PHONE_KEY)
+    mask = ~keys.duplicated(keep='first') & ~keys.isin(seen_phones)
+    df = df[mask]
+    seen_phones.update(keys[mask])
+    report("After removing duplicate phone numbers", df.shape[0])
+    return df
+
+def drop_near_duplicates(df, deduper, report=print_status):
+    """Cross-chunk 'keep first' dedup on name + address; deduper indexes every lead already kept."""
+    if not fuzzy_dedup or df.empty:
+        return df
+    df = df[deduper.keep_mask(df)]
+    report("After removing near-duplicate businesses", df.shape[0])
+    return df
+
+def apply_area_and_business_filters(df, report=print_status, verbose=True):
+    """US filter and business type / sub-category filters, then title casing."""
+    # Street/city/state/zip/country parsed once; the area filters below are isin checks on them
+    df = add_address_columns(df)
+
+    # Apply US filter
+    df = df[in_countries(df, US_Filter)]
+    report("After US filter", df.shape[0])
+
+    # Apply state filters
+    if state_filters:
+        df = df[df["State"].isin(state_codes(state_filters))]
+        report("After state filter", df.shape[0])
+
+    # Filter based on city names
+    if city_names:
+        df = df[isin_ci(df["City"], city_names)]
+        report("After city filter", df.shape[0])
+
+    # Apply business type and sub-category filters
+    # Only apply filters to business types that are specifically defined in business_filters
+    for business_type, valid_subcategories in business_filters.items():
+        # Check if any of the leads have this specific business type
+        business_type_lower = business_type.lower()
+        has_matching_leads = df["Type of Business"].str.contains(business_type_lower, case=False, na=False).any()
+
+        if has_matching_leads and valid_subcategories and len(valid_subcategories) > 0:
+            df_before = df if verbose else None
+            # Filter out leads where the Type of Business matches the filter key
+            # BUT the Sub-Category is NOT in the allowed list
+            mask = df["Type of Business"].str.contains(business_type_lower, case=False, na=False) & \
+                   ~df["Sub-Category"].str.contains('|'.join(valid_subcategories), case=False, na=False)
+            df = df[~mask]
+            report(f"After filtering '{business_type}' (has sub-category filters)", df.shape[0])
+            if verbose:
+                print_filtered_categories(df_before, df, f"Filter '{business_type}' (has sub-category filters)")
+                df_before = None
+        elif has_matching_leads:
+            # Business type exists in data but no sub-category filters defined
+            report(f"Skipping filter for '{business_type}' (no sub-category filters defined)", df.shape[0])
+        elif not verbose and valid_subcategories:
+            # Chunked runs sum counts over chunks, so chunks without this type still contribute their rows
+            report(f"After filtering '{business_type}' (has sub-category filters)", df.shape[0])
+
+    # For business types not in business_filters, no filtering is applied (they pass through as-is)
+    report("Final count after business type filtering", df.shape[0])
+
+    # Capitalize the first letter of each word in "Type of Business" and "Sub-Category"
+    df["Type of Business"] = title_text(df["Type of Business"])
+    df["Sub-Category"] = title_text(df["Sub-Category"])
+    return df
 
 
 # =================== SORTING LOGIC =================== #
@@ -206,21 +268,178 @@ def custom_sort_key(row):
     else:
         return 1, row["Type of Business"], row["Sub-Category"]
 
-# Apply custom sorting
-df["Sort Key"] = df.apply(custom_sort_key, axis=1)
-df = df.sort_values(by="Sort Key", ascending=True).drop(columns=["Sort Key"])
+def sort_leads(df):
+    # Apply custom sorting
+    df["Sort Key"] = df.apply(custom_sort_key, axis=1)
+    return df.sort_values(by="Sort Key", ascending=True).drop(columns=["Sort Key"])
 
-# =================== SAVE TO EXCEL =================== #
+def merge_sort_key(row):
+    """custom_sort_key for merged rows; NaN text sorts as empty so runs compare cleanly."""
+    priority, business_type, sub_category = custom_sort_key(row)
+    return priority, business_type if isinstance(business_type, str) else '', sub_category if isinstance(sub_category, str) else ''
 
-with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
-    df.to_excel(writer, index=False, sheet_name='Sheet1')
 
-    # Get workbook and worksheet
-    workbook = writer.book
-    worksheet = writer.sheets['Sheet1']
-
-    # Apply custom column widths
-    for i, col in enumerate(column_widths.keys()):
-        worksheet.set_column(i, i, column_widths[col])
+# =================== SAVE TO EXCEL =================== #
 
-print(f"File '{output_file}' saved successfully with custom column widths! ✅")
+def save_to_excel(df, output_file):
+    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Sheet1')
+
+        # Get workbook and worksheet
+        workbook = writer.book
+        worksheet = writer.sheets['Sheet1']
+
+        # Apply custom column widths by name (columns without one keep Excel's default)
+        set_column_widths(worksheet, df.columns)
+
+def set_column_widths(worksheet, columns):
+    for i, col in enumerate(columns):
+        if col in column_widths:
+            worksheet.set_column(i, i, column_widths[col])
+
+def open_streaming_writer(output_file, columns):
+    """Row-at-a-time writer for the merged output: CSV, or XLSX in xlsxwriter constant_memory mode."""
+    if output_file.lower().endswith('.csv'):
+        file = open(output_file, mode='w', newline='', encoding='utf-8')
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        return (lambda values: writer.writerow(['' if v is None else v for v in values])), file.close
+
+    workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Sheet1')
+    bold = workbook.add_format({'bold': True, 'border': 1})
+    set_column_widths(worksheet, columns)
+    worksheet.write_row(0, 0, columns, bold)
+    next_row = [1]
+
+    def write_row(values):
+        worksheet.write_row(next_row[0], 0, values)
+        next_row[0] += 1
+
+    return write_row, workbook.close
+
+
+# =================== RUN MODES =================== #
+
+def format_in_memory(file_path, output_file):
+    report = profiler.wrap_report(print_status)
+    # Open the CSV file
+    with profiler.stage("read") as stage:
+        df = read_leads_csv(file_path)
+        stage["rows_out"] = df.shape[0]
+    print_status("Initial leads count", df.shape[0])
+    print(f"Loaded {memory_usage_mb(df)} MB")
+    print(df)
+    with profiler.stage("clean", df.shape[0]) as stage:
+        df = apply_row_filters(df, report=report)
+        stage["rows_out"] = df.shape[0]
+    with profiler.stage("dedup", df.shape[0]) as stage:
+        df = drop_seen_phone_numbers(df, set(), report=report)
+        df = drop_near_duplicates(df, FuzzyDeduper(), report=report)
+        stage["rows_out"] = df.shape[0]
+    with profiler.stage("filter", df.shape[0]) as stage:
+        df = apply_area_and_business_filters(df, report=report)
+        stage["rows_out"] = df.shape[0]
+    with profiler.stage("sort", df.shape[0]) as stage:
+        df = sort_leads(df)
+        stage["rows_out"] = df.shape[0]
+    with profiler.stage("write", df.shape[0]) as stage:
+        save_to_excel(df, output_file)
+        stage["rows_out"] = df.shape[0]
+    return df.shape[0]
+
+def _spill_run(df, run_dir, run_index):
+    """Writes one sorted chunk to disk as a stream of pickled row tuples."""
+    path = os.path.join(run_dir, f"run_{run_index:05d}.pkl")
+    with open(path, 'wb') as f:
+        for row in df.itertuples(index=False, name=None):
+            pickle.dump(row, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def format_chunked(file_path, output_file, chunksize):
+    """
+    Streams the CSV in chunks of `chunksize` rows. Only the kept phone numbers and name/address signatures
+    stay in memory; each filtered chunk is sorted and spilled to disk, then all runs are merged into the
+    output row by row.
+    """
+    totals = StatusTotals()
+    report = profiler.wrap_report(totals)
+    seen_phones = set()
+    deduper = FuzzyDeduper()
+    columns = None
+    initial_count = 0
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="formatter_runs_") as run_dir:
+        chunks = read_leads_csv(file_path, chunksize=chunksize)
+        while True:
+            with profiler.stage("read") as stage:
+                chunk = next(chunks, None)
+                stage["rows_out"] = 0 if chunk is None else chunk.shape[0]
+            if chunk is None:
+                break
+            initial_count += chunk.shape[0]
+            with profiler.stage("clean", chunk.shape[0]) as stage:
+                chunk = apply_row_filters(chunk, report=report)
+                stage["rows_out"] = chunk.shape[0]
+            with profiler.stage("dedup", chunk.shape[0]) as stage:
+                chunk = drop_seen_phone_numbers(chunk, seen_phones, report=report)
+                chunk = drop_near_duplicates(chunk, deduper, report=report)
+                stage["rows_out"] = chunk.shape[0]
+            with profiler.stage("filter", chunk.shape[0]) as stage:
+                chunk = apply_area_and_business_filters(chunk, report=report, verbose=False)
+                stage["rows_out"] = chunk.shape[0]
+            if columns is None:
+                columns = list(chunk.columns)
+            if not chunk.empty:
+                with profiler.stage("sort", chunk.shape[0]) as stage:
+                    runs.append(_spill_run(sort_leads(chunk), run_dir, len(runs)))
+                    stage["rows_out"] = chunk.shape[0]
+            print(f"Processed {initial_count} rows ({len(seen_phones)} unique phone numbers so far)")
+
+        print_status("Initial leads count", initial_count)
+        totals.print_all()
+        if columns is None:
+            columns = list(read_leads_csv(file_path, nrows=0).columns)
+
+        # k-way merge of the sorted runs keeps the custom sort order across chunks
+        rows = heapq.merge(*[_read_run(path) for path in runs],
+                           key=lambda values: merge_sort_key(dict(zip(columns, values))))
+        with profiler.stage("write") as stage:
+            write_row, close = open_streaming_writer(output_file, columns)
+            written = 0
+            try:
+                for values in rows:
+                    write_row([None if pd.isna(v) else v for v in values])
+                    written += 1
+            finally:
+                close()
+            stage["rows_in"] = stage["rows_out"] = written
+    return written
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clean, filter and sort scraped leads into an Excel file.")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE,
+                        help="Stream the CSV in chunks of this many rows to keep memory bounded")
+    parser.add_argument("--fuzzy_dedup", action="store_true",
+                        help="Also drop near-duplicate businesses, not only exact duplicate phone numbers")
+    add_profile_args(parser, "formatter")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    fuzzy_dedup = fuzzy_dedup or args.fuzzy_dedup
+    profiler = PipelineProfiler("formatter", enabled=bool(args.profile))
+    if args.chunksize:
+        run_profiled(lambda: format_chunked(file_path, output_file, args.chunksize), args.cprofile)
+    else:
+        run_profiled(lambda: format_in_memory(file_path, output_file), args.cprofile)
+    profiler.save(args.profile)
+    print(f"File '{output_file}' saved successfully with custom column widths! ✅")
@@ -0,0 +1,221 @@
+import argparse
+import logging
+import re
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from known_leads import address_zip, normalize_name, normalize_phone
+from lead_schema import as_str
+
+# =================== CONFIGURATION =================== #
+
+NAME_COLUMN = "Name of Business"
+ADDRESS_COLUMN = "Business Address"
+
+MINHASH_BANDS = 4                # Candidate if any band matches within the zip...
+MINHASH_ROWS_PER_BAND = 2        # ...so names with trigram Jaccard ~0.6+ almost always meet
+MAX_BLOCK_CANDIDATES = 50        # Cap on comparisons per block key (keeps huge blocks linear)
+
+SAME_NAME_THRESHOLD = 0.85       # Same zip, near-identical name, same street number (or, lacking one, same phone)
+SAME_STREET_THRESHOLD = 0.5      # Same zip and street address, similar name
+
+# Words that do not tell two businesses apart
+NAME_STOPWORDS = {"the", "inc", "llc", "ltd", "co", "corp", "corporation", "company", "of", "at", "and", "pllc", "lp"}
+NAME_ABBREVIATIONS = {
+    "apts": "apartments", "apt": "apartment", "ctr": "center", "centre": "center", "mhp": "mobile home park",
+    "mhc": "mobile home community", "hs": "high school", "ms": "middle school", "sch": "school", "st": "saint",
+    "mt": "mount", "intl": "international", "svc": "service", "svcs": "services", "auto": "automotive",
+}
+STREET_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "av": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd", "highway": "hwy",
+    "lane": "ln", "court": "ct", "place": "pl", "parkway": "pkwy", "circle": "cir", "terrace": "ter", "trail": "trl",
+    "north": "n", "south": "s", "east": "e", "west": "w", "suite": "ste", "unit": "ste", "#": "ste",
+}
+STREET_NUMBER = re.compile(r"^\s*(\d+[a-z]?)\b")
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)
+_HASH_A = _rng.randint(1, _PRIME, size=MINHASH_BANDS * MINHASH_ROWS_PER_BAND, dtype=np.int64)
+_HASH_B = _rng.randint(0, _PRIME, size=MINHASH_BANDS * MINHASH_ROWS_PER_BAND, dtype=np.int64)
+
+# =================== SIGNATURES =================== #
+
+def name_tokens(name):
+    words = []
+    for word in normalize_name(name).split():
+        words.extend(NAME_ABBREVIATIONS.get(word, word).split())
+    return [w for w in words if w not in NAME_STOPWORDS]
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def street_key(street):
+    """'123 North Main Street, Suite 4' -> ('123', '123 n main st')."""
+    first = str(street or "").split(",")[0].lower()
+    words = [STREET_ABBREVIATIONS.get(w, w) for w in re.sub(r"[^a-z0-9# ]+", " ", first).split()]
+    if "ste" in words:
+        words = words[:words.index("ste")]
+    text = " ".join(words)
+    match = STREET_NUMBER.match(text)
+    return (match.group(1) if match else None), (text if match else None)
+
+
+def minhash_bands(grams):
+    if not grams:
+        return ()
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+    signature = ((np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % _PRIME).min(axis=1)
+    # Each band's bytes are its bucket key
+    raw, width = signature.tobytes(), signature.itemsize * MINHASH_ROWS_PER_BAND
+    return tuple(raw[i * width:(i + 1) * width] for i in range(MINHASH_BANDS))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class LeadSignature:
+    __slots__ = ("zip", "grams", "bands", "name_numbers", "number", "street", "phone")
+
+    def __init__(self, zip_code, name_part, number, street, phone):
+        self.zip = zip_code
+        self.grams, self.bands, self.name_numbers = name_part
+        self.number = number
+        self.street = street
+        self.phone = phone
+
+
+def is_near_duplicate(a, b):
+    if a.name_numbers != b.name_numbers and a.name_numbers and b.name_numbers:
+        # "Storage Unit 4" / "Storage Unit 5", "Station 12" / "Station 21": numbered siblings, not typos
+        return False
+    name_similarity = jaccard(a.grams, b.grams)
+    if a.street and a.street == b.street and name_similarity >= SAME_STREET_THRESHOLD:
+        return True
+    if name_similarity < SAME_NAME_THRESHOLD:
+        return False
+    if a.number and b.number:
+        # Chains share a name across a zip; a different street number means a different location
+        return a.number == b.number
+    # Without a street number on one side the address cannot tell two branches apart; only the phone can
+    return bool(a.phone) and a.phone == b.phone
+
+# =================== DEDUPER =================== #
+
+class FuzzyDeduper:
+    """
+    Keep-first near-duplicate filter on name + address. Candidates are only rows in the same zip that share
+    a MinHash band of the name's trigrams or the same street address; each candidate pair is then verified.
+    Kept rows stay indexed, so successive chunks are deduplicated against everything kept before.
+    """
+
+    def __init__(self, max_block_candidates=MAX_BLOCK_CANDIDATES):
+        self.max_block_candidates = max_block_candidates
+        self.blocks = {}
+        self.kept = []
+        self.stats = {"rows": 0, "duplicates": 0, "comparisons": 0, "no_zip": 0}
+
+    def _signatures(self, df, name_column, address_column):
+        names = as_str(df[name_column]).astype(str) if name_column in df.columns else pd.Series("", index=df.index)
+        addresses = as_str(df[address_column]).astype(str) if address_column in df.columns else pd.Series("", index=df.index)
+        if "Zip" in df.columns:
+            zips = as_str(df["Zip"]).astype(str).replace("nan", None)
+            zips = zips.where(zips.notna(), addresses.map(address_zip))
+        else:
+            zips = addresses.map(address_zip)
+        streets = as_str(df["Street"]).astype(str) if "Street" in df.columns else addresses
+        streets = streets.where(streets != "nan", addresses)
+        if "Phone Number" in df.columns:
+            phones = as_str(df["Phone Number"]).astype(str).map(normalize_phone)
+        else:
+            phones = pd.Series("", index=df.index)
+        # Names and streets repeat (chains, multi-tenant buildings): build each signature part once per value
+        name_parts = {}
+        for name in pd.unique(names):
+            tokens = name_tokens(name)
+            grams = trigrams(" ".join(tokens))
+            name_parts[name] = (grams, minhash_bands(grams), frozenset(t for t in tokens if t.isdigit()))
+        street_parts = {street: street_key(street) for street in pd.unique(streets)}
+        return [LeadSignature(z, name_parts[n], *street_parts[s], p) for z, n, s, p in zip(zips, names, streets, phones)]
+
+    def _block_keys(self, signature):
+        keys = [("m", signature.zip, i, band) for i, band in enumerate(signature.bands)]
+        if signature.street:
+            keys.append(("s", signature.zip, signature.street))
+        return keys
+
+    def keep_mask(self, df, name_column=NAME_COLUMN, address_column=ADDRESS_COLUMN):
+        """Boolean array: True for rows to keep (not a near-duplicate of an earlier kept row)."""
+        signatures = self._signatures(df, name_column, address_column)
+        keep = np.ones(len(signatures), dtype=bool)
+        for position, signature in enumerate(signatures):
+            self.stats["rows"] += 1
+            if not signature.zip:
+                # Without a zip there is no block to search; these rows are left to the exact phone dedup
+                self.stats["no_zip"] += 1
+                continue
+            keys = self._block_keys(signature)
+            seen = set()
+            duplicate = False
+            for key in keys:
+                for kept_id in self.blocks.get(key, ())[-self.max_block_candidates:]:
+                    if kept_id in seen:
+                        continue
+                    seen.add(kept_id)
+                    self.stats["comparisons"] += 1
+                    if is_near_duplicate(signature, self.kept[kept_id]):
+                        duplicate = True
+                        break
+                if duplicate:
+                    break
+            if duplicate:
+                keep[position] = False
+                self.stats["duplicates"] += 1
+                continue
+            kept_id = len(self.kept)
+            self.kept.append(signature)
+            for key in keys:
+                self.blocks.setdefault(key, []).append(kept_id)
+        return keep
+
+
+def drop_fuzzy_duplicates(df, deduper=None, name_column=NAME_COLUMN, address_column=ADDRESS_COLUMN):
+    """Keeps the first row of each near-duplicate group (in df's order). Returns (df, stats)."""
+    deduper = deduper or FuzzyDeduper()
+    before = dict(deduper.stats)
+    if df.empty:
+        return df, {key: 0 for key in before}
+    mask = deduper.keep_mask(df, name_column, address_column)
+    stats = {key: deduper.stats[key] - before[key] for key in before}
+    return df[mask], stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Drop near-duplicate leads (same business, different phone or spelling).")
+    parser.add_argument("input", help="Leads .xlsx or .csv")
+    parser.add_argument("--output", default=None, help="Where to write the deduplicated file (default: report only)")
+    parser.add_argument("--show", type=int, default=10, help="Print this many dropped rows")
+    args = parser.parse_args()
+
+    from lead_schema import read_leads_csv, read_leads_excel
+    df = read_leads_csv(args.input) if args.input.lower().endswith(".csv") else read_leads_excel(args.input)
+    started = time.perf_counter()
+    kept, stats = drop_fuzzy_duplicates(df)
+    logging.info(f"{len(kept)} of {len(df)} rows kept in {time.perf_counter() - started:.1f}s ({stats})")
+    dropped = df.loc[~df.index.isin(kept.index), [c for c in (NAME_COLUMN, ADDRESS_COLUMN, "Phone Number") if c in df.columns]]
+    if args.show and not dropped.empty:
+        print(dropped.head(args.show).to_string())
+    if args.output:
+        if args.output.lower().endswith(".csv"):
+            kept.to_csv(args.output, index=False)
+        else:
+            kept.to_excel(args.output, index=False)
@@ -0,0 +1,147 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+import numpy as np
+
+from lead_schema import read_leads_excel
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_FILES_DIR = "Files"
+DEFAULT_INDEX_FILE = "./Outputs/known_leads.npy"
+KEY_COLUMNS = ["Name of Business", "Business Address", "Phone Number"]
+
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+NAME_NOISE = re.compile(r"[^a-z0-9 ]+")
+
+# =================== KEYS =================== #
+
+def normalize_phone(phone):
+    """'+1 704-555-0101' / '(704) 555-0101' -> '7045550101'; None for placeholders."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def address_zip(address):
+    """Last 5-digit group of an address (the zip in '..., NC 28052, United States')."""
+    matches = ZIP_PATTERN.findall(str(address or ""))
+    return matches[-1] if matches else None
+
+
+def normalize_name(name):
+    text = NAME_NOISE.sub(" ", str(name or "").lower().replace("&", " and "))
+    return " ".join(text.split())
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def phone_key(phone):
+    normalized = normalize_phone(phone)
+    return _hash("p:" + normalized) if normalized else None
+
+
+def name_zip_key(name, zip_code):
+    normalized = normalize_name(name)
+    return _hash(f"n:{normalized}|{zip_code}") if normalized and zip_code else None
+
+# =================== INDEX =================== #
+
+class KnownLeadIndex:
+    """
+    Sorted array of 64-bit hashes of every archived lead's phone and name+zip.
+    8 bytes per key, loaded with np.load and queried with a binary search.
+    """
+
+    def __init__(self, keys):
+        self.keys = np.unique(np.asarray(keys, dtype=np.uint64))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _contains(self, key):
+        if key is None or not len(self.keys):
+            return False
+        key = np.uint64(key)
+        position = np.searchsorted(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+
+    def is_known(self, name=None, address=None, phone=None, zip_code=None):
+        """True if the phone, or the name together with the address's (or the given) zip, is in the archive."""
+        if self._contains(phone_key(phone)):
+            return True
+        return self._contains(name_zip_key(name, zip_code or address_zip(address)))
+
+    def save(self, path, sources):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(path, self.keys)
+        with open(meta_path(path), "w", encoding="utf-8") as f:
+            json.dump({"keys": len(self.keys), "built_at": time.time(), "sources": sources}, f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path))
+
+
+def meta_path(index_path):
+    return os.path.splitext(index_path)[0] + ".json"
+
+
+def archive_sources(files_dir):
+    """{file name: mtime} of the archive workbooks."""
+    return {os.path.basename(p): os.path.getmtime(p) for p in sorted(glob.glob(os.path.join(files_dir, "*.xlsx")))}
+
+
+def build_index(files_dir=DEFAULT_FILES_DIR):
+    """Reads name, address and phone from every workbook in files_dir. Returns (index, sources)."""
+    keys = []
+    sources = archive_sources(files_dir)
+    for file_name in sources:
+        try:
+            df = read_leads_excel(os.path.join(files_dir, file_name), usecols=lambda c: c in KEY_COLUMNS)
+        except Exception as e:
+            logging.warning(f"Known leads: skipping '{file_name}' ({type(e).__name__}: {e})")
+            continue
+        for name, address, phone in zip(df.get("Name of Business", [None] * len(df)),
+                                        df.get("Business Address", [None] * len(df)),
+                                        df.get("Phone Number", [None] * len(df))):
+            for key in (phone_key(phone), name_zip_key(name, address_zip(address))):
+                if key is not None:
+                    keys.append(key)
+    return KnownLeadIndex(keys), sources
+
+
+def load_or_build(index_path=DEFAULT_INDEX_FILE, files_dir=DEFAULT_FILES_DIR):
+    """Loads the index, rebuilding it first when the archive has changed since it was built. None if no archive."""
+    sources = archive_sources(files_dir) if os.path.isdir(files_dir) else {}
+    if os.path.exists(index_path) and os.path.exists(meta_path(index_path)):
+        with open(meta_path(index_path), encoding="utf-8") as f:
+            if json.load(f).get("sources") == sources:
+                return KnownLeadIndex.load(index_path)
+    if not sources:
+        return None
+    started = time.perf_counter()
+    index, sources = build_index(files_dir)
+    index.save(index_path, sources)
+    logging.info(f"Known leads: indexed {len(index)} keys from {len(sources)} files in {time.perf_counter() - started:.1f}s")
+    return index
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build the known-lead key file the scraper uses to skip archived businesses.")
+    parser.add_argument("--files", default=DEFAULT_FILES_DIR, help="Archive folder with lead workbooks")
+    parser.add_argument("--output", default=DEFAULT_INDEX_FILE)
+    args = parser.parse_args()
+    index, sources = build_index(args.files)
+    index.save(args.output, sources)
+    logging.info(f"Wrote {len(index)} keys from {len(sources)} files to '{args.output}'")
@@ -0,0 +1,347 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# =================== LEAD SCHEMA =================== #
+# Shared column layout and memory-lean dtypes for every reader of lead files
+# (scraped CSVs, formatted workbooks in Files/, combined archives).
+
+SOURCE_FILE_COLUMN = "Source File"
+ADDRESS_COLUMN = "Business Address"
+
+# Written by the scraper (UTC ISO time) and derived from Latest Review + Scraped At
+SCRAPED_AT_COLUMN = "Scraped At"
+REVIEW_AGE_COLUMN = "Review Age (Days)"
+
+# Parsed once from Business Address and stored with the leads, so area filters are equality/isin checks
+ADDRESS_PART_COLUMNS = ["Street", "City", "State", "Zip", "Country"]
+
+# Every column a lead file may carry; anything else is dropped on read (usecols)
+LEAD_COLUMNS = [
+    SOURCE_FILE_COLUMN,
+    "Type of Business",
+    "Sub-Category",
+    "Name of Business",
+    "Website",
+    "# of Reviews",
+    "Rating",
+    "Latest Review",
+    "Latest Review Date",
+    "Business Address",
+    "Phone Number",
+    "Notes",
+    "Email",
+    SCRAPED_AT_COLUMN,
+    REVIEW_AGE_COLUMN,
+] + ADDRESS_PART_COLUMNS
+
+# Low-cardinality fields, stored as pandas categoricals (one small code per row)
+CATEGORY_COLUMNS = [SOURCE_FILE_COLUMN, "Type of Business", "Sub-Category", "Rating", "City", "State", "Zip", "Country"]
+
+# Free-text fields, stored as Arrow-backed strings when pyarrow is installed.
+# "# of Reviews" stays text until cleaning because it carries "1,204" and "No reviews";
+# "Scraped At" is a per-listing timestamp, nearly unique per row.
+TEXT_COLUMNS = [
+    "Name of Business", "Website", "# of Reviews", "Latest Review", "Latest Review Date",
+    "Business Address", "Phone Number", "Notes", "Email", "Street", SCRAPED_AT_COLUMN,
+]
+
+
+def _text_dtype():
+    """
+    Arrow-backed string dtype with NaN as the missing value, so comparisons, str.contains(na=False)
+    and astype(str) behave like the object columns they replace. Falls back to object without pyarrow.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return object
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        # pandas < 2.3 spells the NaN-semantics Arrow string dtype differently
+        try:
+            return pd.StringDtype("pyarrow_numpy")
+        except (TypeError, ValueError):
+            return object
+
+
+TEXT_DTYPE = _text_dtype()
+
+
+def is_lead_column(column):
+    return column in LEAD_COLUMNS
+
+
+def read_dtypes():
+    """dtype mapping for pd.read_csv / pd.read_excel. Categoricals are read as text and converted after."""
+    dtypes = {col: TEXT_DTYPE for col in TEXT_COLUMNS}
+    dtypes.update({col: str for col in CATEGORY_COLUMNS})
+    dtypes[REVIEW_AGE_COLUMN] = "Int32"
+    return dtypes
+
+
+def apply_lead_dtypes(df):
+    """Converts the known lead columns of df to the lean schema in place and returns it."""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in TEXT_COLUMNS:
+        if col in df.columns and df[col].dtype == object and TEXT_DTYPE is not object:
+            df[col] = df[col].astype(TEXT_DTYPE)
+    return df
+
+
+def read_leads_csv(path, **kwargs):
+    """pd.read_csv with the lead schema. With chunksize, yields chunks that are already converted."""
+    kwargs.setdefault("usecols", is_lead_column)
+    kwargs.setdefault("dtype", read_dtypes())
+    reader = pd.read_csv(path, **kwargs)
+    if kwargs.get("chunksize"):
+        return (apply_lead_dtypes(chunk) for chunk in reader)
+    return apply_lead_dtypes(reader)
+
+
+def read_leads_excel(path, **kwargs):
+    kwargs.setdefault("usecols", is_lead_column)
+    kwargs.setdefault("dtype", read_dtypes())
+    kwargs.setdefault("engine", "openpyxl")
+    return apply_lead_dtypes(pd.read_excel(path, **kwargs))
+
+
+def leads_frame(records):
+    """
+    DataFrame from scraped lead dicts with the same columns and dtypes read_leads_csv would give them,
+    so in-process records go through the cleaning code exactly like the CSV round trip did.
+    """
+    df = pd.DataFrame.from_records(records)
+    df = df[[col for col in df.columns if is_lead_column(col)]]
+    for col in df.columns:
+        # read_csv sees every field as text and empty fields as missing
+        df[col] = df[col].map(lambda value: np.nan if value is None or value == "" else str(value))
+    if REVIEW_AGE_COLUMN in df.columns:
+        df[REVIEW_AGE_COLUMN] = pd.to_numeric(df[REVIEW_AGE_COLUMN]).astype("Int32")
+    return apply_lead_dtypes(df)
+
+
+def concat_leads(frames):
+    """pd.concat that keeps categorical columns categorical (plain concat falls back to object
+    whenever the frames' categories differ)."""
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        return pd.DataFrame()
+    for col in CATEGORY_COLUMNS:
+        parts = [f[col] for f in frames if col in f.columns]
+        if len(parts) < 2 or not all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            continue
+        categories = pd.api.types.union_categoricals([p.astype("category") for p in parts]).categories
+        for f in frames:
+            if col in f.columns:
+                f[col] = f[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+# =================== TEXT HELPERS =================== #
+
+def _map_categories(series, func):
+    """Applies func to each category (not each row) and merges categories that collide."""
+    categories = series.cat.categories
+    if len(categories) == 0:
+        return series
+    mapped = pd.Index([func(c) for c in categories])
+    merged = pd.Index(mapped.unique())
+    new_codes = merged.get_indexer(mapped)
+    codes = series.cat.codes.to_numpy()
+    out_codes = np.where(codes >= 0, new_codes[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(out_codes, categories=merged), index=series.index, name=series.name)
+
+
+def as_str(series):
+    """series.astype(str) semantics (missing -> 'nan') that keeps categoricals and Arrow strings compact."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.isna().any():
+            if "nan" not in series.cat.categories:
+                series = series.cat.add_categories("nan")
+            series = series.fillna("nan")
+        return _map_categories(series, str)
+    if isinstance(series.dtype, pd.StringDtype):
+        return series.fillna("nan")
+    return series.astype(str)
+
+
+def lower_text(series):
+    """str.lower() that works category-by-category on categoricals."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _map_categories(series, lambda c: c.lower() if isinstance(c, str) else c)
+    return series.str.lower()
+
+
+def title_text(series):
+    """fillna('').astype(str).str.title(), category-by-category on categoricals."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.isna().any():
+            if "" not in series.cat.categories:
+                series = series.cat.add_categories("")
+            series = series.fillna("")
+        return _map_categories(series, lambda c: str(c).title())
+    return as_str(series.fillna("")).str.title()
+
+
+def not_equal_ci(series, value):
+    """Boolean mask: series.astype(str).str.lower() != value.lower(), evaluated per category when possible."""
+    value = value.lower()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        differs = np.array([str(c).lower() != value for c in categories] + [value != "nan"])
+        return pd.Series(differs[series.cat.codes.to_numpy()], index=series.index)
+    return as_str(series).str.lower() != value
+
+
+# =================== ADDRESS HELPERS =================== #
+
+# '123 Main St, Suite 4, Belmont, NC 28012, United States' -> street / city / state / zip / country.
+# The street keeps every leading component; the country is optional.
+ADDRESS_PATTERN = re.compile(
+    r"^\s*(?:(?P<Street>.+?),\s*)?(?P<City>[^,]+?),\s*(?P<State>[A-Z]{2})\s+(?P<Zip>\d{5})(?:-\d{4})?"
+    r"(?:,\s*(?P<Country>[^,]+?))?\s*$"
+)
+
+
+US_STATE_CODES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA", "colorado": "CO",
+    "connecticut": "CT", "delaware": "DE", "district of columbia": "DC", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA", "kansas": "KS",
+    "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD", "massachusetts": "MA",
+    "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO", "montana": "MT",
+    "nebraska": "NE", "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM",
+    "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK",
+    "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA", "washington": "WA",
+    "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+
+
+def state_codes(states):
+    """['nc', 'South Carolina'] -> ['NC', 'SC'] (the form the State column holds)."""
+    codes = []
+    for state in states:
+        text = str(state).strip()
+        code = US_STATE_CODES.get(text.lower(), text.upper())
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def parse_addresses(series):
+    """One vectorized regex pass over an address column. Returns a frame with ADDRESS_PART_COLUMNS
+    (NaN where the address does not have that shape), with the low-cardinality parts as categoricals."""
+    parts = as_str(series).astype(object).str.extract(ADDRESS_PATTERN)
+    for col in ADDRESS_PART_COLUMNS:
+        parts[col] = parts[col].astype("category") if col in CATEGORY_COLUMNS else parts[col].astype(TEXT_DTYPE)
+    return parts
+
+
+def in_countries(df, countries):
+    """
+    Boolean mask of rows whose parsed Country is one of countries. Addresses the pattern cannot split
+    (no zip, a spelled-out state) have no Country; for them the original substring check on the
+    address decides, so they are kept as before.
+    """
+    mask = df["Country"].isin(countries)
+    unparsed = df["Country"].isna()
+    if ADDRESS_COLUMN in df.columns and unparsed.any():
+        pattern = "|".join(re.escape(c) for c in countries)
+        mask |= unparsed & as_str(df[ADDRESS_COLUMN]).str.contains(pattern, case=True, na=False)
+    return mask
+
+
+def add_address_columns(df):
+    """Fills ADDRESS_PART_COLUMNS from Business Address for rows that do not have them yet (in place)."""
+    if ADDRESS_COLUMN not in df.columns:
+        return df
+    if all(col in df.columns for col in ADDRESS_PART_COLUMNS):
+        missing = df["State"].isna() & df[ADDRESS_COLUMN].notna()
+        if not missing.any():
+            return df
+    else:
+        missing = pd.Series(True, index=df.index)
+    parts = parse_addresses(df.loc[missing, ADDRESS_COLUMN])
+    if missing.all():
+        for col in ADDRESS_PART_COLUMNS:
+            df[col] = parts[col]
+        return df
+    for col in ADDRESS_PART_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.Series(np.nan, index=df.index, dtype=parts[col].dtype)
+        combined = df[col].astype(object)
+        combined.loc[missing] = parts[col].astype(object)
+        df[col] = combined.astype(parts[col].dtype if col not in CATEGORY_COLUMNS else "category")
+    return df
+
+
+def isin_ci(series, values):
+    """Case-insensitive isin, evaluated per category on categoricals."""
+    wanted = {str(v).lower() for v in values}
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        matches = np.array([str(c).lower() in wanted for c in series.cat.categories] + [False])
+        return pd.Series(matches[series.cat.codes.to_numpy()], index=series.index)
+    return series.str.lower().isin(wanted).fillna(False).astype(bool)
+
+
+# =================== REVIEW AGE =================== #
+
+# '3 weeks ago' / 'a year ago' / 'Edited 2 months ago' -> amount + unit
+RELATIVE_AGE_PATTERN = re.compile(r"\b(\d+|an?|one)\s+(minute|hour|day|week|month|year)s?\s+ago\b", re.IGNORECASE)
+AGE_UNIT_DAYS = {"minute": 0, "hour": 0, "day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def relative_age_days(text):
+    """'3 weeks ago' -> 21, 'a year ago' -> 365; None when the text is not a relative age."""
+    match = RELATIVE_AGE_PATTERN.search(str(text))
+    if not match:
+        return None
+    amount, unit = match.groups()
+    amount = int(amount) if amount.isdigit() else 1
+    return amount * AGE_UNIT_DAYS[unit.lower()]
+
+
+def review_age_days(latest_review, scraped_at=None, now=None):
+    """
+    Approximate review age in days (nullable Int32). The relative text is parsed once per distinct value
+    (review dates repeat heavily), and, where Scraped At is known, the days since the scrape are added so
+    the age stays correct for older files.
+    """
+    codes, uniques = pd.factorize(as_str(latest_review).astype(object))
+    parsed = np.array([relative_age_days(text) for text in uniques] + [None], dtype="float64")
+    ages = pd.Series(parsed[codes], index=latest_review.index)
+    if scraped_at is not None:
+        scraped = pd.to_datetime(as_str(scraped_at).astype(object).replace("nan", None), utc=True, errors="coerce")
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        elapsed = ((now - scraped).dt.total_seconds() // 86400).clip(lower=0).fillna(0)
+        ages = ages + elapsed.to_numpy()
+    return ages.round().astype("Int32")
+
+
+# =================== NUMERIC HELPERS =================== #
+
+def to_review_count(series):
+    """'1,204' -> 1204; placeholders and blanks -> 0."""
+    cleaned = as_str(series).str.replace(",", "", regex=False)
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0).astype("int32")
+
+
+def to_rating(series):
+    """'4.5' -> 4.5 as float; placeholders become NaN."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.to_numeric(pd.Series(series.cat.categories.astype(str)), errors="coerce").to_numpy(dtype="float64")
+        if len(categories) == 0:
+            return pd.Series(np.nan, index=series.index, name=series.name, dtype="float64")
+        codes = series.cat.codes.to_numpy()
+        values = np.where(codes >= 0, categories[codes], np.nan).astype("float64")
+        return pd.Series(values, index=series.index, name=series.name)
+    return pd.to_numeric(series, errors="coerce").astype("float64")
+
+
+def memory_usage_mb(df):
+    return round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
@@ -0,0 +1,158 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+
+import pandas as pd
+
+import formatter
+from fuzzy_dedup import FuzzyDeduper
+from lead_schema import SCRAPED_AT_COLUMN, as_str, concat_leads, leads_frame
+
+# =================== CONFIGURATION =================== #
+
+# The backend's SQLite database (src/database/setup.js creates the leads table)
+DEFAULT_LEAD_DB = os.environ.get("DATABASE_URL", "./data/leads.db")
+SCRAPED_NEW_SOURCE_NAME = "Scraped New"
+
+# Query batches waiting for the consumer thread; scraper workers block (briefly) beyond this
+MAX_PENDING_BATCHES = 64
+
+# leads table column <- formatted lead column
+STORE_COLUMNS = {
+    "name_of_business": "Name of Business",
+    "type_of_business": "Type of Business",
+    "sub_category": "Sub-Category",
+    "website": "Website",
+    "num_reviews": "# of Reviews",
+    "rating": "Rating",
+    "latest_review": "Latest Review",
+    "business_address": "Business Address",
+    "phone_number": "Phone Number",
+    "zip_code": "Zip",
+    "state": "State",
+    "city": "City",
+    "scraped_at": SCRAPED_AT_COLUMN,
+}
+
+# =================== LEAD STORE =================== #
+
+class LeadStore:
+    """Upserts cleaned leads into the backend's leads table (one row per phone number)."""
+
+    def __init__(self, path=DEFAULT_LEAD_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leads'").fetchone()
+        if not exists:
+            self.conn.close()
+            raise RuntimeError(f"No leads table in '{path}' (start the backend once to create the database)")
+        columns = list(STORE_COLUMNS) + ["source_file"]
+        updates = ", ".join(f"{col} = excluded.{col}" for col in STORE_COLUMNS if col != "phone_number")
+        # A lead already in the store keeps its original source file (archive lists outrank "Scraped New")
+        self.sql = (f"INSERT INTO leads ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+                    f"ON CONFLICT (phone_number) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP")
+
+    def close(self):
+        self.conn.close()
+
+    def upsert(self, df):
+        values = []
+        for col in STORE_COLUMNS.values():
+            if col not in df.columns:
+                values.append([None] * len(df))
+            elif col == "# of Reviews":
+                values.append([int(v) if pd.notna(v) else None for v in df[col]])
+            elif col == "Rating":
+                values.append(pd.to_numeric(as_str(df[col]), errors="coerce").astype(object)
+                              .where(lambda r: r.notna(), None).tolist())
+            else:
+                values.append(as_str(df[col]).astype(object).where(lambda s: s.notna(), None).tolist())
+        values.append([SCRAPED_NEW_SOURCE_NAME] * len(df))
+        with self.conn:
+            self.conn.executemany(self.sql, zip(*values))
+        return len(df)
+
+
+def lead_records(df):
+    """Formatted rows as JSON-ready dicts (missing values as None)."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+# =================== PIPELINE =================== #
+
+class StreamingLeadPipeline:
+    """
+    Scraped leads -> the formatter's cleaning, dedup and filter rules -> lead store and formatted output,
+    in-process. Scraper threads put() one query's leads at a time; a single consumer thread runs each batch
+    through the rules, so the dedup state needs no locks and workers never wait on pandas or SQLite.
+    """
+
+    def __init__(self, output_file=None, store=None, on_lead=None, fallback=None, max_pending=MAX_PENDING_BATCHES):
+        self.output_file = output_file
+        self.store = store
+        self.on_lead = on_lead
+        self.fallback = fallback
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.totals = formatter.StatusTotals()
+        self.seen_phones = set()
+        self.deduper = FuzzyDeduper()
+        self.kept = []
+        self.stats = {"batches": 0, "received": 0, "kept": 0, "stored": 0, "failed_batches": 0}
+        self.thread = threading.Thread(target=self._run, name="lead-stream", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def put(self, leads):
+        if leads:
+            self.queue.put(list(leads))
+
+    def _run(self):
+        while True:
+            records = self.queue.get()
+            if records is None:
+                return
+            self.stats["batches"] += 1
+            self.stats["received"] += len(records)
+            try:
+                self._process(records)
+            except Exception as e:
+                self.stats["failed_batches"] += 1
+                logging.error(f"Lead stream: batch of {len(records)} leads failed: {type(e).__name__}: {e}")
+                if self.fallback is not None:
+                    # Keep the raw leads (e.g. in the scraper CSV) rather than lose them
+                    self.fallback(records)
+
+    def _process(self, records):
+        df = leads_frame(records)
+        df = formatter.apply_row_filters(df, report=self.totals)
+        df = formatter.drop_seen_phone_numbers(df, self.seen_phones, report=self.totals)
+        df = formatter.drop_near_duplicates(df, self.deduper, report=self.totals)
+        df = formatter.apply_area_and_business_filters(df, report=self.totals, verbose=False)
+        if df.empty:
+            return
+        if self.store is not None:
+            self.stats["stored"] += self.store.upsert(df)
+        if self.on_lead is not None:
+            for record in lead_records(df):
+                self.on_lead(record)
+        self.stats["kept"] += len(df)
+        self.kept.append(df)
+
+    def close(self):
+        """Drains the queue, writes the sorted output file and returns the run's stats."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.store is not None:
+            self.store.close()
+        if self.output_file and self.kept:
+            df = formatter.sort_leads(concat_leads(self.kept))
+            directory = os.path.dirname(self.output_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            formatter.save_to_excel(df, self.output_file)
+            logging.info(f"Lead stream: {len(df)} formatted leads written to '{self.output_file}'")
+        self.stats["steps"] = dict(self.totals.totals)
+        return self.stats
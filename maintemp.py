@@ -11,185 +11,513 @@ from threading import Lock
 import threading
 import ast
 import time
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from datetime import datetime, timezone
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
 import psutil
 import queue
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import logging
+import argparse
+import os
+import sqlite3
+import uuid
+from scraper_telemetry import ScraperTelemetry, error_fields
+from browser_profile import CacheSlots, build_chrome_options, apply_lean_profile
+from maps_payload import PayloadCapture
+from scraper_retry import RetryPolicy, DriverDeadError, classify, DEAD_DRIVER
+from scraper_watchdog import BrowserWatchdog, DEFAULT_MAX_QUERY_SECONDS, DEFAULT_MAX_BROWSER_RSS_MB
+from scraper_governor import RateGovernor, page_is_throttled, page_needs_consent, DEFAULT_QUERY_RATE, DEFAULT_BURST
+from query_planner import QueryHistory, plan_queries, query_location, query_key, parse_query_line, DEFAULT_HISTORY_FILE
+from known_leads import load_or_build, address_zip, DEFAULT_INDEX_FILE, DEFAULT_FILES_DIR
+from lead_stream import StreamingLeadPipeline, LeadStore, DEFAULT_LEAD_DB
+from review_fetcher import ReviewDateFetcher, DEFAULT_REVIEW_SESSIONS, DRAIN_TIMEOUT_S as REVIEW_DRAIN_TIMEOUT_S
+from place_claims import PlaceClaims, open_place_claims, place_key
+from scraper_deadline import RunDeadline, install_stop_handler, DEADLINE_STATUS
+from work_queue import (open_work_queue, LeaseKeeper, default_worker_id, DEFAULT_BATCH, DEFAULT_LEASE_S,
+                        POLL_INTERVAL_S as WORK_QUEUE_POLL_S)
+from scraper_autoscale import (WorkerAutoscaler, DEFAULT_MIN_WORKERS, DEFAULT_MAX_WORKERS,
+                               DEFAULT_INITIAL_WORKERS, DEFAULT_CPU_CEILING)
 
 
 MAX_QUERIES=15
 
+# Maps entry point and chromedriver binary. Point these at maps_replay_server.py for offline benchmarks.
+MAPS_BASE_URL = os.environ.get("MAPS_BASE_URL", "https://www.google.com/maps")
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH", "C:\\chromedriver-win64\\chromedriver.exe")
+
+# Lean browser profile: no images/tiles/fonts/media, smaller viewport, per-worker disk cache
+LEAN_BROWSER = os.environ.get("SCRAPER_LEAN_BROWSER", "1") != "0"
+
+# "payload" reads listing fields from the Maps search responses and only clicks cards for review dates;
+# "dom" parses every detail panel's page_source
+EXTRACTION_MODE = os.environ.get("SCRAPER_EXTRACTION", "dom")
+
+# Browser worker ceilings. The autoscaler moves between them based on CPU, Chrome RSS and query latency.
+MIN_WORKERS = int(os.environ.get("SCRAPER_MIN_WORKERS", DEFAULT_MIN_WORKERS))
+MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+CPU_CEILING = float(os.environ.get("SCRAPER_CPU_CEILING", DEFAULT_CPU_CEILING))
+MEMORY_CEILING_MB = float(os.environ["SCRAPER_MEMORY_CEILING_MB"]) if os.environ.get("SCRAPER_MEMORY_CEILING_MB") else None
+AUTOSCALE_INTERVAL = 5  # Seconds between resource checks while workers are busy
+
+# Per-query browser limits enforced by the watchdog. A query whose browser was killed or died
+# is retried once on a fresh browser.
+MAX_QUERY_SECONDS = float(os.environ.get("SCRAPER_MAX_QUERY_SECONDS", DEFAULT_MAX_QUERY_SECONDS))
+MAX_BROWSER_RSS_MB = float(os.environ.get("SCRAPER_MAX_BROWSER_RSS_MB", DEFAULT_MAX_BROWSER_RSS_MB))
+REAPED_QUERY_RETRIES = 1
+RETRYABLE_QUERY_STATUSES = ("reaped", "driver_dead")
+
+# Shared pacing of query starts (per minute, all workers together; 0 disables) and Maps wait budgets
+QUERY_RATE = float(os.environ.get("SCRAPER_QUERY_RATE", DEFAULT_QUERY_RATE))
+SEARCH_ATTEMPTS = 3
+SEARCHBOX_TIMEOUT = 20
+RESULTS_TIMEOUT = 20
+
+# Businesses already in the Files/ archive (phone, or name + the listing's own zip) are skipped before the
+# review sort, and before the detail click when the search payload already has their phone and address
+KNOWN_LEADS_FILE = os.environ.get("SCRAPER_KNOWN_LEADS", DEFAULT_INDEX_FILE)
+
+# Streaming mode: each query's leads go straight through the formatter rules into the lead store
+# and a formatted workbook, instead of being appended to the CSV for formatter.py to re-read
+STREAM_PIPELINE = os.environ.get("SCRAPER_STREAM", "0") == "1"
+STREAM_OUTPUT_FILE = "./Files/default29.xlsx"
+
+# Secondary browsers per query that open place URLs and sort reviews while the primary one keeps
+# walking the result list (0 = the primary browser sorts each listing's reviews itself)
+REVIEW_SESSIONS = int(os.environ.get("SCRAPER_REVIEW_SESSIONS", DEFAULT_REVIEW_SESSIONS))
+
+# Shared work queue: hosts started with the same queue and batch lease queries from it one at a time
+# instead of splitting a fixed list, so a slow or dead host's queries are picked up by the others
+WORK_QUEUE = os.environ.get("SCRAPER_WORK_QUEUE", "")
+WORK_BATCH = os.environ.get("SCRAPER_BATCH", DEFAULT_BATCH)
+WORKER_ID = os.environ.get("SCRAPER_WORKER_ID") or default_worker_id()
+LEASE_SECONDS = float(os.environ.get("SCRAPER_LEASE_SECONDS", DEFAULT_LEASE_S))
+
+# Seconds the run has (0 = no deadline). Queries that could not collect a few listings in the time left are
+# not started, result limits shrink as the end nears, and collected leads are written before it.
+# SIGTERM ends the run the same way.
+DEADLINE_SECONDS = float(os.environ.get("SCRAPER_DEADLINE_SECONDS", 0))
+
+# Listings are claimed by place URL before a worker opens them; a listing another worker of the run already
+# claimed (overlapping neighbour-zip queries) is skipped. "" keeps the claims in this process; a path or
+# 'sqlite:<path>' shares them between processes (defaults to the work queue's file when one is used).
+PLACE_CLAIMS = os.environ.get("SCRAPER_PLACE_CLAIMS", "")
+
 
 # Lock for thread-safe CSV writing
 csv_lock = Lock()
 
-def click_element(driver, element):
-    """Wait for an element to be clickable, click it, and wait for the Reviews tab to appear."""
-    try:
-        
-        driver.execute_script("arguments[0].scrollIntoView();", element)
-        time.sleep(1) 
-        WebDriverWait(driver, 5).until(EC.element_to_be_clickable(element)).click()
-        time.sleep(1)  # Allow details to load
-    except Exception as e:
-        print(f"Error while clicking element or waiting for Reviews tab: ")
+# Review panel selectors
+REVIEWS_TAB_XPATH = "//button[contains(@aria-label, 'Reviews')]"
+SORT_BUTTON_XPATH = "//button[contains(@aria-label, 'Sort reviews') or contains(@aria-label, 'Most relevant')]"
+NEWEST_SELECTORS = [
+    "//div[@role='menuitemradio' and contains(.//text(), 'Newest')]",
+    "//div[contains(text(), 'Newest')]",
+]
+FIRST_REVIEW_DATE_XPATH = "//div[contains(@class, 'jJc9Ad')][1]//span[contains(@class, 'rsqaWe') or contains(@class, 'xRkPPb')]"
+DATE_SELECTORS = [
+    "//span[contains(@class, 'rsqaWe') or contains(@class, 'xRkPPb')][1]",  # Primary
+    "//div[contains(text(), 'ago')][1]",  # Relative time
+]
+CATEGORY_FALLBACK_XPATHS = [
+    "//button[contains(@class, 'DkEaL')]",
+    "//span[contains(@class, 'mgr77e')]//span[contains(text(), 'star')]",
+]
+
+# JSON-lines timing events (per query and per lead), summarised at the end of the run
+telemetry = ScraperTelemetry()
+
+# Classified Selenium failure handling: stale -> re-find, absent -> placeholder, dead driver -> abort query
+retry = RetryPolicy(on_failure=lambda kind, label: telemetry.count(f"failures_{kind}"))
+
+# Leads and duration per normalized query, recorded for the query planner (None = not recorded)
+query_history = None
+
+# Archive membership index (None = known-lead filter off)
+known_leads = None
+
+# In-process cleaning/storage of scraped leads (None = append to the CSV)
+lead_pipeline = None
+
+# Token bucket and global backoff shared by every worker thread
+governor = RateGovernor(QUERY_RATE, DEFAULT_BURST, on_event=lambda event, **fields: telemetry.emit(event, **fields))
+
+# Kills browsers that run past MAX_QUERY_SECONDS or MAX_BROWSER_RSS_MB and reaps leaked Chrome processes
+watchdog = BrowserWatchdog(MAX_QUERY_SECONDS, MAX_BROWSER_RSS_MB, on_event=lambda event, **fields: telemetry.emit(event, **fields))
+
+# Disk cache directories of the lean browsers, reused by slot across queries and runs
+cache_slots = CacheSlots()
+
+# Time left in the run, shared by the scheduler and every worker (no deadline unless --deadline is given)
+run_deadline = RunDeadline(DEADLINE_SECONDS)
+
+# Listings claimed by this run's workers (None with --no_place_claims: every query scrapes every card it finds)
+place_claims = PlaceClaims()
+
+def click_element(driver, element, refind=None):
+    """
+    Scroll to an element and click it (JavaScript click if something overlaps it).
+    If the element goes stale, refind() supplies a fresh reference and the click is retried at once.
+    """
+    def click():
+        nonlocal element
+        try:
+            driver.execute_script("arguments[0].scrollIntoView();", element)
+            time.sleep(1)
+            WebDriverWait(driver, 5).until(EC.element_to_be_clickable(element)).click()
+        except StaleElementReferenceException:
+            if refind is not None:
+                element = refind()
+            raise
+
+    retry.run(click, "click_card", fallback=lambda: driver.execute_script("arguments[0].click();", element))
+    time.sleep(1)  # Allow details to load
 
 def click_element_js(driver, element):
     """Click an element using JavaScript to bypass overlays."""
+    retry.optional(lambda: driver.execute_script("arguments[0].click();", element), "js_click", None)
+
+
+def card_place_href(result):
+    """The place URL of a result card (its a.hfpxzc link), or None."""
     try:
-        # driver.execute_script("arguments[0].scrollIntoView();", element)
-        
-        driver.execute_script("arguments[0].click();", element)
-    except Exception as e:
-        print(f"JavaScript click failed: ")
+        return result.find_element(By.CLASS_NAME, "hfpxzc").get_attribute("href")
+    except NoSuchElementException:
+        return None
+
+def usable_payload(lead):
+    """
+    A payload lead whose fields can stand in for the detail panel, or None. Without a country its address
+    would fail the formatter's US filter, so the listing is read from the DOM instead.
+    """
+    if lead is not None and not lead.get("country"):
+        telemetry.count("payload_no_country")
+        return None
+    return lead
+
+def find_result_card(driver, name):
+    """Re-finds the result card with this business name after the list re-rendered."""
+    for card in driver.find_elements(By.CLASS_NAME, "Nv2PK"):
+        if card.find_element(By.CLASS_NAME, "qBF1Pd").text == name:
+            return card
+    raise NoSuchElementException(f"Result card for '{name}' is no longer in the list")
 
 
 def handle_reviews(driver):
     latest_review_date = "No review date"
-    max_retries = 3
-    retry_delay = 1.5  # Increased delay between retries
     time.sleep(1)
+
+    # Phase 1: open the Reviews tab. A listing without one has no reviews, so there is nothing to retry.
+    opened = retry.optional(lambda: driver.find_element(By.XPATH, REVIEWS_TAB_XPATH).click() or True,
+                            "reviews_tab", False)
+    if not opened:
+        return latest_review_date
+
+    # Phase 2: open the sort menu. Every attempt looks the button up again, so stale references are cheap.
+    def click_sort_button():
+        sort_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, SORT_BUTTON_XPATH)))
+        time.sleep(1)  # Allow for smooth scrolling
+        sort_button.click()
+        return True
+
+    def js_click_sort_button():
+        driver.execute_script("arguments[0].click();", driver.find_element(By.XPATH, SORT_BUTTON_XPATH))
+        return True
+
+    if not retry.optional(lambda: retry.run(click_sort_button, "sort_button", fallback=js_click_sort_button),
+                          "sort_button", False):
+        return latest_review_date
+
+    # Phase 3: select "Newest"; a selector that matches nothing moves straight on to the next one
+    for selector in NEWEST_SELECTORS:
+        time.sleep(0.3)
+        clicked = retry.optional(
+            lambda: driver.execute_script("arguments[0].click();", driver.find_element(By.XPATH, selector)) or True,
+            "newest_option", False)
+        if clicked:
+            break
+    else:
+        print("All newest selectors failed")
+        return latest_review_date
+
+    # Phase 4: wait for the re-sorted list; if it never settles, read whatever is shown
+    retry.optional(lambda: WebDriverWait(driver, 15).until(lambda d: d.find_element(By.XPATH, FIRST_REVIEW_DATE_XPATH)),
+                   "review_list", None)
+
+    # Phase 5: date extraction, one wait per selector
+    for selector in DATE_SELECTORS:
+        date_text = retry.optional(
+            lambda: WebDriverWait(driver, 3).until(EC.visibility_of_element_located((By.XPATH, selector))).text.strip(),
+            "review_date", None)
+        if date_text:
+            return date_text
+        print(f"Date selector failed: {selector} ")
+
+    return latest_review_date
+
+def wait_for_maps(driver, locator, timeout):
+    """
+    Waits for locator like WebDriverWait, but gives up early when this page shows a captcha / sorry page
+    or another worker has triggered a global pause. Returns "found", "throttled", "consent", "paused" or "timeout".
+    """
+    def outcome(d):
+        if governor.paused():
+            return "paused"
+        if d.find_elements(*locator):
+            return "found"
+        if page_needs_consent(d):
+            return "consent"
+        if page_is_throttled(d):
+            return "throttled"
+        return False
+
     try:
-        review_buttons = driver.find_element(By.XPATH, "//button[contains(@aria-label, 'Reviews')]")
-        
-        review_buttons.click()
-                # time.sleep(retry_delay * (attempt+1))
+        return WebDriverWait(driver, timeout, poll_frequency=1).until(outcome)
+    except TimeoutException:
+        if page_needs_consent(driver):
+            return "consent"
+        return "throttled" if page_is_throttled(driver, check_text=True) else "timeout"
 
-        # Phase 2: Sorting interaction with hybrid waits
-        sorting_success = False
-        for attempt in range(max_retries+1):
-            try:
-                
-                
-                # Get fresh sort button reference
-                sort_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, 
-                        "//button[contains(@aria-label, 'Sort reviews') or contains(@aria-label, 'Most relevant')]"))
-                )
-                
-                # Scroll and click with visual verification
-                
-                time.sleep(1)  # Allow for smooth scrolling
-                sort_button.click()
-                sorting_success = True
-                break
-                
-            except Exception as e:
-                if attempt == max_retries:
-                    raise
-                time.sleep(retry_delay * (attempt+1))
-
-        if not sorting_success:
-            return latest_review_date
-
-        # Phase 3: Select newest with multiple fallback strategies
-        newest_selectors = [
-            "//div[contains(text(), 'Newest')]",  # Primary selector
-            "//div[contains(text(), 'Newest')]",  # Fallback 1
-            "//div[@role='menuitemradio' and contains(.//text(), 'Newest')]"  # Fallback 2
-        ]
-        
-        for selector in newest_selectors:
-            try:
-                time.sleep(0.3)  
-                newest_option = driver.find_element(By.XPATH, selector)
-                driver.execute_script("arguments[0].click();", newest_option)
-                break
-            except Exception as e:
-                # print(f"Newest selector failed:")
-                time.sleep(0.3)
-                newest_option = driver.find_element(By.XPATH, selector)
-                newest_option.click()
-                
-        else:
-            print("All newest selectors failed")
-            return latest_review_date
+
+def load_search_results(driver, search_query, query_timings):
+    """
+    Opens Maps, submits the search and waits for result cards, pacing attempts through the shared governor.
+    Returns "found", "no_results" or "throttled"; raises TimeoutException if the search box never loads.
+    """
+    stage = "searchbox"
+    attempt = 0
+    while attempt < SEARCH_ATTEMPTS:
+        with telemetry.stage("rate_wait", query_timings):
+            governor.acquire()
+        with telemetry.stage("search_load", query_timings):
+            driver.get(MAPS_BASE_URL)
+            stage = "searchbox"
+            outcome = wait_for_maps(driver, (By.ID, "searchboxinput"), SEARCHBOX_TIMEOUT)
+            if outcome == "found":
+                search_box = driver.find_element(By.ID, "searchboxinput")
+                search_box.send_keys(search_query)
+                search_box.send_keys(Keys.ENTER)
+                stage = "results"
+                outcome = wait_for_maps(driver, (By.CLASS_NAME, "Nv2PK"), RESULTS_TIMEOUT)
+                if outcome == "found":
+                    governor.report_success()
+                    return "found"
+
+        if outcome == "throttled":
+            telemetry.count("throttle_signals")
+            governor.report_throttle("captcha", query=search_query, stage=stage)
+        elif outcome == "consent":
+            # Cookie-consent page, not rate limiting: retry this query without pausing anyone
+            telemetry.count("consent_pages")
+        elif outcome == "timeout":
+            governor.report_timeout(stage)
+        # Being cut short by another worker's throttle signal does not use up an attempt
+        if outcome != "paused":
+            attempt += 1
+        if attempt < SEARCH_ATTEMPTS:
+            print(f"Maps {stage} not ready ({outcome}). Retrying... Attempt {attempt}/{SEARCH_ATTEMPTS}")
+            # Every worker sits out a global pause together instead of stacking its own timeouts
+            with telemetry.stage("rate_wait", query_timings):
+                governor.wait_until_clear()
+
+    if stage == "searchbox":
+        raise TimeoutException(f"Google Maps search box did not load after {SEARCH_ATTEMPTS} attempts")
+    print(f"Failed to locate results after {SEARCH_ATTEMPTS} attempts. Skipping query: {search_query}")
+    return "throttled" if outcome == "throttled" else "no_results"
+
+
+def extract_lead_details(driver, result):
+    """Reads the open detail panel (and the result card for rating/reviews). Missing fields keep their placeholder."""
+    rating = "No rating"
+    address = "No address"
+    phone = "No phone number"
+    category = "No category"
+    website = "No website"
+    detail_soup = BeautifulSoup(driver.page_source, 'html.parser')
+    # Extract review count and rating
+    reviews = retry.optional(lambda: result.find_element(By.CLASS_NAME, "UY7F9").text, "card_reviews", "No reviews")
+    rating = retry.optional(lambda: result.find_element(By.CLASS_NAME, "MW4etd").text, "card_rating", "No ratings")
+
+    reviews = reviews.replace('(', '').replace(')', '')
+
+    # Extract address
+    address_element = detail_soup.find('div', class_='Io6YTe')
+    if address_element:
+        address = address_element.text.strip()
+
+    if address=='No address':
+        address = retry.optional(lambda: driver.find_element(By.XPATH,
+            "//div[contains(@class, 'Io6YTe ') and contains(@class, 'fontBodyMedium ') and contains(text(), 'United')]"
+            ).text.strip(), "address", address)
+
+    # Extract phone number
+    phone_elements = detail_soup.find_all('div', class_='Io6YTe')
+    for div in phone_elements:
+        if div.text.startswith('+') or div.text.replace('-', '').isdigit():
+            phone = div.text.strip()
+            break
+
+    if phone=='No phone number':
+        phone = retry.optional(lambda: driver.find_element(By.XPATH,
+            "//div[contains(@class, 'Io6YTe ') and contains(@class, 'fontBodyMedium ') and contains(text(), '+1')]"
+            ).text.strip(), "phone", phone)
+
+    # Extract category (Primary Method, then the live DOM)
+    category_div = detail_soup.find('button', class_='DkEaL')
+    if category_div:
+        category = category_div.text.strip()
+
+    for selector in CATEGORY_FALLBACK_XPATHS:
+        if category != "No category":
+            break
+        category = retry.optional(lambda: driver.find_element(By.XPATH, selector).text.strip(), "category", category)
+
+    # Extract website
+    website_div = detail_soup.find('div', class_='rogA2c ITvuef')
+    if website_div:
+        website_inner_div = website_div.find('div')
+        if website_inner_div:
+            website = website_inner_div.text.strip()
+
+        if website=='No website':
+            website = retry.optional(lambda: driver.find_element(By.XPATH,
+                "//div[contains(@class, 'Io6YTe') and contains(@class, 'fontBodyMedium') and "
+                "(contains(text(), '.gov') or contains(text(), '.org') or contains(text(), '.edu') or contains(text(), '.com') or contains(text(), '.net'))]"
+                ).text.strip(), "website", website)
+
+    return {'category': category, 'website': website, 'reviews': reviews, 'rating': rating,
+            'address': address, 'phone': phone}
+
+LEAD_FIELDS = [
+    'Type of Business', 'Sub-Category', 'Name of Business', 'Website',
+    '# of Reviews', 'Rating', 'Latest Review Date', 'Business Address', 'Phone Number', 'Scraped At'
+]
+
+def write_leads(output_file, leads):
+    """Hands one query's leads to the streaming pipeline, or appends them to the CSV."""
+    if lead_pipeline is not None:
+        lead_pipeline.put(leads)
+        return
+    append_leads_csv(output_file, leads)
+
+def append_leads_csv(output_file, leads):
+    """Appends leads to the CSV under csv_lock."""
+    with csv_lock:
+        fieldnames = LEAD_FIELDS
+        if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            # Appending to an older file: keep its column layout
+            with open(output_file, newline='', encoding='utf-8') as existing:
+                fieldnames = next(csv.reader(existing), None) or LEAD_FIELDS
+        with open(output_file, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+            if file.tell() == 0:  # Write header only if the file is empty
+                writer.writeheader()
+            writer.writerows(leads)
+
+
+def open_browser(capture_network=False):
+    """Starts a browser; lean ones take a disk cache slot, which quit_browser gives back."""
+    slot, cache_dir = cache_slots.acquire() if LEAN_BROWSER else (None, None)
+    try:
+        chrome_options = build_chrome_options(LEAN_BROWSER, capture_network=capture_network, cache_dir=cache_dir)
+        # An empty driver path lets Selenium Manager resolve chromedriver from PATH
+        service = Service(CHROMEDRIVER_PATH) if CHROMEDRIVER_PATH else Service()
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        cache_slots.release(slot)
+        raise
+    driver.cache_slot = slot
+    if LEAN_BROWSER:
+        apply_lean_profile(driver)
+    return driver
+
+
+def quit_browser(driver):
+    try:
+        driver.quit()
+    finally:
+        cache_slots.release(getattr(driver, "cache_slot", None))
+
+
+def fetch_review_date(driver, place_url):
+    """Opens a listing's place URL in a review session and returns its latest review date."""
+    started = time.perf_counter()
+    try:
+        governor.wait_until_clear()
+        driver.get(place_url)
+        if page_is_throttled(driver):
+            governor.report_throttle("captcha", stage="review_page")
+            return "No review date"
+        WebDriverWait(driver, RESULTS_TIMEOUT).until(EC.element_to_be_clickable((By.XPATH, REVIEWS_TAB_XPATH)))
+        return handle_reviews(driver)
+    finally:
+        telemetry.observe("review_fetch", time.perf_counter() - started)
+
+
+def review_fetcher_for(search_query):
+    """Review sessions for one query (browsers start on the first listing handed over), or None."""
+    if REVIEW_SESSIONS <= 0:
+        return None
+    handles = {}
+
+    def open_session():
+        driver = open_browser()
+        handles[id(driver)] = watchdog.register(f"{search_query} [reviews]", driver)
+        return driver
+
+    def close_session(driver):
         try:
-            # Phase 4: Wait for review list stabilization
-            WebDriverWait(driver, 15).until(
-                lambda d: d.find_element(By.XPATH, 
-                    "//div[contains(@class, 'jJc9Ad')][1]//span[contains(@class, 'rsqaWe') or contains(@class, 'xRkPPb')]")
-            )
-        except Exception as e:
-            time.sleep(0.3)
-            lambda d: d.find_element(By.XPATH, 
-                    "//div[contains(@class, 'jJc9Ad')][1]//span[contains(@class, 'rsqaWe') or contains(@class, 'xRkPPb')]")
-
-        # Phase 5: Date extraction with multiple fallbacks
-        date_selectors = [
-            "//span[contains(@class, 'rsqaWe') or contains(@class, 'xRkPPb')][1]",  # Primary
-            "//div[contains(text(), 'ago')][1]",  # Relative time
-            
-        ]
-        
-        for selector in date_selectors:
-            try:
-                date_element = WebDriverWait(driver, 3).until(
-                    EC.visibility_of_element_located((By.XPATH, selector))
-                )
-                latest_review_date = date_element.text.strip()
-                break
-            except Exception as e:
-                print(f"Date selector failed: {selector} ")
-                time.sleep(1)
-                date_element = WebDriverWait(driver, 3).until(
-                    EC.visibility_of_element_located((By.XPATH, selector))
-                )
-                latest_review_date = date_element.text.strip()
+            quit_browser(driver)
+        finally:
+            watchdog.unregister(handles.pop(id(driver), None))
 
-    except Exception as e:
-        print(f"Critical review handling failure: ")
-    
-    return latest_review_date
+    return ReviewDateFetcher(REVIEW_SESSIONS, open_session, fetch_review_date, close_session,
+                             is_fatal=lambda exc: classify(exc) == DEAD_DRIVER)
 
-def scrape_google_maps(search_query, result_queue):
-    print("Processing Query: ",search_query)
-    chrome_options = webdriver.ChromeOptions()
-    # chrome_options.add_argument("--enable-gpu")  # Enable GPU acceleration
-    # chrome_options.add_argument("--ignore-gpu-black  list")  # Ignore GPU blocklist to for
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    # chrome_options.add_argument("--disable-dev-shm-usage")
-    # chrome_options.add_argument("--disable-gpu")
-    
-    chrome_options.add_argument("--disable-software-rasterizer")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-logging")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--output=/dev/null")
-    chrome_options.add_argument("--single-process")
-    driver = webdriver.Chrome(service=Service("C:\\chromedriver-win64\\chromedriver.exe"), options=chrome_options)
 
+def finish_reviews(review_fetcher, timeout=REVIEW_DRAIN_TIMEOUT_S):
+    """Waits for the query's outstanding review dates and folds the session stats into telemetry."""
+    if review_fetcher is None or review_fetcher.closed:
+        return
+    stats = review_fetcher.close(timeout)
+    for name in ("fetched", "failed", "unfinished", "session_failures"):
+        telemetry.count(f"reviews_{name}", stats[name])
+
+
+def scrape_google_maps(search_query, result_queue, output_file, max_results=None):
+    """Scrapes one query's listings (at most max_results, default MAX_QUERIES) and writes its leads."""
+    max_results = MAX_QUERIES if max_results is None else max_results
+    print("Processing Query: ",search_query)
+    query_started = time.perf_counter()
+    query_timings = {}
+    query_status = {"status": "ok"}
     business_type, search_query = ast.literal_eval(search_query)
+    telemetry.emit("query_start", query=search_query, business_type=business_type)
+    try:
+        with telemetry.stage("driver_start", query_timings):
+            driver = open_browser(capture_network=EXTRACTION_MODE == "payload")
+            browser_handle = watchdog.register(search_query, driver)
+            capture = PayloadCapture(driver) if EXTRACTION_MODE == "payload" else None
+    except Exception as e:
+        telemetry.count("queries_failed")
+        telemetry.emit("query_done", query=search_query, business_type=business_type, status="driver_failed",
+                       leads=0, timings=query_timings, **error_fields(e))
+        raise
+
     visited_names = set()
     leads = []
+    listing_started = None
+    # Claims are held per attempt: a retry (reaped or dead browser) skips the listings an earlier attempt
+    # wrote, and finds the ones it failed on released
+    claim_owner = f"{WORKER_ID}|{search_query}|{uuid.uuid4().hex[:12]}"
+    claimed_places = []
+    review_fetcher = review_fetcher_for(search_query)
+    query_zip = address_zip(query_location(business_type, search_query))
     try:
-        driver.get("https://www.google.com/maps")
-        try:
-            WebDriverWait(driver, 50).until(EC.presence_of_element_located((By.ID, "searchboxinput")))
-        except TimeoutException:
-            print("Failed to load Google Maps search box. Retrying...")
-            driver.refresh()
-            WebDriverWait(driver, 50).until(EC.presence_of_element_located((By.ID, "searchboxinput")))
-        search_box = driver.find_element(By.ID, "searchboxinput")
-        search_box.send_keys(search_query)
-        search_box.send_keys(Keys.ENTER)
-
-        max_retries = 3
-        retry_delay = 5
-        for attempt in range(max_retries):
-            try:
-                WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CLASS_NAME, "Nv2PK")))
-                break
-            except TimeoutException:
-                if attempt == max_retries - 1:
-                    print(f"Failed to locate results after {max_retries} attempts. Skipping query: {search_query}")
-                    return
-                print(f"Retrying to locate results... Attempt {attempt + 1}/{max_retries}")
-                time.sleep(retry_delay)
+        search_outcome = load_search_results(driver, search_query, query_timings)
+        if search_outcome != "found":
+            query_status = {"status": search_outcome}
+            return search_outcome
+        listing_started = time.perf_counter()
         actions = ActionChains(driver)
         businesses = []
         count = 0
@@ -197,12 +525,15 @@ def scrape_google_maps(search_query, result_queue):
         prev_count = 0
         no_change_count = 0  # Track how many times results remain unchanged
 
-        while True:
-            actions.send_keys(Keys.PAGE_DOWN).perform()
-            time.sleep(2)  # Allow time for new results to load
+        while not run_deadline.expired():
+            with telemetry.stage("scroll", query_timings):
+                actions.send_keys(Keys.PAGE_DOWN).perform()
+                time.sleep(2)  # Allow time for new results to load
 
-            results = driver.find_elements(By.CLASS_NAME, "Nv2PK")
-            current_count = len(results)
+                results = driver.find_elements(By.CLASS_NAME, "Nv2PK")
+                current_count = len(results)
+                if capture:
+                    capture.poll()
 
             if current_count == prev_count:
                 no_change_count += 1
@@ -215,180 +546,432 @@ def scrape_google_maps(search_query, result_queue):
 
             prev_count = current_count
 
-            if count >= MAX_QUERIES:
+            if count >= max_results:
                 print("Reached maximum limit of queries. Stopping search.")
                 break
 
             results = driver.find_elements(By.CLASS_NAME, "Nv2PK")
             for result in results:
+                lead_timings = {}
+                name = None
+                place = None
                 try:
-                    rating = "No rating"
-                    address = "No address"
-                    phone = "No phone number"
-                    category = "No category"
-                    website = "No website"
                     latest_review_date = "No review date"
-                    reviews = "No reviews"
-                    
+
                     name_element = result.find_element(By.CLASS_NAME, "qBF1Pd")
                     name = name_element.text if name_element else "No name"
                     if name in visited_names:
                         continue
                     
-                    if(count>=MAX_QUERIES):
+                    if(count>=max_results):
+                        break
+                    if run_deadline.expired():
+                        # Out of time: stop here and write what this query has
                         break
-                    count+=1
                     visited_names.add(name)
-                    click_element(driver, result)
-                    button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label, 'Reviews')]")))
-                    if not button:
+                    card_href = None
+                    if capture or review_fetcher or place_claims is not None:
+                        card_href = card_place_href(result)
+                    known_lead = capture.lookup(card_href, name) if capture and known_leads is not None else None
+                    if known_lead is not None and known_leads.is_known(name, known_lead['address'], known_lead['phone']):
+                        # Payload fields give the listing's own phone and address before any click. Without them
+                        # the check waits for the detail panel: the query's zip is not the listing's, and a name
+                        # match there would skip a new branch of a chain in a neighbouring zip.
+                        telemetry.count("leads_known_skipped")
+                        continue
+                    if place_claims is not None:
+                        place = place_key(card_href, name, query_zip)
+                        if not place_claims.claim(place, claim_owner):
+                            # Another worker of this run is scraping (or has scraped) this listing
+                            telemetry.count("leads_claimed_elsewhere")
+                            continue
+                        claimed_places.append(place)
+                    count+=1
+                    # A review session reads the date from the place URL, so with the listing fields
+                    # already in the payload the primary browser need not open this card at all
+                    delegate_reviews = review_fetcher is not None and bool(card_href)
+                    payload_lead = usable_payload(capture.lookup(card_href, name)) if capture and delegate_reviews else None
+                    if payload_lead is None:
+                        with telemetry.stage("click", lead_timings):
+                            click_element(driver, result, refind=lambda: find_result_card(driver, name))
+                            button = WebDriverWait(driver, 5).until(
+                            EC.element_to_be_clickable((By.XPATH, REVIEWS_TAB_XPATH)))
+                        if not button:
+                            continue
+
+                        payload_lead = capture.lookup(card_href, name) if capture else None
+                        if capture and payload_lead is None and capture.poll():
+                            payload_lead = capture.lookup(card_href, name)
+                        payload_lead = usable_payload(payload_lead)
+                    if payload_lead is not None:
+                        # Everything but the review date came with the search payload: skip the page_source parse
+                        details = {key: payload_lead[key] for key in ('category', 'website', 'reviews', 'rating', 'address', 'phone')}
+                        telemetry.count("leads_from_payload")
+                    else:
+                        with telemetry.stage("detail", lead_timings):
+                            details = extract_lead_details(driver, result)
+                    if known_leads is not None and known_leads.is_known(name, details['address'], details['phone']):
+                        # Only the detail panel (or a payload that arrived after the click) had the phone and
+                        # address; still saves the review sort
+                        telemetry.count("leads_known_skipped")
+                        count -= 1
                         continue
-                        
-                    detail_soup = BeautifulSoup(driver.page_source, 'html.parser')
-                    # Extract review count and rating
-                    try:
-                        review_element = result.find_element(By.CLASS_NAME, "UY7F9")
-                        reviews = review_element.text if review_element else "No reviews"
-                    except:
-                        reviews = "No reviews"
-
-                    try:
-                        rating_element = result.find_element(By.CLASS_NAME, "MW4etd")
-                        rating = rating_element.text if rating_element else "No ratings"
-                    except:
-                        rating = "No ratings"
-
-                    reviews = reviews.replace('(', '').replace(')', '')
-                    
-                    # Extract address
-                    address_element = detail_soup.find('div', class_='Io6YTe')
-                    if address_element:
-                        address = address_element.text.strip()
-                        
-                    if address=='No address':
-                        address_element=driver.find_element(By.XPATH, 
-                            "//div[contains(@class, 'Io6YTe ') and contains(@class, 'fontBodyMedium ') and contains(text(), 'United')]")
-                        if address_element:
-                            address = address_element.text.strip()
-
-                    # Extract phone number
-                    phone_elements = detail_soup.find_all('div', class_='Io6YTe')
-                    for div in phone_elements:
-                        if div.text.startswith('+') or div.text.replace('-', '').isdigit():
-                            phone = div.text.strip()
-                            break
-                    
-                    if phone=='No phone number':
-                        phone_element=driver.find_element(By.XPATH, 
-                            "//div[contains(@class, 'Io6YTe ') and contains(@class, 'fontBodyMedium ') and contains(text(), '+1')]")
-                        if phone_element:
-                            phone = phone_element.text.strip()   
-                    # Extract category (Primary Method)
-                    try:
-                        category_div = detail_soup.find('button', class_='DkEaL')
-                        if category_div:
-                            category = category_div.text.strip()
-                    except:
-                        print("Couldnt find Category")
-                    
-                    if category == "No category":
-                        try:
-                            category_div =driver.find_element(By.XPATH, "//button[contains(@class, 'DkEaL')]")
-                            if category_div:
-                                category = category_div.text.strip()
-                        except:
-                            print("Couldnt find Category")
-                    if category == "No category":
-                        try:
-                            category_div =driver.find_element(By.XPATH, "//span[contains(@class, 'mgr77e')]//span[contains(text(), 'star')]")
-                            if category_div:
-                                category = category_div.text.strip()
-                        except:
-                            print("Couldnt find Category")
-                    
-                    
-                    
-                    
-                    
 
-                    # Extract website
-                    
-                    website_div = detail_soup.find('div', class_='rogA2c ITvuef')
-                    if website_div:
-                        website_inner_div = website_div.find('div')
-                        if website_inner_div:
-                            website = website_inner_div.text.strip()
-                    
-                    
-                        if website=='No website':
-                            try:
-                                site = driver.find_element(By.XPATH, 
-                                    "//div[contains(@class, 'Io6YTe') and contains(@class, 'fontBodyMedium') and "
-                                    "(contains(text(), '.gov') or contains(text(), '.org') or contains(text(), '.edu') or contains(text(), '.com') or contains(text(), '.net'))]"
-                                    )
-                                if site:
-                                    website = site.text.strip() 
-                            except:
-                                print('Error in finding Second Website Method')
+                    if not delegate_reviews:
+                        with telemetry.stage("review_sort", lead_timings):
+                            latest_review_date = handle_reviews(driver)
                                 
-                                
-                    latest_review_date = handle_reviews(driver)                        
-                                
-                    leads.append({
+                    lead = {
                         'Type of Business': business_type,
-                        'Sub-Category': category,
+                        'Sub-Category': details['category'],
                         'Name of Business': name,
-                        'Website': website,
-                        '# of Reviews': reviews,
-                        'Rating': rating,
+                        'Website': details['website'],
+                        '# of Reviews': details['reviews'],
+                        'Rating': details['rating'],
                         'Latest Review Date': latest_review_date,
-                        'Business Address': address,
-                        'Phone Number': phone
-                    })
+                        'Business Address': details['address'],
+                        'Phone Number': details['phone'],
+                        # "3 weeks ago" is relative to this moment; the formatter turns it into Review Age (Days)
+                        'Scraped At': datetime.now(timezone.utc).isoformat(timespec='seconds')
+                    }
+                    leads.append(lead)
+                    if delegate_reviews:
+                        review_fetcher.submit(lead, card_href)
+                    telemetry.count("leads_scraped")
+                    telemetry.emit("lead", query=search_query, name=name, status="ok", timings=lead_timings)
 
                 except Exception as e:
-                    print("")
-        # Write all leads for this query to CSV
-        with csv_lock:
-            with open(output_file, mode='a', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=[
-                    'Type of Business', 'Sub-Category', 'Name of Business', 'Website',
-                    '# of Reviews', 'Rating', 'Latest Review Date', 'Business Address', 'Phone Number'
-                ])
-                if file.tell() == 0:  # Write header only if the file is empty
-                    writer.writeheader()
-                writer.writerows(leads)
+                    failure = classify(e)
+                    telemetry.count("leads_failed")
+                    if place is not None and place_claims is not None:
+                        # Let another worker try the listing this one failed on
+                        place_claims.release(place, claim_owner)
+                    telemetry.emit("lead", query=search_query, name=name, status="error", failure=failure,
+                                   timings=lead_timings, **error_fields(e))
+                    if failure == DEAD_DRIVER:
+                        # Nothing else can succeed on this driver; keep what was scraped and hand the query back
+                        raise DriverDeadError(f"Driver died while scraping '{name}'") from e
+        if run_deadline.expired() and count < max_results:
+            run_deadline.cut_short()
+            query_status = {"status": DEADLINE_STATUS, "reason": run_deadline.stop_reason or "deadline"}
+        finish_reviews(review_fetcher, timeout=run_deadline.drain_timeout(REVIEW_DRAIN_TIMEOUT_S))
+        write_leads(output_file, leads)
+
+    except DriverDeadError as e:
+        print(f"Browser session lost while processing query '{search_query}'")
+        logging.error(f"Browser session lost while processing query '{search_query}': {e}")
+        finish_reviews(review_fetcher, timeout=run_deadline.drain_timeout(REVIEW_DRAIN_TIMEOUT_S))
+        write_leads(output_file, leads)
+        query_status = {"status": "driver_dead", **error_fields(e)}
 
     except Exception as e:
             # Log any unexpected errors during the scraping process
             print(f"Unexpected error while processing query '{search_query}'")
-            logging.error(f"Unexpected error while processing query '{search_query}'")
+            logging.error(f"Unexpected error while processing query '{search_query}': {type(e).__name__}: {e}")
+            query_status = {"status": "error", "failure": classify(e), **error_fields(e)}
+            if place_claims is not None:
+                # None of this query's leads were written: give its listings back to the other workers
+                for place in claimed_places:
+                    place_claims.release(place, claim_owner)
     
     finally:
-        # Ensure the driver is always closed
-        driver.quit()
+        # Ensure the driver is always closed, and nothing of its process tree outlives the query.
+        # Leads are not written on this path, so the review sessions are not waited for.
+        finish_reviews(review_fetcher, timeout=0)
+        try:
+            quit_browser(driver)
+        except Exception as e:
+            logging.warning(f"driver.quit() failed for '{search_query}': {type(e).__name__}")
+        watchdog.unregister(browser_handle)
+        if browser_handle is not None and browser_handle.reaped:
+            query_status = {"status": "reaped", "reason": browser_handle.reaped}
+        query_timings["total"] = round(time.perf_counter() - query_started, 3)
+        if listing_started is not None:
+            run_deadline.observe(query_timings["total"], time.perf_counter() - listing_started, len(leads))
+        # A query held to a lower limit by the deadline would understate its yield in the history
+        if query_history is not None and max_results >= MAX_QUERIES and query_status["status"] != DEADLINE_STATUS:
+            query_history.record(business_type, search_query, len(leads), query_timings["total"], query_status["status"])
+        telemetry.count("queries_done")
+        telemetry.emit("query_done", query=search_query, business_type=business_type, leads=len(leads),
+                       timings=query_timings, **query_status)
+    return query_status["status"]
         
         
-def process_queries(queries, result_queue, output_file):
+def process_queries(queries, result_queue, output_file, autoscaler=None, work_queue=None):
     """
     Processes a batch of queries using multithreading.
+    The number of queries in flight follows the autoscaler's target, between MIN_WORKERS and MAX_WORKERS.
+    With a work_queue, queries are leased from the shared batch instead of taken from `queries`, and the
+    run ends when the batch is drained (by this host or others).
+    Under a deadline, each query starts with the result limit the time left allows, queries that would not
+    collect a few listings are skipped, and once it is reached no further queries start.
     """
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(scrape_google_maps, query, result_queue) for query in queries]
+    if autoscaler is None:
+        autoscaler = WorkerAutoscaler(min_workers=MIN_WORKERS, max_workers=MAX_WORKERS,
+                                      initial_workers=DEFAULT_INITIAL_WORKERS, cpu_ceiling=CPU_CEILING,
+                                      memory_ceiling_mb=MEMORY_CEILING_MB)
 
-        for future in futures:
+    def run_query(query, limit):
+        started = time.perf_counter()
+        try:
+            return scrape_google_maps(query, result_queue, output_file, max_results=limit)
+        finally:
+            autoscaler.record_latency(time.perf_counter() - started)
+
+    def lease_lost(lease):
+        # Another host took the query over after our lease expired; this host's run still finishes it
+        telemetry.count("leases_lost")
+        telemetry.emit("lease_lost", query=lease.item, attempts=lease.attempts)
+
+    def admit(query=None):
+        """Result limit the deadline leaves a query starting now (0 = it should not start)."""
+        expected_seconds = None
+        if query is not None and query_history is not None:
             try:
-                future.result()  # Wait for each thread to complete
-            except Exception as e:
-                logging.error(f"Thread failed: {e}")
-                
+                expected_seconds = query_history.estimate(query_key(*parse_query_line(query)))[1]
+            except (ValueError, SyntaxError):
+                pass
+        return run_deadline.admit(MAX_QUERIES, expected_seconds)
+
+    def next_query():
+        """(query, lease, result limit) to start next, or None when nothing is available right now."""
+        nonlocal out_of_time
+        if out_of_time or run_deadline.expired():
+            return None
+        if work_queue is None:
+            while pending:
+                query = pending.pop()
+                limit = admit(query)
+                run_deadline.record(limit, MAX_QUERIES)
+                if limit:
+                    return query, None, limit
+                telemetry.count("queries_deadline_skipped")
+            return None
+        # Checked before leasing, so a query this host has no time for stays queued for the others; the time
+        # left only shrinks, so this host stops leasing for good
+        limit = admit()
+        if not limit:
+            out_of_time = True
+            logging.info("Deadline: no time for another query; leaving the rest of the batch to other hosts")
+            return None
+        lease = work_queue.lease(WORKER_ID)
+        if lease is None:
+            return None
+        run_deadline.record(limit, MAX_QUERIES)
+        lease_keeper.hold(lease)
+        telemetry.count("leases_taken")
+        return lease.item, lease, limit
+
+    def finish(query, lease, status):
+        if lease is not None:
+            lease_keeper.drop(lease)
+            # Reaped, dead-driver and cut-short queries go back to the shared queue; its attempt cap replaces the local one
+            if status in RETRYABLE_QUERY_STATUSES or status == DEADLINE_STATUS:
+                work_queue.release(lease, status)
+            else:
+                work_queue.ack(lease, status)
+        elif status in RETRYABLE_QUERY_STATUSES and reaped_retries.get(query, 0) < REAPED_QUERY_RETRIES:
+            # The browser was killed by the watchdog or died; give the query one more go on a fresh one
+            reaped_retries[query] = reaped_retries.get(query, 0) + 1
+            pending.append(query)
+
+    pending = list(reversed(queries)) if work_queue is None else []
+    running = {}
+    reaped_retries = {}
+    lease_keeper = LeaseKeeper(work_queue, on_lost=lease_lost).start() if work_queue is not None else None
+    out_of_time = False
+    deadline_reported = False
+    telemetry.emit("autoscale", reason="start", **autoscaler.snapshot())
+    watchdog.start()
+    try:
+        with ThreadPoolExecutor(max_workers=autoscaler.max_workers) as executor:
+            while True:
+                while len(running) < autoscaler.target:
+                    task = next_query()
+                    if task is None:
+                        break
+                    running[executor.submit(run_query, task[0], task[2])] = task[:2]
+                if not running:
+                    if work_queue is None or out_of_time or not work_queue.outstanding() or run_deadline.expired():
+                        break
+                    # The rest of the batch is leased by other hosts: wait until it is done or a lease expires
+                    time.sleep(WORK_QUEUE_POLL_S)
+                    continue
+
+                done, _ = wait(running, timeout=AUTOSCALE_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query, lease = running.pop(future)
+                    try:
+                        status = future.result()  # Surface failures from each thread
+                    except Exception as e:
+                        logging.error(f"Thread failed: {e}")
+                        status = "error"
+                    finish(query, lease, status)
+
+                if run_deadline.expired() and not deadline_reported:
+                    # Reported from here rather than the signal handler, which may interrupt a telemetry write
+                    deadline_reported = True
+                    logging.warning(f"Deadline reached ({run_deadline.stop_reason or 'time'}): "
+                                    f"no new queries, {len(running)} running queries writing their leads")
+                    telemetry.emit("deadline", running=len(running), pending=len(pending), **run_deadline.snapshot())
+
+                target, reason = autoscaler.update(len(running))
+                if reason:
+                    logging.info(f"Autoscaler: {target} workers ({reason})")
+                    telemetry.emit("autoscale", reason=reason, running=len(running), **autoscaler.snapshot())
+    finally:
+        if run_deadline.ends_at is not None or run_deadline.stop_reason is not None:
+            telemetry.emit("deadline_summary", pending=len(pending), stopped_leasing=out_of_time,
+                           **run_deadline.snapshot())
+        if lease_keeper is not None:
+            lease_keeper.stop()
+        reaped = watchdog.stop()
+        telemetry.count("workers_reaped", reaped["workers_reaped"])
+        telemetry.count("leaked_processes_reaped", reaped["leaked_processes_reaped"])
+        if any(reaped.values()):
+            print(f"Watchdog: {reaped['workers_reaped']} stuck browsers killed, "
+                  f"{reaped['leaked_processes_reaped']} leaked Chrome processes reaped")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Google Maps listings for the queries in queries.txt.")
+    parser.add_argument("--queries", default="queries.txt", help="Queries file, one (business type, query) tuple per line")
+    parser.add_argument("--output", default="./Outputs/LeadsApart.csv", help="CSV file scraped leads are appended to")
+    parser.add_argument("--max_results", type=int, default=MAX_QUERIES, help="Maximum leads collected per query")
+    parser.add_argument("--base_url", default=MAPS_BASE_URL, help="Maps entry URL (e.g. a maps_replay_server.py address)")
+    parser.add_argument("--driver_path", default=CHROMEDRIVER_PATH, help="chromedriver binary; empty to resolve from PATH")
+    parser.add_argument("--full_browser", action="store_true",
+                        help="Load the full Maps UI (images, tiles, fonts) at 1920x1080 instead of the lean profile")
+    parser.add_argument("--extraction", choices=["dom", "payload"], default=EXTRACTION_MODE,
+                        help="payload: take listing fields from Maps search responses, click only for review dates")
+    parser.add_argument("--min_workers", type=int, default=MIN_WORKERS, help="Fewest concurrent browser workers")
+    parser.add_argument("--max_workers", type=int, default=MAX_WORKERS, help="Most concurrent browser workers")
+    parser.add_argument("--cpu_ceiling", type=float, default=CPU_CEILING, help="System CPU %% above which workers are shed")
+    parser.add_argument("--memory_ceiling_mb", type=float, default=MEMORY_CEILING_MB,
+                        help="Chrome process tree RSS ceiling (default 70%% of physical memory)")
+    parser.add_argument("--max_query_seconds", type=float, default=MAX_QUERY_SECONDS,
+                        help="Kill a query's browser after this many seconds")
+    parser.add_argument("--max_browser_rss_mb", type=float, default=MAX_BROWSER_RSS_MB,
+                        help="Kill a query's browser when its process tree exceeds this RSS")
+    parser.add_argument("--query_rate", type=float, default=QUERY_RATE,
+                        help="Query starts per minute across all workers (0 disables pacing)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="Per-query yield history used to order queries")
+    parser.add_argument("--time_budget", type=float, default=None,
+                        help="Seconds available; lowest-value queries that do not fit are skipped")
+    parser.add_argument("--deadline", type=float, default=DEADLINE_SECONDS,
+                        help="Seconds until the run must end: late queries are skipped or limited and leads are "
+                             "written before it (also on SIGTERM); the default plan budget")
+    parser.add_argument("--no_plan", action="store_true", help="Scrape queries.txt as-is (no dedupe or reordering)")
+    parser.add_argument("--known_leads", default=KNOWN_LEADS_FILE,
+                        help="Key file of archived leads (rebuilt from Files/ when the archive changes)")
+    parser.add_argument("--no_known_filter", action="store_true", help="Scrape businesses already in the archive too")
+    parser.add_argument("--review_sessions", type=int, default=REVIEW_SESSIONS,
+                        help="Secondary browsers per query that fetch review dates from place URLs in parallel")
+    parser.add_argument("--stream", action="store_true", default=STREAM_PIPELINE,
+                        help="Clean leads in-process into the lead store and --stream_output (no CSV)")
+    parser.add_argument("--stream_output", default=STREAM_OUTPUT_FILE,
+                        help="Formatted workbook written by --stream ('' for none)")
+    parser.add_argument("--lead_db", default=DEFAULT_LEAD_DB, help="Backend SQLite database --stream upserts into ('' for none)")
+    parser.add_argument("--work_queue", default=WORK_QUEUE,
+                        help="Shared work queue ('sqlite:<path>' or a path): lease queries from --batch instead of "
+                             "splitting --queries locally; the planned --queries are added to the batch first")
+    parser.add_argument("--batch", default=None,
+                        help="Work queue batch this host helps drain (default SCRAPER_BATCH); given here, it also "
+                             "names the place claims shared with the other hosts of the batch")
+    parser.add_argument("--worker_id", default=WORKER_ID, help="Name this host's leases are held under")
+    parser.add_argument("--lease_seconds", type=float, default=LEASE_SECONDS,
+                        help="A query whose lease is not renewed for this long is handed to another host")
+    parser.add_argument("--place_claims", default=PLACE_CLAIMS,
+                        help="Share claimed listings between processes through this store ('sqlite:<path>' or a path; "
+                             "default: the work queue's file, else this process only)")
+    parser.add_argument("--no_place_claims", action="store_true",
+                        help="Let overlapping queries each scrape every listing they find")
+    parser.add_argument("--telemetry_file", default=None, help="Also append JSON-lines timing events to this file")
+    parser.add_argument("--no_telemetry", action="store_true", help="Disable JSON-lines timing events on stdout")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    input_file = "queries.txt"
-    output_file = "./Outputs/LeadsApart.csv"
+    args = parse_args()
+    input_file = args.queries
+    output_file = args.output
+    MAX_QUERIES = args.max_results
+    MAPS_BASE_URL = args.base_url
+    CHROMEDRIVER_PATH = args.driver_path
+    LEAN_BROWSER = LEAN_BROWSER and not args.full_browser
+    EXTRACTION_MODE = args.extraction
+    REVIEW_SESSIONS = args.review_sessions
+    WORKER_ID = args.worker_id
+    MIN_WORKERS = args.min_workers
+    MAX_WORKERS = args.max_workers
+    CPU_CEILING = args.cpu_ceiling
+    MEMORY_CEILING_MB = args.memory_ceiling_mb
+    QUERY_RATE = args.query_rate
+    governor = RateGovernor(QUERY_RATE, DEFAULT_BURST, on_event=lambda event, **fields: telemetry.emit(event, **fields))
+    MAX_QUERY_SECONDS = args.max_query_seconds
+    MAX_BROWSER_RSS_MB = args.max_browser_rss_mb
+    watchdog = BrowserWatchdog(MAX_QUERY_SECONDS, MAX_BROWSER_RSS_MB, on_event=lambda event, **fields: telemetry.emit(event, **fields))
+    # The deadline counts from here, so loading the archive index and planning come out of it too
+    DEADLINE_SECONDS = args.deadline
+    run_deadline = RunDeadline(DEADLINE_SECONDS)
+    install_stop_handler(run_deadline)
 
     with open(input_file, mode='r', encoding='utf-8') as file:
         queries = [line.strip() for line in file if line.strip()]
 
+    telemetry.configure(file_path=args.telemetry_file, enabled=not args.no_telemetry)
+    query_history = QueryHistory(args.history)
+    if not args.no_known_filter:
+        known_leads = load_or_build(args.known_leads, os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_FILES_DIR))
+        if known_leads is not None:
+            print(f"Known-lead filter: {len(known_leads)} archive keys loaded")
+    if not args.no_plan:
+        queries, plan_report = plan_queries(queries, query_history, args.time_budget or args.deadline or None, MAX_WORKERS)
+        print(f"Query plan: {plan_report['planned']} of {plan_report['input']} queries "
+              f"({plan_report['duplicates']} duplicates, {plan_report['over_budget']} over budget)")
+        telemetry.emit("query_plan", **plan_report)
+    if args.stream:
+        lead_store = None
+        if args.lead_db:
+            try:
+                lead_store = LeadStore(args.lead_db)
+            except (RuntimeError, sqlite3.Error) as e:
+                logging.warning(f"Lead store unavailable, streaming to the output file only: {e}")
+        # Every stored lead is also reported on stdout, so scraperProcessor.js needs no file to read back
+        lead_pipeline = StreamingLeadPipeline(
+            output_file=args.stream_output or None, store=lead_store,
+            on_lead=lambda lead: telemetry.emit("lead_stored", lead=lead),
+            fallback=lambda leads: append_leads_csv(output_file, leads)).start()
+    batch = args.batch or WORK_BATCH
+    # An explicit --batch shares claims with every host draining it; otherwise they belong to this run only
+    claims_run = args.batch or f"run-{uuid.uuid4().hex[:12]}"
+    if args.no_place_claims:
+        place_claims = None
+    elif args.place_claims or args.work_queue:
+        place_claims = open_place_claims(args.place_claims or args.work_queue, claims_run)
+    work_queue = None
+    if args.work_queue:
+        work_queue = open_work_queue(args.work_queue, batch, lease_s=args.lease_seconds)
+        # Every host may pass the same queries file: queries already in the batch (queued or done) are skipped
+        added = work_queue.enqueue(queries)
+        print(f"Work queue: {added} queries added to batch '{batch}' ({work_queue.counts()})")
+        telemetry.emit("work_queue", batch=batch, worker=WORKER_ID, added=added, **work_queue.counts())
+    telemetry.emit("run_start", queries=len(queries), max_results=MAX_QUERIES, deadline_s=DEADLINE_SECONDS or None)
     result_queue = queue.Queue()
-    process_queries(queries, result_queue, output_file)
\ No newline at end of file
+    try:
+        process_queries(queries, result_queue, output_file, work_queue=work_queue)
+    finally:
+        if place_claims is not None:
+            telemetry.emit("place_claims", run=place_claims.run, **place_claims.stats)
+            if not args.batch:
+                # Nobody else can use this run's claims
+                place_claims.clear()
+            place_claims.close()
+        if work_queue is not None:
+            telemetry.emit("work_queue", batch=batch, worker=WORKER_ID, **work_queue.counts())
+            work_queue.close()
+        if lead_pipeline is not None:
+            stream_stats = lead_pipeline.close()
+            print(f"Lead stream: {stream_stats['kept']} of {stream_stats['received']} scraped leads kept, "
+                  f"{stream_stats['stored']} stored")
+            telemetry.emit("stream_summary", **stream_stats)
+        query_history.save()
+        telemetry.emit_summary()
\ No newline at end of file
@@ -0,0 +1,274 @@
+import argparse
+import json
+import logging
+import re
+
+# =================== CONFIGURATION =================== #
+
+# Maps responses start with this anti-XSSI guard before the JSON body
+XSSI_PREFIX = ")]}'"
+
+# Responses that carry listing data: the search XHR (also used for "load more") and place previews
+PAYLOAD_URL_MARKERS = ("/search?tbm=map", "/maps/preview/place", "/maps/rpc/", "/search?")
+
+# Positions inside one place array of the Maps search / place payloads. encode_place() writes the same
+# positions, so fixtures/maps_payload/synthetic_search_results.txt (its output) only checks the parser
+# against itself; confirm them against a live response (python maps_payload.py <saved body>) after
+# Maps changes.
+PLACE_NAME = (11,)
+PLACE_CATEGORIES = (13,)
+PLACE_ADDRESS = (39,)
+PLACE_ADDRESS_PARTS = (183, 1)   # [?, borough, street, city, postal code, state, country code]
+PLACE_WEBSITE_URL = (7, 0)
+PLACE_WEBSITE_DISPLAY = (7, 1)
+PLACE_RATING = (4, 7)
+PLACE_REVIEW_COUNT = (4, 8)
+PLACE_PHONE = (178, 0, 0)
+PLACE_DATA_ID = (10,)             # "0x...:0x..." also embedded in the card's place URL as !1s<data id>
+PLACE_ID = (78,)
+PLACE_ARRAY_LENGTH = 184
+
+COUNTRY_NAMES = {"US": "United States"}
+MAX_WALK_DEPTH = 8
+
+# =================== PARSING =================== #
+
+def _get(node, path):
+    for index in path:
+        if not isinstance(node, list) or index >= len(node):
+            return None
+        node = node[index]
+    return node
+
+
+def strip_xssi(text):
+    text = text.lstrip()
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    return text
+
+
+def _looks_like_place(node):
+    return (isinstance(node, list) and len(node) > PLACE_ID[0]
+            and isinstance(_get(node, PLACE_NAME), str) and isinstance(_get(node, PLACE_DATA_ID), str))
+
+
+def find_place_arrays(node, depth=0):
+    """Yields every place array nested anywhere in a decoded payload."""
+    if depth > MAX_WALK_DEPTH or not isinstance(node, list):
+        return
+    if _looks_like_place(node):
+        yield node
+        return
+    for child in node:
+        if isinstance(child, list):
+            yield from find_place_arrays(child, depth + 1)
+        elif isinstance(child, str) and child.startswith(XSSI_PREFIX):
+            # Initial page state embeds whole search responses as strings
+            yield from parse_payload_places(child, depth + 1)
+
+
+def parse_payload_places(text, depth=0):
+    try:
+        decoded = json.loads(strip_xssi(text))
+    except ValueError:
+        return
+    yield from find_place_arrays(decoded, depth)
+
+
+def format_phone(raw):
+    """'(704) 555-0101' / '+17045550101' -> '+1 704-555-0101', the format the detail panel shows."""
+    if not raw:
+        return None
+    digits = re.sub(r"\D", "", str(raw))
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    if len(digits) != 10:
+        return str(raw).strip()
+    return f"+1 {digits[:3]}-{digits[3:6]}-{digits[6:]}"
+
+
+def place_country(place):
+    """Country name from the address parts (or the address text), or None when the payload has none."""
+    parts = _get(place, PLACE_ADDRESS_PARTS)
+    code = _get(parts, (6,)) if parts else None
+    if code:
+        return COUNTRY_NAMES.get(code, code)
+    address = _get(place, PLACE_ADDRESS)
+    for name in COUNTRY_NAMES.values():
+        if isinstance(address, str) and address.endswith(name):
+            return name
+    return None
+
+
+def format_address(place):
+    address = _get(place, PLACE_ADDRESS)
+    parts = _get(place, PLACE_ADDRESS_PARTS)
+    country = _get(parts, (6,)) if parts else None
+    if not address and parts:
+        street, city, postal, state = (_get(parts, (i,)) for i in (2, 3, 4, 5))
+        address = ", ".join(p for p in [street, city, " ".join(p for p in [state, postal] if p)] if p)
+    if address and country in COUNTRY_NAMES and COUNTRY_NAMES[country] not in address:
+        address = f"{address}, {COUNTRY_NAMES[country]}"
+    return address
+
+
+def format_website(place):
+    display = _get(place, PLACE_WEBSITE_DISPLAY)
+    if display:
+        return display
+    url = _get(place, PLACE_WEBSITE_URL)
+    if not url:
+        return None
+    return re.sub(r"^https?://", "", url).rstrip("/")
+
+
+def place_to_lead(place):
+    """Lead fields from one place array, using the same placeholders as the DOM extraction."""
+    categories = _get(place, PLACE_CATEGORIES)
+    rating = _get(place, PLACE_RATING)
+    reviews = _get(place, PLACE_REVIEW_COUNT)
+    return {
+        "name": _get(place, PLACE_NAME),
+        "data_id": _get(place, PLACE_DATA_ID),
+        "place_id": _get(place, PLACE_ID),
+        "category": categories[0] if isinstance(categories, list) and categories else "No category",
+        "address": format_address(place) or "No address",
+        # None: the address has no country, and the US filter would drop it; maintemp reads the DOM instead
+        "country": place_country(place),
+        "phone": format_phone(_get(place, PLACE_PHONE)) or "No phone number",
+        "website": format_website(place) or "No website",
+        "rating": f"{float(rating):.1f}" if isinstance(rating, (int, float)) else "No ratings",
+        "reviews": f"{int(reviews):,}" if isinstance(reviews, (int, float)) else "No reviews",
+    }
+
+
+def parse_payload(text):
+    """All leads in one Maps response body (search XHR, place preview or page state), in payload order."""
+    return [place_to_lead(place) for place in parse_payload_places(text)]
+
+# =================== ENCODING (replay fixtures) =================== #
+
+def encode_place(lead):
+    """Builds a place array in the Maps layout from lead fields; used by the replay server."""
+    place = [None] * PLACE_ARRAY_LENGTH
+    place[4] = [None] * 9
+    place[4][7] = float(lead["rating"]) if lead.get("rating") else None
+    place[4][8] = int(str(lead["reviews"]).replace(",", "")) if lead.get("reviews") else None
+    if lead.get("website_url"):
+        place[7] = [lead["website_url"], lead.get("website")]
+    place[10] = lead["data_id"]
+    place[11] = lead["name"]
+    place[13] = [lead["category"]] if lead.get("category") else None
+    address = lead.get("address") or ""
+    place[39] = address.replace(", United States", "")
+    place[78] = lead.get("place_id") or lead["data_id"]
+    if lead.get("phone"):
+        digits = re.sub(r"\D", "", lead["phone"])[-10:]
+        place[178] = [[f"({digits[:3]}) {digits[3:6]}-{digits[6:]}", None]]
+    if address.endswith("United States"):
+        place[183] = [None, [None, None, None, None, None, None, "US"]]
+    return place
+
+
+def encode_search_response(query, leads):
+    """A search XHR body in the Maps layout: results at index 64, each as [None, place array]."""
+    body = [None] * 65
+    body[0] = [query]
+    body[64] = [[None, encode_place(lead)] for lead in leads]
+    return XSSI_PREFIX + "\n" + json.dumps(body, separators=(",", ":"))
+
+# =================== CAPTURE =================== #
+
+def card_data_id(href):
+    """'/maps/place/.../data=!4m7!3m6!1s0x0:0xp01!8m2...' -> '0x0:0xp01'."""
+    match = re.search(r"!1s(0x[0-9a-zA-Z]+:0x[0-9a-zA-Z~]+)", href or "")
+    return match.group(1) if match else None
+
+
+class PayloadCapture:
+    """
+    Collects leads from the Maps responses a driver receives, read through Chrome's performance log
+    (requires the goog:loggingPrefs performance capability and CDP Network domain).
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.by_data_id = {}
+        self.by_name = {}
+        self.pending = {}
+        self.responses = 0
+        self.state_parsed = False
+        try:
+            # Response bodies are only retrievable while the Network domain is enabled
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception as e:
+            logging.warning(f"Payload capture: CDP unavailable ({type(e).__name__}); falling back to DOM extraction")
+
+    def _add(self, leads):
+        for lead in leads:
+            if lead["data_id"]:
+                self.by_data_id.setdefault(lead["data_id"], lead)
+            if lead["name"]:
+                self.by_name.setdefault(lead["name"], lead)
+
+    def _parse_initial_state(self):
+        self.state_parsed = True
+        try:
+            state = self.driver.execute_script("return window.APP_INITIALIZATION_STATE || null;")
+        except Exception:
+            return
+        if state:
+            self._add(place_to_lead(place) for place in find_place_arrays(state))
+
+    def poll(self):
+        """Reads new performance-log entries and parses any finished listing responses. Returns leads known."""
+        if not self.state_parsed:
+            self._parse_initial_state()
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            logging.debug(f"Payload capture: performance log unavailable ({type(e).__name__})")
+            return len(self.by_data_id)
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if any(marker in url for marker in PAYLOAD_URL_MARKERS):
+                    self.pending[params.get("requestId")] = url
+            elif method == "Network.loadingFinished" and params.get("requestId") in self.pending:
+                self._fetch_body(params["requestId"])
+        return len(self.by_data_id)
+
+    def _fetch_body(self, request_id):
+        self.pending.pop(request_id, None)
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return
+        self.responses += 1
+        self._add(parse_payload(body.get("body", "")))
+
+    def lookup(self, href=None, name=None):
+        """Payload lead for a result card, matched on the place URL's data id, falling back to the name."""
+        data_id = card_data_id(href)
+        if data_id and data_id in self.by_data_id:
+            return self.by_data_id[data_id]
+        return self.by_name.get(name) if name else None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Parse leads out of a saved Maps payload (search XHR or page state).")
+    parser.add_argument("payload", help="File holding one Maps response body (save a live one from DevTools to "
+                                        "check the PLACE_* positions; the fixture in fixtures/ is synthetic)")
+    args = parser.parse_args()
+    with open(args.payload, encoding="utf-8") as f:
+        leads = parse_payload(f.read())
+    print(json.dumps(leads, indent=2))
+    logging.info(f"Parsed {len(leads)} leads from '{args.payload}'")
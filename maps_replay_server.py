@@ -0,0 +1,213 @@
+import argparse
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from maps_payload import encode_search_response
+
+# =================== CONFIGURATION =================== #
+
+# Recorded Maps HTML lives here: shell.html (search page), results.html (Nv2PK cards)
+# and places/<place id>.html (detail panel with review templates).
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "maps_replay")
+# Stand-in business websites (<host>/index.html, contact pages, robots.txt) for email enrichment runs
+DEFAULT_SITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "websites")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 4  # Cards returned per "scroll", mimics Maps lazy loading
+
+CARD_SPLIT_PATTERN = re.compile(r'(?=<div class="Nv2PK)')
+PLACE_ID_PATTERN = re.compile(r'data-place-id="([^"]+)"')
+CARD_NAME_PATTERN = re.compile(r'(<div class="qBF1Pd[^"]*">)([^<]*)(</div>)')
+CARD_DATA_ID_PATTERN = re.compile(r'(!1s0x0:0x)([^!"]+)')
+
+# Detail panel fields, for building search payloads that match the rendered HTML
+PANEL_FIELD_PATTERNS = {
+    "name": re.compile(r'<h1 class="DUwDvf[^"]*">([^<]*)</h1>'),
+    "category": re.compile(r'<button class="DkEaL[^"]*"[^>]*>([^<]*)</button>'),
+    "address": re.compile(r'data-item-id="address" aria-label="Address: ([^"]*)"'),
+    "website_url": re.compile(r'data-item-id="authority" href="([^"]*)"'),
+    "website": re.compile(r'aria-label="Website: ([^"]*)"'),
+    "phone": re.compile(r'aria-label="Phone: ([^"]*)"'),
+}
+CARD_FIELD_PATTERNS = {
+    "rating": re.compile(r'<span class="MW4etd">([^<]*)</span>'),
+    "reviews": re.compile(r'<span class="UY7F9">\(([^)]*)\)</span>'),
+}
+
+# =================== FIXTURES =================== #
+
+class ReplayFixtures:
+    """Loads recorded Maps pages and serves them as search pages, result pages and place panels."""
+
+    def __init__(self, fixture_dir, page_size=DEFAULT_PAGE_SIZE, repeat=1):
+        self.fixture_dir = fixture_dir
+        self.page_size = max(1, page_size)
+        with open(os.path.join(fixture_dir, "shell.html"), encoding="utf-8") as f:
+            self.shell = f.read()
+        with open(os.path.join(fixture_dir, "results.html"), encoding="utf-8") as f:
+            base_cards = [c.strip() for c in CARD_SPLIT_PATTERN.split(f.read()) if c.strip()]
+        self.places = {}
+        for card in base_cards:
+            place_id = PLACE_ID_PATTERN.search(card).group(1)
+            with open(os.path.join(fixture_dir, "places", f"{place_id}.html"), encoding="utf-8") as f:
+                self.places[place_id] = f.read()
+        self.cards = self._expand_cards(base_cards, max(1, repeat))
+        self.card_ids = [PLACE_ID_PATTERN.search(card).group(1) for card in self.cards]
+
+    @staticmethod
+    def _expand_cards(base_cards, repeat):
+        """Replicates the recorded cards so benchmarks can scrape more leads than were recorded."""
+        if repeat == 1:
+            return base_cards
+        cards = []
+        for copy_index in range(repeat):
+            for card in base_cards:
+                card = PLACE_ID_PATTERN.sub(lambda m: f'data-place-id="{m.group(1)}~{copy_index}"', card)
+                card = CARD_DATA_ID_PATTERN.sub(lambda m: f"{m.group(1)}{m.group(2)}~{copy_index}", card)
+                card = CARD_NAME_PATTERN.sub(lambda m: f"{m.group(1)}{m.group(2)} {copy_index + 1}{m.group(3)}", card)
+                cards.append(card)
+        return cards
+
+    def results_page(self, page):
+        start = page * self.page_size
+        chunk = self.cards[start:start + self.page_size]
+        is_last = start + self.page_size >= len(self.cards)
+        return "\n".join(chunk), is_last
+
+    def search_payload(self, query, page):
+        """The search XHR body (Maps JSON layout) describing the cards of one results page."""
+        start = page * self.page_size
+        records = [self.place_record(place_id) for place_id in self.card_ids[start:start + self.page_size]]
+        return encode_search_response(query, [r for r in records if r])
+
+    def place_record(self, place_id):
+        panel = self.place_panel(place_id)
+        if panel is None:
+            return None
+        card = self.cards[self.card_ids.index(place_id)]
+        record = {"data_id": f"0x0:0x{place_id}", "place_id": place_id}
+        for field, pattern in PANEL_FIELD_PATTERNS.items():
+            match = pattern.search(panel)
+            record[field] = match.group(1).strip() if match else None
+        for field, pattern in CARD_FIELD_PATTERNS.items():
+            match = pattern.search(card)
+            record[field] = match.group(1).strip() if match else None
+        return record
+
+    def place_panel(self, place_id):
+        base_id, _, copy_index = place_id.partition("~")
+        panel = self.places.get(base_id)
+        if panel is None or not copy_index:
+            return panel
+        # Keep the detail panel consistent with the renamed card (name and phone stay unique per copy)
+        suffix = int(copy_index) + 1
+        panel = re.sub(r'(<h1 class="DUwDvf[^"]*">)([^<]*)(</h1>)', lambda m: f"{m.group(1)}{m.group(2)} {suffix}{m.group(3)}", panel)
+        return re.sub(r'(\+1 \d{3}-\d{3}-)(\d{4})', lambda m: f"{m.group(1)}{(int(m.group(2)) + suffix * 100) % 10000:04d}", panel)
+
+# =================== HTTP SERVER =================== #
+
+def site_file(sites_dir, path):
+    """Resolves /sites/<host>/<page> to a file under sites_dir ('' -> index.html, 'contact' -> contact.html)."""
+    relative = os.path.normpath(unquote(path)).lstrip(os.sep)
+    if relative.startswith(".."):
+        return None
+    candidate = os.path.join(sites_dir, relative)
+    for option in (candidate, os.path.join(candidate, "index.html"), candidate + ".html"):
+        if os.path.isfile(option):
+            return option
+    return None
+
+
+def make_handler(fixtures, latency_ms=0, sites_dir=DEFAULT_SITES_DIR):
+    """Builds a request handler bound to the given fixtures and simulated network latency."""
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logging.debug("Replay %s - %s", self.address_string(), format % args)
+
+        def _send(self, status, body, content_type="text/html; charset=utf-8", extra_headers=None):
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Cache-Control", "no-store")
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            path = parsed.path.rstrip("/")
+            if path in ("", "/maps") or path.startswith("/maps/place"):
+                self._send(200, fixtures.shell)
+            elif path == "/replay/results":
+                params = parse_qs(parsed.query)
+                page = int(params.get("page", ["0"])[0])
+                html, is_last = fixtures.results_page(page)
+                self._send(200, html, extra_headers={"X-Replay-Last-Page": "1" if is_last else "0"})
+            elif path == "/search":
+                # Structured listing payload, fetched by the shell alongside each results page
+                params = parse_qs(parsed.query)
+                page = int(params.get("page", ["0"])[0])
+                query = params.get("q", [""])[0]
+                self._send(200, fixtures.search_payload(query, page), content_type="application/json; charset=utf-8")
+            elif path.startswith("/sites/"):
+                file_path = site_file(sites_dir, path[len("/sites/"):])
+                if file_path is None:
+                    self._send(404, "Not found", content_type="text/plain; charset=utf-8")
+                else:
+                    with open(file_path, encoding="utf-8") as f:
+                        content_type = "text/plain; charset=utf-8" if file_path.endswith(".txt") else "text/html; charset=utf-8"
+                        self._send(200, f.read(), content_type=content_type)
+            elif path.startswith("/replay/place/"):
+                panel = fixtures.place_panel(unquote(path[len("/replay/place/"):]))
+                if panel is None:
+                    self._send(404, "Unknown place")
+                else:
+                    self._send(200, panel)
+            else:
+                self._send(404, "Not found", content_type="text/plain; charset=utf-8")
+
+    return ReplayHandler
+
+
+def start_replay_server(fixture_dir=DEFAULT_FIXTURE_DIR, host=DEFAULT_HOST, port=0,
+                        page_size=DEFAULT_PAGE_SIZE, repeat=1, latency_ms=0, sites_dir=DEFAULT_SITES_DIR):
+    """Starts the replay server on a background thread. Returns (server, base_url); call server.shutdown() to stop."""
+    fixtures = ReplayFixtures(fixture_dir, page_size=page_size, repeat=repeat)
+    server = ThreadingHTTPServer((host, port), make_handler(fixtures, latency_ms, sites_dir))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="maps-replay", daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/maps"
+    logging.info(f"Maps replay server serving {len(fixtures.cards)} cards from '{fixture_dir}' at {base_url}")
+    return server, base_url
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Replay recorded Google Maps pages for offline scraper runs.")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR, help="Directory with shell.html, results.html and places/")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE, help="Cards added per scroll")
+    parser.add_argument("--repeat", type=int, default=1, help="Replicate recorded cards N times")
+    parser.add_argument("--latency_ms", type=int, default=0, help="Simulated per-request latency")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(args.fixtures, args.host, args.port, args.page_size, args.repeat, args.latency_ms)
+    print(f"Point the scraper at: --base_url {base_url}")
+    print(f"Point email_enricher.py at: --site_base {base_url[:-len('/maps')]}/sites")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,495 @@
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# =================== CONFIGURATION =================== #
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REFERENCE = "HEAD"       # Git revision whose pipeline is the reference (the working tree is the candidate)
+DEFAULT_ROWS = 4000              # Rows per generated file
+DEFAULT_SEED = 7
+DEFAULT_REPEAT = 1               # Timed runs per side; the fastest counts
+DEFAULT_CHUNKSIZE = 700          # formatter_chunked chunk size (small, so generated inputs span many chunks)
+SHOW_DIFFS = 5                   # Differing rows printed per output
+
+# Modules whose behaviour is compared; every .py of a tree is loaded from that tree so they see its helpers too
+PIPELINE_MODULES = ("FindLeadsAndAddSource", "formatter")
+
+# Folders a script-style module may write into relative to where it runs (the original formatter writes
+# ./Files/default29.xlsx and fails when the folder is missing)
+SCRIPT_OUTPUT_FOLDERS = ("Files", "Outputs")
+
+# Target zips for find_leads (from its default list) and zips that must not match
+GENERATED_ZIPS = ["28012", "28052", "28054", "28056", "28164"]
+OTHER_ZIPS = ["28001", "29301", "10001"]
+
+# =================== IMPLEMENTATIONS =================== #
+
+class HarnessError(Exception):
+    """A comparison that cannot be set up (unknown revision, tree without the pipeline modules)."""
+
+
+class ScriptError(Exception):
+    """A script-style module failed, or was asked for something only an importable module offers."""
+
+
+class ScriptModule:
+    """
+    A pipeline module written as a script, which does its work at import (the original formatter reads
+    LeadsApart.csv and writes its workbook at module level) and so cannot be imported and called.
+    run() executes it as `python <name>.py` in a run directory holding the case's inputs, the way it was
+    used by hand. Its timings include interpreter start-up.
+    """
+
+    def __init__(self, root, name, import_error):
+        self.root = root
+        self.name = name
+        self.import_error = f"{type(import_error).__name__}: {import_error}"
+
+    def __getattr__(self, attr):
+        raise ScriptError(f"{self.name}.py in {self.root} only runs as a script (importing it failed with "
+                          f"{self.import_error}), so it has no {attr}")
+
+    def run(self, run_dir, inputs):
+        """Runs the script in run_dir with the `inputs` files copied in; returns the workbooks it wrote."""
+        for path in inputs:
+            shutil.copyfile(path, os.path.join(run_dir, os.path.basename(path)))
+        for folder in SCRIPT_OUTPUT_FOLDERS:
+            os.makedirs(os.path.join(run_dir, folder), exist_ok=True)
+        pattern = os.path.join(run_dir, "**", "*.xlsx")
+        before = set(glob.glob(pattern, recursive=True))
+        process = subprocess.run([sys.executable, os.path.join(self.root, f"{self.name}.py")], cwd=run_dir,
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            lines = process.stderr.strip().splitlines() or [f"exit status {process.returncode}"]
+            raise ScriptError(f"{self.name}.py failed: {lines[-1]}")
+        return sorted(set(glob.glob(pattern, recursive=True)) - before)
+
+
+def load_tree(root, names=PIPELINE_MODULES):
+    """
+    Imports `names` from the source tree at root, isolated from any other copy of the same modules: the
+    tree's own modules are swapped into sys.modules for the import and swapped out again afterwards, so
+    the returned modules keep their own helpers (lead_schema, fuzzy_dedup, ...) bound.
+    Imports done inside functions (the ledger and email enrichment) are not isolated; runs leave them off.
+    A module that fails to import is taken to be script-style and comes back as a ScriptModule.
+    """
+    local = {os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(root, "*.py"))}
+    missing = [name for name in names if name not in local]
+    if missing:
+        raise HarnessError(f"{root} has no {', '.join(name + '.py' for name in missing)}")
+    saved = {name: sys.modules.pop(name) for name in list(sys.modules) if name in local}
+    sys.path.insert(0, root)
+    try:
+        modules = {}
+        # Imported from an empty directory: a script-style module then fails on its missing input instead
+        # of running on (and writing next to) whatever the harness's working directory holds
+        with tempfile.TemporaryDirectory(prefix="import_") as empty, quiet(), working_directory(empty):
+            for name in names:
+                try:
+                    modules[name] = importlib.import_module(name)
+                except (Exception, SystemExit) as e:
+                    modules[name] = ScriptModule(root, name, e)
+        return modules
+    finally:
+        sys.path.remove(root)
+        for name in local:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+def export_revision(revision, dest):
+    """Writes the top-level .py files of a git revision into dest."""
+    process = subprocess.run(["git", "-C", REPO_DIR, "archive", "--format=tar", revision], capture_output=True)
+    if process.returncode != 0:
+        raise HarnessError(f"Cannot export revision '{revision}': {process.stderr.decode(errors='replace').strip()}")
+    archive = process.stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        members = [m for m in tar.getmembers() if m.isfile() and "/" not in m.name and m.name.endswith(".py")]
+        tar.extractall(dest, members=members)
+    return dest
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the pipelines' status prints and INFO logging while they are timed."""
+    previous = logging.root.manager.disable
+    logging.disable(logging.WARNING)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(previous)
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+# =================== INPUTS =================== #
+
+BUSINESS_TYPES = ["apartment buildings", "Gyms", "laundromats", "rv parks", "high schools", "motels", "nursing homes",
+                  "factories", "auto repair shops", "mobile home parks", "restaurants"]
+SUB_CATEGORIES = ["Apartment complex", "Gym", "Laundromat", "RV park", "High school", "Motel", "Nursing home",
+                  "Manufacturer", "Cafe", "No category", "no category", "Mechanic", "Campground"]
+REVIEW_COUNTS = ["No reviews", "3", "4", "12", "1,204", "57", "250"]
+RATINGS = ["4.5", "No ratings", "3.9", "5", "4"]
+LATEST_REVIEWS = ["2 weeks ago on\nGoogle", "a year ago", "No review date", "3 months ago edited", "5 days ago",
+                  "Edited 2 months ago", "an hour ago on Google"]
+CITIES = ["Gastonia", "Belmont", "Mount Holly", "Stanley", "Cramerton"]
+
+
+def _address(rng, index):
+    """Addresses covering the zip-matching cases, including the ZIP_CHECK_LENGTH tail heuristic."""
+    target = GENERATED_ZIPS[index % len(GENERATED_ZIPS)]
+    other = OTHER_ZIPS[index % len(OTHER_ZIPS)]
+    city = CITIES[index % len(CITIES)]
+    kind = rng.integers(0, 10)
+    if kind <= 4:
+        return f"{100 + index % 900} Main St, {city}, NC {target}, United States"
+    if kind == 5:
+        # Short enough that the whole string is checked
+        return f"{city}, NC {target}"
+    if kind == 6:
+        # Target zip only as a leading street number, outside the checked tail
+        return f"{target} Industrial Parkway Building {index % 9}, {city} Township, NC {other}, United States"
+    if kind == 7:
+        return f"{index % 500} Elm Ave, {city}, NC {other}, United States"
+    if kind == 8:
+        # Includes US addresses the street/city/state/zip pattern cannot split (no zip, state spelled out)
+        return rng.choice(["No address", "Somewhere without a comma", "5 Elm, Toronto, ON M5V 2T6, Canada",
+                           f"12 Oak St, {city}, NC, United States", f"12 Oak St, {city}, North Carolina {target}, United States"])
+    return None
+
+
+def generate_leads(rows, seed, scraped=True, phone_offset=0):
+    """
+    Synthetic leads in the scraper's CSV layout (scraped=True) or an archive workbook's layout, with the
+    placeholders, NaNs and near-duplicates real files carry.
+    """
+    rng = np.random.default_rng(seed)
+    pick = lambda values, missing=0.0: [None if rng.random() < missing else values[rng.integers(len(values))]
+                                        for _ in range(rows)]
+    # Phones repeat inside and across files (the dedup and source-priority cases); some are missing
+    phones = [None if rng.random() < 0.04 else "No phone number" if rng.random() < 0.03 else
+              f"+1 704-555-{(phone_offset + rng.integers(rows)) % 10000:04d}" for _ in range(rows)]
+    phones = [f" {p} " if p and p.startswith("+") and rng.random() < 0.05 else p for p in phones]
+    names = [f"Biz {i}" if rng.random() < 0.8 else rng.choice(["Sunrise Apartments", "Sunrise Apts", "The Gym Co",
+                                                                 "Gym Co", "Riverbend RV Park"])
+             for i in range(rows)]
+    df = pd.DataFrame({
+        "Type of Business": pick(BUSINESS_TYPES),
+        "Sub-Category": pick(SUB_CATEGORIES, 0.0 if scraped else 0.03),
+        "Name of Business": names,
+        "Website": pick(["x.com", "https://sunriseaptsnc.com", "stanleyfitness.com"], 0.3),
+        "# of Reviews": pick(REVIEW_COUNTS, 0.0 if scraped else 0.03),
+        "Rating": pick(RATINGS, 0.0 if scraped else 0.03),
+        "Latest Review Date" if scraped else "Latest Review": pick(LATEST_REVIEWS, 0.0 if scraped else 0.03),
+        "Business Address": [_address(rng, i) for i in range(rows)],
+        "Phone Number": phones,
+        "Scraped At": pick(["2026-09-01T12:00:00+00:00", "2026-06-15T08:30:00+00:00"], 0.2),
+    })
+    if scraped:
+        # The scraper always writes a placeholder, never an empty field, for these
+        df["Business Address"] = df["Business Address"].fillna("No address")
+    return df
+
+
+def write_generated_case(case_dir, rows, seed):
+    """LeadsApart.csv for the formatter plus an archive (Files/) for find_leads and clean."""
+    files_dir = os.path.join(case_dir, "Files")
+    os.makedirs(files_dir, exist_ok=True)
+    generate_leads(rows, seed).to_csv(os.path.join(case_dir, "LeadsApart.csv"), index=False)
+    generate_leads(rows, seed + 1, scraped=False).to_excel(os.path.join(files_dir, "default_generated.xlsx"), index=False)
+    generate_leads(rows, seed + 2, scraped=False, phone_offset=rows // 2).to_excel(
+        os.path.join(files_dir, "ListA.xlsx"), index=False)
+    # An older list: "Latest Review Date" header, no Sub-Category/Rating/Scraped At columns
+    legacy = generate_leads(rows // 4, seed + 3, scraped=True).drop(columns=["Sub-Category", "Rating", "Scraped At"])
+    legacy.to_excel(os.path.join(files_dir, "legacy_list.xlsx"), index=False)
+    return case_dir
+
+
+def recorded_case(case_dir, csv_path=None, files_dir=None):
+    """A case from real inputs: a scraper CSV and/or a Files/ archive (copied, the runs write next to them)."""
+    os.makedirs(os.path.join(case_dir, "Files"), exist_ok=True)
+    if csv_path:
+        shutil.copyfile(csv_path, os.path.join(case_dir, "LeadsApart.csv"))
+    for path in glob.glob(os.path.join(files_dir, "*.xlsx")) if files_dir else []:
+        shutil.copyfile(path, os.path.join(case_dir, "Files", os.path.basename(path)))
+    return case_dir
+
+# =================== PATHS =================== #
+
+def run_clean(modules, case_dir, run_dir):
+    """clean_and_filter_dataframe on every archive workbook, as find_leads reads them."""
+    find_leads = modules["FindLeadsAndAddSource"]
+    # Trees from before lead_schema read the workbooks with plain pandas
+    read_excel = getattr(find_leads, "read_leads_excel", pd.read_excel)
+    frames = []
+    for path in sorted(glob.glob(os.path.join(case_dir, "Files", "*.xlsx"))):
+        df = find_leads.clean_and_filter_dataframe(read_excel(path), os.path.basename(path))
+        frames.append(df.assign(_file=os.path.basename(path)))
+    return {"leads": pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()}
+
+
+def run_formatter(modules, case_dir, run_dir, chunksize=None):
+    formatter = modules["formatter"]
+    output = os.path.join(run_dir, "formatted.xlsx")
+    csv_path = os.path.join(case_dir, "LeadsApart.csv")
+    if isinstance(formatter, ScriptModule):
+        # The script writes wherever its output_file points; the one new workbook is its output
+        written = formatter.run(run_dir, [csv_path])
+        if len(written) != 1:
+            raise ScriptError(f"formatter.py wrote {len(written)} workbooks, expected one")
+        output = written[0]
+    elif chunksize:
+        formatter.format_chunked(csv_path, output, chunksize)
+    else:
+        formatter.format_in_memory(csv_path, output)
+    return {"leads": pd.read_excel(output, dtype=str)}
+
+
+def run_find_leads(modules, case_dir, run_dir):
+    """find_leads_by_zip over the case's Files/, run from run_dir (Outputs/ is written there)."""
+    find_leads = modules["FindLeadsAndAddSource"]
+    input_folder = find_leads.INPUT_FOLDER_NAME
+    # An absolute folder name wins over the working directory in find_leads' os.path.join
+    find_leads.INPUT_FOLDER_NAME = os.path.join(case_dir, "Files")
+    try:
+        with working_directory(run_dir):
+            find_leads.find_leads_by_zip()
+    finally:
+        find_leads.INPUT_FOLDER_NAME = input_folder
+    output = os.path.join(run_dir, find_leads.OUTPUT_FOLDER_NAME, find_leads.OUTPUT_FILENAME)
+    queries = os.path.join(run_dir, find_leads.OUTPUT_FOLDER_NAME, find_leads.QUERIES_FILENAME)
+    lines = []
+    if os.path.exists(queries):
+        with open(queries, encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f]
+    return {"leads": pd.read_excel(output, dtype=str) if os.path.exists(output) else pd.DataFrame(),
+            "queries": pd.DataFrame({"query": lines})}
+
+
+def use_zips(modules, zips):
+    """Points find_leads at a zip list, building its regex the way the module does."""
+    find_leads = modules["FindLeadsAndAddSource"]
+    find_leads.zip_codes = list(zips)
+    find_leads.zip_pattern = '|'.join([r'\b' + re.escape(code) + r'\b' for code in zips])
+
+
+# formatter sorts on (priority, Type of Business, Sub-Category) with an unstable sort, so the order of
+# rows sharing those values is arbitrary; its outputs are compared with ties put in a canonical order
+FORMATTER_SORT_COLUMNS = ["Type of Business", "Sub-Category"]
+
+# name -> (reference runner, candidate runner, input the path needs, sort-tie columns or None for exact order)
+PATHS = {
+    "clean": (run_clean, run_clean, "Files", None),
+    "formatter": (run_formatter, run_formatter, "LeadsApart.csv", FORMATTER_SORT_COLUMNS),
+    # The chunked mode has to reproduce the in-memory output
+    "formatter_chunked": (run_formatter, lambda m, c, r: run_formatter(m, c, r, chunksize=DEFAULT_CHUNKSIZE),
+                          "LeadsApart.csv", FORMATTER_SORT_COLUMNS),
+    "find_leads": (run_find_leads, run_find_leads, "Files", None),
+}
+
+# =================== DIFF =================== #
+
+def _cell(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def normalize(df):
+    """Rows as tuples of strings (missing = '', 4.0 = '4'), so dtype choices do not count as differences."""
+    columns = list(df.columns)
+    rows = [tuple(_cell(v) for v in row) for row in df.astype(object).itertuples(index=False, name=None)]
+    return columns, rows
+
+
+def order_ties(columns, rows, tie_columns):
+    """Sorts each run of consecutive rows with equal tie_columns values by content; the runs stay in place."""
+    positions = [columns.index(c) for c in tie_columns if c in columns]
+    ordered, run = [], []
+    for row in rows:
+        if run and [row[p] for p in positions] != [run[0][p] for p in positions]:
+            ordered.extend(sorted(run))
+            run = []
+        run.append(row)
+    return ordered + sorted(run)
+
+
+def diff_frames(reference, candidate, tie_columns=None, show=SHOW_DIFFS):
+    """
+    Row-for-row comparison. 'reordered' = same rows in another order; with tie_columns, rows that only
+    swap places within a run of equal sort values count as the same order ('ties_reordered').
+    Examples show the first differences.
+    """
+    ref_columns, ref_rows = normalize(reference)
+    cand_columns, cand_rows = normalize(candidate)
+    ties_reordered = False
+    if tie_columns:
+        exact = ref_columns == cand_columns and ref_rows == cand_rows
+        ref_rows = order_ties(ref_columns, ref_rows, tie_columns)
+        cand_rows = order_ties(cand_columns, cand_rows, tie_columns)
+        ties_reordered = not exact and ref_columns == cand_columns and ref_rows == cand_rows
+    result = {"reference_rows": len(ref_rows), "candidate_rows": len(cand_rows),
+              "missing_columns": [c for c in ref_columns if c not in cand_columns],
+              "extra_columns": [c for c in cand_columns if c not in ref_columns],
+              "column_order_differs": ref_columns != cand_columns}
+    shared = [c for c in ref_columns if c in cand_columns]
+    ref_rows = [tuple(row[ref_columns.index(c)] for c in shared) for row in ref_rows]
+    cand_rows = [tuple(row[cand_columns.index(c)] for c in shared) for row in cand_rows]
+    mismatched = [i for i, (a, b) in enumerate(zip(ref_rows, cand_rows)) if a != b]
+    mismatched += list(range(min(len(ref_rows), len(cand_rows)), max(len(ref_rows), len(cand_rows))))
+    only_ref = Counter(ref_rows) - Counter(cand_rows)
+    only_cand = Counter(cand_rows) - Counter(ref_rows)
+    result.update({
+        "mismatched_rows": len(mismatched),
+        "reordered": bool(mismatched) and not only_ref and not only_cand,
+        "only_in_reference": sum(only_ref.values()),
+        "only_in_candidate": sum(only_cand.values()),
+        "ties_reordered": ties_reordered,
+        "identical": not mismatched and not result["missing_columns"] and not result["extra_columns"]
+                     and not result["column_order_differs"],
+    })
+    examples = []
+    for position in mismatched[:show]:
+        a = ref_rows[position] if position < len(ref_rows) else None
+        b = cand_rows[position] if position < len(cand_rows) else None
+        if a is not None and b is not None:
+            examples.append({"row": position, "columns": {c: [x, y] for c, x, y in zip(shared, a, b) if x != y}})
+        else:
+            examples.append({"row": position, "reference": a and dict(zip(shared, a)),
+                             "candidate": b and dict(zip(shared, b))})
+    result["examples"] = examples
+    return result
+
+
+def timed_run(runner, modules, case_dir, work_dir, label, repeat):
+    """(outputs or exception name, fastest seconds) over `repeat` runs, each in a fresh directory."""
+    best = None
+    outputs = None
+    for attempt in range(max(1, repeat)):
+        run_dir = tempfile.mkdtemp(prefix=f"{label}_{attempt}_", dir=work_dir)
+        started = time.perf_counter()
+        try:
+            with quiet():
+                outputs = runner(modules, case_dir, run_dir)
+        except Exception as e:
+            # Both sides raising the same error on an input is equivalent behaviour too
+            return f"{type(e).__name__}: {e}", None
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return outputs, best
+
+
+def compare_path(path, reference, candidate, case_name, case_dir, work_dir, repeat=DEFAULT_REPEAT):
+    ref_runner, cand_runner, needs, tie_columns = PATHS[path]
+    result = {"path": path, "case": case_name}
+    needed = os.path.join(case_dir, needs)
+    if not os.path.exists(needed) or (os.path.isdir(needed) and not os.listdir(needed)):
+        result["skipped"] = f"case has no {needs}"
+        return result
+    ref_outputs, ref_s = timed_run(ref_runner, reference, case_dir, work_dir, f"{path}_ref", repeat)
+    cand_outputs, cand_s = timed_run(cand_runner, candidate, case_dir, work_dir, f"{path}_cand", repeat)
+    result.update({"reference_s": ref_s and round(ref_s, 3), "candidate_s": cand_s and round(cand_s, 3),
+                   "speedup": round(ref_s / cand_s, 2) if ref_s and cand_s else None})
+    if isinstance(ref_outputs, str) or isinstance(cand_outputs, str):
+        result["identical"] = ref_outputs == cand_outputs
+        result["errors"] = {"reference": ref_outputs if isinstance(ref_outputs, str) else None,
+                            "candidate": cand_outputs if isinstance(cand_outputs, str) else None}
+        return result
+    result["outputs"] = {name: diff_frames(ref_outputs[name], cand_outputs.get(name, pd.DataFrame()), tie_columns)
+                         for name in ref_outputs}
+    result["identical"] = all(diff["identical"] for diff in result["outputs"].values())
+    return result
+
+
+def run_harness(reference_dir, candidate_dir, cases, paths, work_dir, repeat=DEFAULT_REPEAT):
+    """
+    Runs every path on every case with both implementations. cases are (name, directory, zips) with zips
+    None for the module's own list. Returns one result dict per (path, case).
+    """
+    reference = load_tree(reference_dir)
+    candidate = load_tree(candidate_dir)
+    scripts = [name for name, module in candidate.items() if isinstance(module, ScriptModule)]
+    if scripts:
+        raise HarnessError(f"Candidate modules failed to import: "
+                           f"{'; '.join(f'{name}: {candidate[name].import_error}' for name in scripts)}")
+    module_zips = list(candidate["FindLeadsAndAddSource"].zip_codes)
+    results = []
+    for case_name, case_dir, zips in cases:
+        # Both sides search the same zips, so a changed default list is not mistaken for a pipeline change
+        use_zips(reference, zips or module_zips)
+        use_zips(candidate, zips or module_zips)
+        for path in paths:
+            result = compare_path(path, reference, candidate, case_name, case_dir, work_dir, repeat)
+            status = "skipped" if "skipped" in result else "identical" if result["identical"] else "DIFFERENT"
+            logging.info(f"{path:<18} {case_name:<10} {status:<10} reference {result.get('reference_s')}s, "
+                         f"candidate {result.get('candidate_s')}s (speedup {result.get('speedup')})")
+            results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(
+        description="Run the reference and working-tree lead pipelines side by side and diff their outputs.")
+    parser.add_argument("--reference", default=DEFAULT_REFERENCE, help="Git revision of the reference implementation")
+    parser.add_argument("--reference_dir", default=None, help="Source tree of the reference instead of a git revision")
+    parser.add_argument("--candidate_dir", default=REPO_DIR, help="Source tree of the optimized implementation")
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows per generated file")
+    parser.add_argument("--seed", type=int, nargs="*", default=[DEFAULT_SEED],
+                        help="One generated case per seed (none: recorded inputs only)")
+    parser.add_argument("--csv", default=None, help="Recorded scraper CSV (e.g. LeadsApart.csv) to compare on")
+    parser.add_argument("--files_dir", default=None, help="Recorded archive of .xlsx lead files (e.g. Files/)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per side (fastest counts)")
+    parser.add_argument("--report", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="pipeline_equivalence_") as work_dir:
+            reference_dir = args.reference_dir or export_revision(args.reference, os.path.join(work_dir, "reference"))
+            # Generated archives only carry GENERATED_ZIPS; recorded ones are searched with the module's zip list
+            cases = [(f"seed{seed}", write_generated_case(os.path.join(work_dir, f"seed{seed}"), args.rows, seed),
+                      GENERATED_ZIPS) for seed in args.seed]
+            if args.csv or args.files_dir:
+                cases.append(("recorded", recorded_case(os.path.join(work_dir, "recorded"), args.csv, args.files_dir),
+                              None))
+            results = run_harness(reference_dir, args.candidate_dir, cases, args.paths, work_dir, args.repeat)
+    except HarnessError as e:
+        logging.error(e)
+        sys.exit(2)
+
+    different = [r for r in results if r.get("identical") is False]
+    for result in different:
+        print(json.dumps(result, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"reference": args.reference_dir or args.reference, "results": results}, f, indent=2)
+    print(f"{len(results) - len(different)} of {len(results)} path/case runs equivalent")
+    sys.exit(1 if different else 0)
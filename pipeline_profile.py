@@ -0,0 +1,146 @@
+import cProfile
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_PROFILE_DIR = "./Outputs/profiles"
+
+# =================== PROFILER =================== #
+
+class PipelineProfiler:
+    """
+    Per-stage wall time, rows in/out and peak traced memory for the batch scripts.
+    A stage that runs more than once (per file, per chunk) is aggregated under one name.
+    Disabled profilers still yield a record from stage(), so call sites need no branches.
+    """
+
+    def __init__(self, script, enabled=False):
+        self.script = script
+        self.enabled = enabled
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.current = None
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """with profiler.stage("dedup", len(df)) as record: ...; record["rows_out"] = len(df)"""
+        record = self.begin(name, rows_in)
+        try:
+            yield record
+        finally:
+            self.end()
+
+    def begin(self, name, rows_in=None):
+        """Starts a stage for sections too long for a with-block; end() closes it."""
+        record = {"rows_in": rows_in, "rows_out": None}
+        if not self.enabled:
+            return record
+        if self.current is not None:
+            self.end()
+        tracemalloc.reset_peak()
+        self.current = {"name": name, "record": record, "started": time.perf_counter(), "steps": {}}
+        self.current["mark"] = self.current["started"]
+        return record
+
+    def end(self, rows_out=None):
+        if not self.enabled or self.current is None:
+            return
+        current, self.current = self.current, None
+        if rows_out is not None:
+            current["record"]["rows_out"] = rows_out
+        wall_s = time.perf_counter() - current["started"]
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        self._add(current["name"], current["record"], wall_s, peak_mb, current["steps"])
+
+    def _add(self, name, record, wall_s, peak_mb, steps):
+        entry = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "rows_in": None, "rows_out": None,
+                                              "peak_memory_mb": 0.0, "steps": {}})
+        entry["calls"] += 1
+        entry["wall_s"] += wall_s
+        entry["peak_memory_mb"] = max(entry["peak_memory_mb"], peak_mb)
+        for key in ("rows_in", "rows_out"):
+            if record.get(key) is not None:
+                entry[key] = (entry[key] or 0) + record[key]
+        for step, (step_s, rows) in steps.items():
+            total = entry["steps"].setdefault(step, {"wall_s": 0.0, "rows_out": 0})
+            total["wall_s"] += step_s
+            total["rows_out"] += rows
+
+    def step(self, step_name, count):
+        """Marks the end of a filter step inside the current stage (time since the previous mark)."""
+        if not self.enabled or self.current is None:
+            return
+        now = time.perf_counter()
+        previous = self.current["steps"].get(step_name, (0.0, 0))
+        self.current["steps"][step_name] = (previous[0] + now - self.current["mark"], previous[1] + count)
+        self.current["mark"] = now
+
+    def wrap_report(self, report):
+        """A report(step_name, count) callback that also records each step's time."""
+        def wrapped(step_name, count):
+            self.step(step_name, count)
+            report(step_name, count)
+        return wrapped
+
+    def report(self):
+        stages = []
+        for name, entry in self.stages.items():
+            stage = {"stage": name, **entry, "wall_s": round(entry["wall_s"], 4),
+                     "peak_memory_mb": round(entry["peak_memory_mb"], 2)}
+            stage["steps"] = [{"step": step, "wall_s": round(t["wall_s"], 4), "rows_out": t["rows_out"]}
+                              for step, t in entry["steps"].items()]
+            stages.append(stage)
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if tracemalloc.is_tracing() else None
+        return {
+            "script": self.script,
+            "started_at": self.started_at,
+            "wall_s": round(time.perf_counter() - self.started, 4),
+            "peak_memory_mb": round(max([peak_mb or 0] + [s["peak_memory_mb"] for s in stages]), 2),
+            "stages": stages,
+        }
+
+    def save(self, path):
+        if not self.enabled or not path:
+            return None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        logging.info(f"Profile report ({len(report['stages'])} stages, {report['wall_s']}s) written to '{path}'")
+        return report
+
+
+def default_profile_path(script):
+    return os.path.join(DEFAULT_PROFILE_DIR, f"{script}_profile.json")
+
+
+def add_profile_args(parser, script):
+    """--profile [REPORT.json] and --cprofile DUMP.prof, shared by the batch scripts."""
+    parser.add_argument("--profile", nargs="?", const=default_profile_path(script), default=None,
+                        help="Write per-stage time/rows/peak-memory JSON here (default path if no value given)")
+    parser.add_argument("--cprofile", default=None, help="Also dump cProfile stats here (read with pstats/snakeviz)")
+
+
+def run_profiled(func, cprofile_path=None):
+    """Calls func(), under cProfile when cprofile_path is set."""
+    if not cprofile_path:
+        return func()
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func)
+    finally:
+        directory = os.path.dirname(cprofile_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profile.dump_stats(cprofile_path)
+        logging.info(f"cProfile stats written to '{cprofile_path}'")
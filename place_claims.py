@@ -0,0 +1,194 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from known_leads import normalize_name
+from maps_payload import card_data_id
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_RUN = "default"
+DEFAULT_CLAIM_TTL_S = 6 * 3600.0    # Older claims (an earlier run under the same name) are taken over
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS place_claims (
+    run TEXT NOT NULL,
+    place TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (run, place)
+) WITHOUT ROWID;
+"""
+
+
+def place_key(href, name=None, zip_code=None):
+    """
+    A listing's identity across queries: the place id in the card's href ('/maps/place/...!1s0x..:0x..!...'),
+    else the href's path, else the name in the query's zip (only repeats within one zip are caught then).
+    """
+    data_id = card_data_id(href)
+    if data_id:
+        return f"id:{data_id}"
+    if href:
+        return f"url:{urlsplit(href).path}"
+    name = normalize_name(name)
+    return f"name:{name}|{zip_code or ''}" if name else None
+
+# =================== BACKENDS =================== #
+
+class PlaceClaims:
+    """
+    Listings claimed by the workers of one run. A worker claims a card before opening it; a card another
+    worker (thread, or with a shared backend another process or host) already claimed is skipped, so
+    overlapping queries do not scrape the same business twice. A worker that fails to scrape a claimed
+    card releases it for the others. This base class keeps the claims in memory for one process.
+
+    claim(key, owner) -> bool    True when the key is now ours (or already was)
+    release(key, owner)          give the key up (only if we hold it)
+    """
+
+    def __init__(self, run=DEFAULT_RUN):
+        self.run = run
+        self.lock = threading.Lock()
+        self.owners = {}
+        self.stats = {"claimed": 0, "taken": 0, "released": 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def claim(self, key, owner):
+        if key is None:
+            return True
+        with self.lock:
+            holder = self.owners.setdefault(key, owner)
+        if holder != owner:
+            self._count("taken")
+            return False
+        self._count("claimed")
+        return True
+
+    def release(self, key, owner):
+        with self.lock:
+            if key is not None and self.owners.get(key) == owner:
+                del self.owners[key]
+                self.stats["released"] += 1
+
+    def count(self):
+        with self.lock:
+            return len(self.owners)
+
+    def clear(self):
+        with self.lock:
+            cleared = len(self.owners)
+            self.owners.clear()
+        return cleared
+
+    def close(self):
+        pass
+
+
+class SQLitePlaceClaims(PlaceClaims):
+    """
+    PlaceClaims in a SQLite file shared by scraper processes (one machine, or hosts sharing the file like the
+    work queue). Claims are single upserts, so two processes never both win a key. Keys this process holds
+    are answered from memory.
+    """
+
+    def __init__(self, path, run=DEFAULT_RUN, ttl_s=DEFAULT_CLAIM_TTL_S, clock=time.time):
+        super().__init__(run)
+        self.path = path
+        self.ttl_s = ttl_s
+        self.clock = clock
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.db_lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def claim(self, key, owner):
+        if key is None:
+            return True
+        with self.lock:
+            holder = self.owners.get(key)
+        if holder is not None and holder != owner:
+            # One of this process's other workers has it
+            self._count("taken")
+            return False
+        if holder == owner:
+            return True
+        now = self.clock()
+        with self.db_lock:
+            # Inserted, or taken over from a claim old enough to belong to an earlier run
+            won = self.conn.execute(
+                "INSERT INTO place_claims (run, place, owner, claimed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (run, place) DO UPDATE SET owner = excluded.owner, claimed_at = excluded.claimed_at "
+                "WHERE place_claims.claimed_at < ?",
+                (self.run, key, owner, now, now - self.ttl_s)).rowcount == 1
+            if not won:
+                row = self.conn.execute("SELECT owner FROM place_claims WHERE run = ? AND place = ?",
+                                        (self.run, key)).fetchone()
+                holder = row[0] if row else None
+        if won or holder == owner:
+            with self.lock:
+                self.owners[key] = owner
+            self._count("claimed")
+            return True
+        # Not cached: another process's claim comes free again if that process releases it
+        self._count("taken")
+        return False
+
+    def release(self, key, owner):
+        if key is None:
+            return
+        with self.db_lock:
+            self.conn.execute("DELETE FROM place_claims WHERE run = ? AND place = ? AND owner = ?",
+                              (self.run, key, owner))
+        super().release(key, owner)
+
+    def count(self):
+        with self.db_lock:
+            return self.conn.execute("SELECT COUNT(*) FROM place_claims WHERE run = ?", (self.run,)).fetchone()[0]
+
+    def clear(self):
+        """Forgets every claim of this run (before scraping the same run name again)."""
+        with self.db_lock:
+            cleared = self.conn.execute("DELETE FROM place_claims WHERE run = ?", (self.run,)).rowcount
+        super().clear()
+        return cleared
+
+
+# "sqlite:<path>" or a plain path; "" keeps claims in this process
+BACKENDS = {"sqlite": SQLitePlaceClaims}
+
+
+def open_place_claims(url, run=DEFAULT_RUN, **options):
+    if not url:
+        return PlaceClaims(run)
+    scheme, sep, location = url.partition(":")
+    if sep and scheme in BACKENDS:
+        return BACKENDS[scheme](location, run=run, **options)
+    return SQLitePlaceClaims(url, run=run, **options)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Inspect or clear the listings claimed in a scraper run.")
+    parser.add_argument("run")
+    parser.add_argument("--claims", required=True, help="Claims store ('sqlite:<path>' or a path)")
+    parser.add_argument("--clear", action="store_true", help="Forget the run's claims")
+    args = parser.parse_args()
+    claims = open_place_claims(args.claims, args.run)
+    if args.clear:
+        logging.info(f"Cleared {claims.clear()} claims of run '{args.run}'")
+    print(json.dumps({"run": args.run, "claims": claims.count()}, indent=2))
+    claims.close()
@@ -0,0 +1,199 @@
+import ast
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_HISTORY_FILE = "./Outputs/query_history.json"
+DEFAULT_QUERY_SECONDS = 120.0   # Assumed duration of a query that has never run
+DEFAULT_EXPECTED_LEADS = 10.0   # Assumed yield when there is no history for the business type either
+REFRESH_DAYS = 30               # A query scraped this long ago counts as a full coverage gap again
+MIN_STALENESS = 0.05            # Recently scraped queries keep a small share of their value
+
+LOCATION_CONNECTORS = ("near", "in", "around", "at")
+
+# =================== NORMALIZATION =================== #
+
+def _clean(text):
+    return re.sub(r"\s+", " ", str(text).strip().lower())
+
+
+def singularize(term):
+    """Collapses the plural forms generate_target_business_types produces (gyms, factories, warehouses)."""
+    words = term.split(" ")
+    last = words[-1]
+    if last.endswith("ies") and len(last) > 3:
+        last = last[:-3] + "y"
+    elif last.endswith("s") and not last.endswith("ss") and len(last) > 2:
+        last = last[:-1]
+    return " ".join(words[:-1] + [last])
+
+
+def query_location(business_type, query):
+    """The location part of a query: 'gyms near 28164' -> '28164'."""
+    text = _clean(query)
+    for variant in {business_type, singularize(business_type)}:
+        if variant and text.startswith(variant):
+            text = text[len(variant):]
+            break
+    else:
+        # The query does not start with the business type; drop the type's words wherever they are
+        text = re.sub(r"\b" + re.escape(business_type) + r"s?\b", " ", text)
+    words = [w for w in text.replace(",", " ").split() if w not in LOCATION_CONNECTORS]
+    # A leftover plural 's' from 'gym' + 's near' style queries
+    if words and words[0] == "s":
+        words = words[1:]
+    return " ".join(words)
+
+
+def query_key(business_type, query):
+    """Normalized identity of a query: singular business type + location, ignoring phrasing."""
+    business_type = _clean(business_type)
+    return f"{singularize(business_type)}|{query_location(business_type, query)}"
+
+
+def parse_query_line(line):
+    """'"gyms", "gyms near 28164"' -> ('gyms', 'gyms near 28164')."""
+    business_type, query = ast.literal_eval(line.strip())
+    return business_type, query
+
+# =================== HISTORY =================== #
+
+class QueryHistory:
+    """Per-query yield and duration from earlier runs, persisted as JSON and keyed by query_key."""
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable query history '{path}': {e}")
+
+    def record(self, business_type, query, leads, seconds, status="ok"):
+        key = query_key(business_type, query)
+        with self.lock:
+            entry = self.entries.setdefault(key, {"runs": 0, "leads": 0, "seconds": 0.0})
+            entry["runs"] += 1
+            entry["leads"] += int(leads)
+            entry["seconds"] = round(entry["seconds"] + float(seconds), 3)
+            entry["last_run"] = time.time()
+            entry["last_status"] = status
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def type_yield(self, key):
+        """Mean leads per run across every location of the same business type, or None."""
+        business_type = key.split("|", 1)[0]
+        runs = leads = 0
+        for other_key, entry in self.entries.items():
+            if other_key.split("|", 1)[0] == business_type:
+                runs += entry["runs"]
+                leads += entry["leads"]
+        return leads / runs if runs else None
+
+    def estimate(self, key, now=None):
+        """(expected leads, expected seconds, staleness 0..1) for a query key."""
+        now = now or time.time()
+        entry = self.entries.get(key)
+        if not entry or not entry["runs"]:
+            expected = self.type_yield(key)
+            return (expected if expected is not None else DEFAULT_EXPECTED_LEADS), DEFAULT_QUERY_SECONDS, 1.0
+        age_days = (now - entry.get("last_run", 0)) / 86400.0
+        staleness = max(MIN_STALENESS, min(1.0, age_days / REFRESH_DAYS))
+        return entry["leads"] / entry["runs"], entry["seconds"] / entry["runs"], staleness
+
+# =================== PLANNER =================== #
+
+class PlannedQuery:
+    def __init__(self, line, business_type, query, key, expected_leads, expected_seconds, staleness):
+        self.line = line
+        self.business_type = business_type
+        self.query = query
+        self.key = key
+        self.expected_leads = expected_leads
+        self.expected_seconds = expected_seconds
+        self.staleness = staleness
+
+    @property
+    def score(self):
+        """Expected new leads per second of scraping, discounted for recent coverage."""
+        return self.expected_leads * self.staleness / max(self.expected_seconds, 1.0)
+
+    def to_dict(self):
+        return {
+            "query": self.query,
+            "business_type": self.business_type,
+            "expected_leads": round(self.expected_leads, 2),
+            "expected_seconds": round(self.expected_seconds, 1),
+            "staleness": round(self.staleness, 2),
+        }
+
+
+def plan_queries(lines, history=None, time_budget=None, workers=1):
+    """
+    Normalizes and collapses equivalent query lines, orders them by expected yield (coverage gaps first)
+    and, with a time budget in seconds, keeps only the queries that fit.
+    Returns (planned lines, report dict).
+    """
+    history = history or QueryHistory(None)
+    planned = {}
+    duplicates = []
+    invalid = []
+    for position, line in enumerate(lines):
+        try:
+            business_type, query = parse_query_line(line)
+        except (ValueError, SyntaxError):
+            invalid.append(line)
+            continue
+        key = query_key(business_type, query)
+        if key in planned:
+            duplicates.append(query)
+            continue
+        expected_leads, expected_seconds, staleness = history.estimate(key)
+        planned[key] = (position, PlannedQuery(line, business_type, query, key, expected_leads, expected_seconds, staleness))
+
+    # Highest score first; file order breaks ties so unchanged inputs keep a stable order
+    ordered = [item for _, item in sorted(planned.values(), key=lambda p: (-p[1].score, p[0]))]
+
+    skipped = []
+    if time_budget:
+        capacity = time_budget * max(1, workers)
+        used = 0.0
+        kept = []
+        for item in ordered:
+            if used + item.expected_seconds > capacity and kept:
+                skipped.append(item)
+                continue
+            used += item.expected_seconds
+            kept.append(item)
+        ordered = kept
+
+    report = {
+        "input": len(lines),
+        "planned": len(ordered),
+        "duplicates": len(duplicates),
+        "invalid": len(invalid),
+        "over_budget": len(skipped),
+        "expected_leads": round(sum(item.expected_leads * item.staleness for item in ordered), 1),
+        "order": [item.to_dict() for item in ordered[:20]],
+        "skipped": [item.query for item in skipped],
+    }
+    return [item.line for item in ordered], report
@@ -0,0 +1,123 @@
+import logging
+import queue
+import threading
+import time
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_REVIEW_SESSIONS = 0          # Secondary browsers per query (0 = primary tab sorts reviews itself)
+SESSION_START_ATTEMPTS = 2           # A worker whose browser will not start gives its jobs to the others
+DRAIN_TIMEOUT_S = 180.0              # Longest a finished query waits for outstanding review dates
+REVIEW_DATE_FIELD = "Latest Review Date"
+NO_REVIEW_DATE = "No review date"
+
+# =================== FETCHER =================== #
+
+class ReviewDateFetcher:
+    """
+    Secondary browser sessions that open place URLs and read the latest review date while the query's
+    primary browser keeps walking the result list, so a query takes about as long as the slower of the
+    two streams instead of their sum. One WebDriver session per worker thread: a session cannot serve
+    two threads, so each "tab" is its own browser. Sessions start on the first submit().
+
+    open_session() -> session, fetch_date(session, url) -> str, close_session(session) and
+    is_fatal(exc) -> bool (the session is unusable and is replaced) are supplied by the scraper.
+    """
+
+    def __init__(self, sessions, open_session, fetch_date, close_session, is_fatal=lambda exc: False):
+        self.sessions = max(1, sessions)
+        self.open_session = open_session
+        self.fetch_date = fetch_date
+        self.close_session = close_session
+        self.is_fatal = is_fatal
+        self.jobs = queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.closed = False
+        self.cancelled = False
+        self.stats = {"submitted": 0, "fetched": 0, "failed": 0, "sessions_started": 0, "session_failures": 0,
+                      "unfinished": 0}
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def submit(self, lead, url):
+        """Queues lead's review date for a secondary session; lead[REVIEW_DATE_FIELD] is set when it is read."""
+        lead.setdefault(REVIEW_DATE_FIELD, NO_REVIEW_DATE)
+        self._count("submitted")
+        if not self.threads:
+            for index in range(self.sessions):
+                thread = threading.Thread(target=self._worker, name=f"review-session-{index}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        self.jobs.put((lead, url))
+
+    def _start_session(self):
+        for _ in range(SESSION_START_ATTEMPTS):
+            try:
+                session = self.open_session()
+                self._count("sessions_started")
+                return session
+            except Exception as e:
+                self._count("session_failures")
+                logging.warning(f"Review session failed to start: {type(e).__name__}: {e}")
+        return None
+
+    def _worker(self):
+        session = None
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    return
+                lead, url = job
+                if self.cancelled:
+                    continue
+                if session is None:
+                    session = self._start_session()
+                    if session is None:
+                        # Leave this job to another session; this worker is done
+                        self.jobs.put(job)
+                        return
+                try:
+                    lead[REVIEW_DATE_FIELD] = self.fetch_date(session, url) or NO_REVIEW_DATE
+                    self._count("fetched")
+                except Exception as e:
+                    self._count("failed")
+                    logging.warning(f"Review date fetch failed for {url}: {type(e).__name__}: {e}")
+                    if self.is_fatal(e):
+                        self._close(session)
+                        session = None
+        finally:
+            self._close(session)
+
+    def _close(self, session):
+        if session is None:
+            return
+        try:
+            self.close_session(session)
+        except Exception as e:
+            logging.warning(f"Review session close failed: {type(e).__name__}")
+
+    def close(self, timeout=DRAIN_TIMEOUT_S):
+        """
+        Waits (up to timeout) for queued review dates, then shuts the sessions down. Returns the stats.
+        timeout=0 abandons the queued listings (the query failed and its leads are not written).
+        """
+        if self.closed:
+            return dict(self.stats)
+        self.closed = True
+        self.cancelled = timeout <= 0
+        for _ in self.threads:
+            self.jobs.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        # Out of time: the query writes its leads now, so workers still busy skip the jobs left in the queue
+        # and close their sessions once the fetch in hand returns
+        self.cancelled = True
+        # Leads nobody got to (every session failed, or the wait timed out) keep the placeholder date
+        with self.lock:
+            self.stats["unfinished"] = self.stats["submitted"] - self.stats["fetched"] - self.stats["failed"]
+            return dict(self.stats)
@@ -0,0 +1,155 @@
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import psutil
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_MIN_WORKERS = 1
+DEFAULT_MAX_WORKERS = max(1, min(8, 2 * (os.cpu_count() or 1)))  # Browsers mostly wait on the network
+DEFAULT_INITIAL_WORKERS = 2
+DEFAULT_CPU_CEILING = 85.0          # System CPU % above which no more browsers are started
+DEFAULT_MEMORY_CEILING_MB = None    # Chrome tree RSS ceiling; None = 70% of physical memory
+MEMORY_RESERVE_MB = 512             # Always leave this much memory available to the OS
+DEFAULT_WORKER_RSS_MB = 400         # Assumed RSS of one browser before any worker has been measured
+LATENCY_WINDOW = 6                  # Recent query latencies compared against the best seen so far
+LATENCY_TOLERANCE = 1.5             # Slower than best * tolerance means extra workers are not paying off
+SCALE_COOLDOWN_S = 10.0             # Minimum time between two scaling decisions
+
+CHROME_PROCESS_NAMES = ("chrome", "chromium", "chromedriver", "headless_shell")
+
+# =================== RESOURCE SAMPLING =================== #
+
+def chrome_tree_rss_mb(root=None):
+    """Resident memory (MB) of the Chrome/chromedriver processes started by this process."""
+    root = root or psutil.Process()
+    total = 0
+    try:
+        children = root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0.0
+    for child in children:
+        try:
+            if any(marker in child.name().lower() for marker in CHROME_PROCESS_NAMES):
+                total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return total / (1024 * 1024)
+
+
+def default_memory_ceiling_mb():
+    return psutil.virtual_memory().total / (1024 * 1024) * 0.7
+
+
+class ResourceSample:
+    def __init__(self, cpu_percent, chrome_rss_mb, available_mb):
+        self.cpu_percent = cpu_percent
+        self.chrome_rss_mb = chrome_rss_mb
+        self.available_mb = available_mb
+
+    def to_dict(self):
+        return {
+            "cpu_percent": round(self.cpu_percent, 1),
+            "chrome_rss_mb": round(self.chrome_rss_mb, 1),
+            "available_mb": round(self.available_mb, 1),
+        }
+
+
+def sample_resources():
+    return ResourceSample(
+        cpu_percent=psutil.cpu_percent(interval=None),
+        chrome_rss_mb=chrome_tree_rss_mb(),
+        available_mb=psutil.virtual_memory().available / (1024 * 1024),
+    )
+
+# =================== AUTOSCALER =================== #
+
+class WorkerAutoscaler:
+    """
+    Decides how many browser workers may run at once.
+
+    Scales down when CPU, Chrome RSS or free memory cross their ceilings, or when recent
+    query latency has degraded past LATENCY_TOLERANCE x the best observed latency.
+    Scales up one worker at a time while there is CPU and memory headroom for another browser.
+    """
+
+    def __init__(self, min_workers=DEFAULT_MIN_WORKERS, max_workers=DEFAULT_MAX_WORKERS,
+                 initial_workers=DEFAULT_INITIAL_WORKERS, cpu_ceiling=DEFAULT_CPU_CEILING,
+                 memory_ceiling_mb=DEFAULT_MEMORY_CEILING_MB, cooldown_s=SCALE_COOLDOWN_S,
+                 sampler=sample_resources, clock=time.monotonic):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.target = min(self.max_workers, max(self.min_workers, initial_workers))
+        self.cpu_ceiling = cpu_ceiling
+        self.memory_ceiling_mb = memory_ceiling_mb or default_memory_ceiling_mb()
+        self.cooldown_s = cooldown_s
+        self.sampler = sampler
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.best_latency = None
+        self.last_change = clock()
+        self.last_sample = None
+        # Prime psutil's CPU counter so the first real sample covers a meaningful interval
+        psutil.cpu_percent(interval=None)
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            if len(self.latencies) >= 2:
+                recent = statistics.median(self.latencies)
+                if self.best_latency is None or recent < self.best_latency:
+                    self.best_latency = recent
+
+    def _latency_degraded(self):
+        if self.best_latency is None or len(self.latencies) < self.latencies.maxlen // 2:
+            return False
+        return statistics.median(self.latencies) > self.best_latency * LATENCY_TOLERANCE
+
+    def update(self, active_workers):
+        """Samples resources and returns (target, reason); reason is None when the target is unchanged."""
+        sample = self.sampler()
+        with self.lock:
+            self.last_sample = sample
+            if self.clock() - self.last_change < self.cooldown_s:
+                return self.target, None
+
+            per_worker_mb = sample.chrome_rss_mb / active_workers if active_workers else DEFAULT_WORKER_RSS_MB
+            reason = None
+            if sample.cpu_percent > self.cpu_ceiling:
+                reason = "cpu"
+            elif sample.chrome_rss_mb > self.memory_ceiling_mb:
+                reason = "chrome_rss"
+            elif sample.available_mb < MEMORY_RESERVE_MB:
+                reason = "available_memory"
+            elif self._latency_degraded():
+                reason = "latency"
+
+            if reason and self.target > self.min_workers:
+                self.target -= 1
+                # Restart the latency baseline so it reflects the new concurrency level
+                self.latencies.clear()
+                self.best_latency = None
+            elif (not reason and self.target < self.max_workers and active_workers >= self.target
+                  and sample.cpu_percent < self.cpu_ceiling * 0.8
+                  and sample.chrome_rss_mb + per_worker_mb <= self.memory_ceiling_mb
+                  and sample.available_mb - per_worker_mb >= MEMORY_RESERVE_MB):
+                self.target += 1
+                reason = "headroom"
+            else:
+                return self.target, None
+
+            self.last_change = self.clock()
+            return self.target, reason
+
+    def snapshot(self):
+        with self.lock:
+            data = {"target": self.target, "min_workers": self.min_workers, "max_workers": self.max_workers}
+            if self.last_sample is not None:
+                data.update(self.last_sample.to_dict())
+            if self.latencies:
+                data["median_query_s"] = round(statistics.median(self.latencies), 3)
+            return data
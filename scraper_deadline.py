@@ -0,0 +1,135 @@
+import math
+import os
+import signal
+import threading
+import time
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_FLUSH_RESERVE_S = 30.0     # Kept free at the end of the run for review drains, writes and shutdown
+DEFAULT_QUERY_OVERHEAD_S = 20.0    # Browser start, search and scrolling before the first listing is read
+MIN_SECONDS_PER_RESULT = 2.0       # Floor for the per-listing cost estimate
+MIN_DEADLINE_RESULTS = 3           # A query that could not collect this many listings is not started
+
+DEADLINE_STATUS = "deadline"       # query_done status of a query cut short by the deadline or a stop signal
+
+# =================== DEADLINE =================== #
+
+class RunDeadline:
+    """
+    Time left for a scraping run that must end by a fixed point (the job's SLA), shared by every worker.
+
+    A query costs a fixed overhead (browser start, search, scrolling) plus a per-listing time, both learned
+    from the queries finished in this run (the planner's history estimate until the first one finishes).
+    From them the scheduler decides whether a query can still collect at least MIN_DEADLINE_RESULTS
+    listings before the reserve, and how far to lower its result limit.
+    Once the reserve is reached, or stop() is called (SIGTERM), running queries keep the listings they
+    have and write them, and no further queries start.
+    """
+
+    def __init__(self, seconds, reserve_s=DEFAULT_FLUSH_RESERVE_S, overhead_s=DEFAULT_QUERY_OVERHEAD_S,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.ends_at = clock() + max(0.0, seconds) if seconds else None
+        self.reserve_s = reserve_s
+        self.overhead_s = overhead_s
+        self.lock = threading.Lock()
+        self.stop_reason = None
+        self.overhead_total = 0.0
+        self.queries = 0
+        self.result_seconds = 0.0
+        self.results = 0
+        self.stats = {"skipped": 0, "limited": 0, "cut_short": 0}
+
+    def remaining(self):
+        """Seconds left before the flush reserve (inf without a deadline)."""
+        if self.stop_reason is not None:
+            return 0.0
+        if self.ends_at is None:
+            return math.inf
+        return self.ends_at - self.reserve_s - self.clock()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def stop(self, reason):
+        """Ends the run early: nothing new starts and running queries wrap up (signal-handler safe)."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+
+    def drain_timeout(self, limit):
+        """How long a query wrapping up may wait for outstanding review dates."""
+        if self.stop_reason is not None:
+            return min(limit, self.reserve_s / 2)
+        if self.ends_at is None:
+            return limit
+        return max(0.0, min(limit, self.ends_at - self.clock() - self.reserve_s / 2))
+
+    def observe(self, total_seconds, listing_seconds, results):
+        """Records a finished query: its whole duration, the part spent on listings and how many it read."""
+        with self.lock:
+            self.overhead_total += max(0.0, total_seconds - listing_seconds)
+            self.queries += 1
+            if results > 0:
+                self.result_seconds += listing_seconds
+                self.results += results
+
+    def query_overhead(self):
+        with self.lock:
+            return self.overhead_total / self.queries if self.queries else self.overhead_s
+
+    def seconds_per_result(self, expected_seconds=None, max_results=1):
+        with self.lock:
+            if self.results:
+                return max(MIN_SECONDS_PER_RESULT, self.result_seconds / self.results)
+        if expected_seconds:
+            return max(MIN_SECONDS_PER_RESULT, (expected_seconds - self.query_overhead()) / max(1, max_results))
+        return MIN_SECONDS_PER_RESULT
+
+    def result_limit(self, max_results, expected_seconds=None):
+        """Listings a query starting now can collect before the reserve (max_results without pressure)."""
+        remaining = self.remaining()
+        if remaining == math.inf:
+            return max_results
+        per_result = self.seconds_per_result(expected_seconds, max_results)
+        fits = int((remaining - self.query_overhead()) // per_result)
+        return max(0, min(max_results, fits))
+
+    def admit(self, max_results, expected_seconds=None):
+        """Result limit for a query about to start, or 0 when it should not start at all (see record)."""
+        limit = self.result_limit(max_results, expected_seconds)
+        return limit if limit >= min(MIN_DEADLINE_RESULTS, max_results) else 0
+
+    def record(self, limit, max_results):
+        """Counts a query dropped (limit 0) or started with a lowered limit, once the caller has done so."""
+        with self.lock:
+            if not limit:
+                self.stats["skipped"] += 1
+            elif limit < max_results:
+                self.stats["limited"] += 1
+
+    def cut_short(self):
+        with self.lock:
+            self.stats["cut_short"] += 1
+
+    def snapshot(self):
+        remaining = self.remaining()
+        return {"remaining_s": None if remaining == math.inf else round(max(0.0, remaining), 1),
+                "stop_reason": self.stop_reason, **self.stats}
+
+
+def install_stop_handler(deadline):
+    """
+    SIGTERM (and SIGINT) stop the run through the deadline so collected leads are still written;
+    a second signal exits at once, without the flush. Windows has no catchable SIGTERM: rely on the
+    deadline itself there.
+    """
+    def handle(signum, frame):
+        if deadline.stop_reason is not None:
+            # Worker threads cannot be interrupted, and SystemExit would wait for them
+            os._exit(128 + signum)
+        deadline.stop(signal.Signals(signum).name.lower())
+
+    for name in ("SIGTERM", "SIGINT"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handle)
@@ -0,0 +1,166 @@
+import random
+import threading
+import time
+from collections import deque
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_QUERY_RATE = 6.0        # Query starts per minute across all workers (0 disables pacing)
+DEFAULT_BURST = 3               # Query starts allowed back to back after an idle period
+MIN_QUERY_RATE = 1.0            # Pacing never drops below this after repeated throttling
+BACKOFF_BASE_S = 30.0           # First global pause after a throttle signal
+BACKOFF_MAX_S = 600.0           # Longest global pause
+BACKOFF_JITTER = 0.2            # +/- share of the pause, so workers do not resume in lockstep
+RECOVERY_STEP = 0.1             # Share of the configured rate regained per successful query
+SLOW_SIGNAL_WINDOW_S = 120.0    # Timeouts within this window count towards a soft throttle signal
+SLOW_SIGNAL_THRESHOLD = 3       # Timeouts (across workers) that trigger a global pause
+
+# Markers of Google's rate limiting: the /sorry/ interstitial and reCAPTCHA
+THROTTLE_URL_MARKERS = ("/sorry/", "google.com/sorry")
+# The cookie-consent interstitial a fresh profile can land on: not rate limiting, so it never feeds the backoff
+CONSENT_URL_MARKERS = ("consent.google.com",)
+THROTTLE_TEXT_MARKERS = ("unusual traffic", "not a robot", "our systems have detected")
+THROTTLE_CSS_SELECTOR = "iframe[src*='recaptcha'], #captcha-form, form[action*='sorry'], div.g-recaptcha"
+
+# =================== RATE GOVERNOR =================== #
+
+class RateGovernor:
+    """
+    Shared pacing and backoff for every scraper worker.
+
+    Query starts draw from a token bucket refilled at `rate_per_min`. A throttle signal (captcha,
+    /sorry/ page, or several timeouts in a short window) pauses all workers together for an
+    exponentially growing, jittered period and halves the rate; successful queries win the rate back
+    gradually. Workers waiting on Maps poll `paused()` so they stop waiting as soon as anyone is throttled.
+    """
+
+    def __init__(self, rate_per_min=DEFAULT_QUERY_RATE, burst=DEFAULT_BURST, on_event=None, clock=time.monotonic):
+        self.base_rate = rate_per_min or 0.0
+        self.rate = self.base_rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.on_event = on_event
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.last_refill = clock()
+        self.pause_until = 0.0
+        self.backoff_s = BACKOFF_BASE_S
+        self.consecutive_throttles = 0
+        self.timeouts = deque()
+
+    def _emit(self, event, **fields):
+        if self.on_event:
+            self.on_event(event, **fields)
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate / 60.0)
+        self.last_refill = now
+
+    def paused(self):
+        return self.clock() < self.pause_until
+
+    def acquire(self):
+        """Blocks until no global pause is active and a query-start token is available. Returns seconds waited."""
+        started = self.clock()
+        with self.condition:
+            while True:
+                now = self.clock()
+                if now < self.pause_until:
+                    self.condition.wait(self.pause_until - now)
+                    continue
+                if self.base_rate <= 0:
+                    break
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                self.condition.wait((1 - self.tokens) * 60.0 / self.rate)
+        return self.clock() - started
+
+    def wait_until_clear(self):
+        """Sleeps until the current global pause (if any) has ended."""
+        with self.condition:
+            while True:
+                remaining = self.pause_until - self.clock()
+                if remaining <= 0:
+                    return
+                self.condition.wait(remaining)
+
+    def report_throttle(self, reason, **fields):
+        """Starts a global pause (unless one is already running) and halves the query rate. Returns the pause length."""
+        with self.condition:
+            now = self.clock()
+            if now < self.pause_until:
+                # Another worker already reported this episode; do not escalate twice for one event
+                return self.pause_until - now
+            self.consecutive_throttles += 1
+            pause = min(BACKOFF_MAX_S, self.backoff_s) * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+            self.pause_until = now + pause
+            self.backoff_s = min(BACKOFF_MAX_S, self.backoff_s * 2)
+            if self.base_rate > 0:
+                self.rate = max(MIN_QUERY_RATE, self.rate / 2)
+                self.tokens = 0.0
+            self.timeouts.clear()
+            self.condition.notify_all()
+        self._emit("throttle", reason=reason, pause_s=round(pause, 1), rate_per_min=round(self.rate, 2),
+                   consecutive=self.consecutive_throttles, **fields)
+        return pause
+
+    def report_timeout(self, stage):
+        """Counts a wait that ran out without an explicit throttle signal; enough of them trigger a pause."""
+        with self.condition:
+            now = self.clock()
+            self.timeouts.append(now)
+            while self.timeouts and now - self.timeouts[0] > SLOW_SIGNAL_WINDOW_S:
+                self.timeouts.popleft()
+            triggered = len(self.timeouts) >= SLOW_SIGNAL_THRESHOLD
+        if triggered:
+            self.report_throttle("timeouts", stage=stage)
+        return triggered
+
+    def report_success(self):
+        """A query reached its results: reset the backoff and recover part of the configured rate."""
+        with self.condition:
+            recovered = self.consecutive_throttles > 0
+            self.consecutive_throttles = 0
+            self.backoff_s = BACKOFF_BASE_S
+            if self.base_rate > 0 and self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+                self.condition.notify_all()
+        if recovered:
+            self._emit("throttle_recovered", rate_per_min=round(self.rate, 2))
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                "rate_per_min": round(self.rate, 2),
+                "paused_s": round(max(0.0, self.pause_until - self.clock()), 1),
+                "consecutive_throttles": self.consecutive_throttles,
+            }
+
+# =================== THROTTLE DETECTION =================== #
+
+def page_is_throttled(driver, check_text=False):
+    """True when the page is Google's /sorry/ interstitial or shows a captcha. check_text also scans the HTML."""
+    try:
+        url = (driver.current_url or "").lower()
+        if any(marker in url for marker in THROTTLE_URL_MARKERS):
+            return True
+        if driver.find_elements("css selector", THROTTLE_CSS_SELECTOR):
+            return True
+        if check_text:
+            html = driver.page_source.lower()
+            return any(marker in html for marker in THROTTLE_TEXT_MARKERS)
+    except Exception:
+        return False
+    return False
+
+
+def page_needs_consent(driver):
+    """True when the page is Google's cookie-consent interstitial."""
+    try:
+        url = (driver.current_url or "").lower()
+    except Exception:
+        return False
+    return any(marker in url for marker in CONSENT_URL_MARKERS)
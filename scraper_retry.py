@@ -0,0 +1,115 @@
+import logging
+import time
+
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    InvalidSessionIdException,
+    NoSuchElementException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+# =================== CLASSIFICATION =================== #
+
+STALE = "stale"              # Element re-rendered: re-find and retry at once
+ABSENT = "absent"            # Selector matched nothing: the field is not on this listing, do not retry
+TIMEOUT = "timeout"          # Waited and it never appeared: treat like absent after the one wait
+INTERCEPTED = "intercepted"  # Something overlaps the element: retry once with a JavaScript click
+DEAD_DRIVER = "dead_driver"  # Session or browser is gone: nothing on this driver can succeed
+OTHER = "other"
+
+# Messages of WebDriverException (and urllib3 errors) that mean the browser or chromedriver died
+DEAD_DRIVER_MARKERS = (
+    "invalid session id", "session deleted", "chrome not reachable", "disconnected",
+    "target window already closed", "no such window", "connection refused", "max retries exceeded",
+    "failed to establish a new connection", "remote end closed connection",
+)
+
+# Retries allowed per failure kind, and the pause before each retry
+RETRY_POLICY = {
+    STALE: (2, 0.0),
+    INTERCEPTED: (1, 0.2),
+    ABSENT: (0, 0.0),
+    TIMEOUT: (0, 0.0),
+    DEAD_DRIVER: (0, 0.0),
+    OTHER: (0, 0.0),
+}
+
+
+class DriverDeadError(Exception):
+    """The WebDriver session is unusable; the query has to continue on a new driver."""
+
+
+def classify(exc):
+    if isinstance(exc, DriverDeadError):
+        return DEAD_DRIVER
+    if isinstance(exc, StaleElementReferenceException):
+        return STALE
+    if isinstance(exc, NoSuchElementException):
+        return ABSENT
+    if isinstance(exc, TimeoutException):
+        return TIMEOUT
+    if isinstance(exc, (ElementClickInterceptedException, ElementNotInteractableException)):
+        return INTERCEPTED
+    if isinstance(exc, (InvalidSessionIdException, NoSuchWindowException)):
+        return DEAD_DRIVER
+    message = str(exc).lower()
+    if isinstance(exc, (WebDriverException, ConnectionError, OSError)) or "urllib3" in type(exc).__module__:
+        if any(marker in message for marker in DEAD_DRIVER_MARKERS):
+            return DEAD_DRIVER
+    return OTHER
+
+# =================== RETRY POLICY =================== #
+
+class RetryPolicy:
+    """
+    Runs Selenium actions under RETRY_POLICY. Failures are counted per kind through on_failure
+    (e.g. telemetry.count); a dead driver always surfaces as DriverDeadError.
+    """
+
+    def __init__(self, on_failure=None):
+        self.on_failure = on_failure
+
+    def _record(self, kind, label):
+        if self.on_failure:
+            self.on_failure(kind, label)
+
+    def run(self, action, label, fallback=None):
+        """
+        Calls action() and retries according to the failure kind. fallback(), if given, is used for the
+        retry of an intercepted click. Re-raises the last exception when retries are exhausted.
+        """
+        attempt = 0
+        use_fallback = False
+        while True:
+            try:
+                return fallback() if use_fallback and fallback else action()
+            except Exception as e:
+                kind = classify(e)
+                self._record(kind, label)
+                if kind == DEAD_DRIVER:
+                    if isinstance(e, DriverDeadError):
+                        raise
+                    raise DriverDeadError(f"{label}: {type(e).__name__}") from e
+                retries, delay = RETRY_POLICY[kind]
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                use_fallback = kind == INTERCEPTED
+                if delay:
+                    time.sleep(delay)
+
+    def optional(self, action, label, default):
+        """Like run(), but a field that is absent (or never shows up) yields default instead of an error."""
+        try:
+            return self.run(action, label)
+        except DriverDeadError:
+            raise
+        except Exception as e:
+            kind = classify(e)
+            if kind not in (ABSENT, TIMEOUT, STALE):
+                logging.warning(f"{label} failed ({kind}): {type(e).__name__}")
+            return default
@@ -0,0 +1,126 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# =================== CONFIGURATION =================== #
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, float("inf")]
+
+# =================== TELEMETRY =================== #
+
+class StageHistogram:
+    """Running latency statistics for one stage (count, total, max and bucket counts)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+        for i, upper in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= upper:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self):
+        labels = [f"<={b:g}s" if b != float("inf") else f">{HISTOGRAM_BUCKETS[-2]:g}s" for b in HISTOGRAM_BUCKETS]
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 3),
+            "mean_s": round(self.total / self.count, 3) if self.count else None,
+            "p50_s": _round(self.percentile(50)),
+            "p90_s": _round(self.percentile(90)),
+            "p99_s": _round(self.percentile(99)),
+            "max_s": round(self.max, 3),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+class ScraperTelemetry:
+    """
+    Thread-safe JSON-lines event emitter for the scraper.
+    Every event is one JSON object per line on stdout (and optionally appended to a file),
+    so scraperProcessor.js can parse them while still logging the plain text output.
+    """
+
+    def __init__(self, stream=sys.stdout, file_path=None, enabled=True):
+        self.stream = stream
+        self.file_path = file_path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.started_at = time.time()
+
+    def configure(self, file_path=None, enabled=True):
+        self.file_path = file_path
+        self.enabled = enabled
+
+    def emit(self, event, **fields):
+        if not self.enabled:
+            return
+        record = {"event": event, "ts": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+            if self.file_path:
+                with open(self.file_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.histograms.setdefault(stage, StageHistogram()).observe(seconds)
+
+    @contextmanager
+    def stage(self, name, timings):
+        """Times the enclosed block, adds it to timings[name] and the run histogram (also on failure)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            timings[name] = round(timings.get(name, 0.0) + elapsed, 3)
+            self.observe(name, elapsed)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "elapsed_s": round(time.time() - self.started_at, 3),
+                "counters": dict(self.counters),
+                "stages": {name: hist.to_dict() for name, hist in sorted(self.histograms.items())},
+            }
+
+    def emit_summary(self):
+        self.emit("run_summary", **self.summary())
+
+
+def error_fields(exc):
+    """Exception class and a short message for an event record."""
+    message = str(exc).strip().splitlines()[0] if str(exc).strip() else ""
+    return {"error": type(exc).__name__, "message": message[:200]}
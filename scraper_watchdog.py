@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+
+import psutil
+
+from scraper_autoscale import CHROME_PROCESS_NAMES
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_MAX_QUERY_SECONDS = 900.0   # Wall-clock limit for one query's browser
+DEFAULT_MAX_BROWSER_RSS_MB = 1500.0 # RSS limit for one worker's chromedriver + Chrome tree
+WATCHDOG_INTERVAL_S = 5.0
+KILL_GRACE_S = 3.0                  # Time between terminate() and kill()
+
+# =================== PROCESS HELPERS =================== #
+
+def _alive(proc):
+    try:
+        return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+def process_tree(pid):
+    """The process with this pid and all its descendants (empty if it is gone)."""
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return []
+
+
+def tree_rss_mb(processes):
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return total / (1024 * 1024)
+
+
+def kill_processes(processes):
+    """Terminates, then kills whatever survives the grace period. Returns the pids that were alive."""
+    alive = [p for p in processes if _alive(p)]
+    for proc in alive:
+        try:
+            proc.terminate()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    _, survivors = psutil.wait_procs(alive, timeout=KILL_GRACE_S)
+    for proc in survivors:
+        try:
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return [p.pid for p in alive]
+
+
+def is_browser_process(proc):
+    try:
+        name = proc.name().lower()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return False
+    return any(marker in name for marker in CHROME_PROCESS_NAMES)
+
+# =================== WATCHDOG =================== #
+
+class BrowserHandle:
+    """One worker's browser: the chromedriver pid and every pid ever seen in its tree."""
+
+    def __init__(self, query, driver_pid):
+        self.query = query
+        self.driver_pid = driver_pid
+        self.started = time.monotonic()
+        self.known = {}
+        self.reaped = None
+        self.refresh()
+
+    def refresh(self):
+        # Remember processes even after chromedriver dies: Chrome children get re-parented to init
+        for proc in process_tree(self.driver_pid):
+            self.known.setdefault(proc.pid, proc)
+        return [p for p in self.known.values() if _alive(p)]
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+def driver_pid(driver):
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class BrowserWatchdog:
+    """
+    Tracks each worker's chromedriver/Chrome tree. Browsers that exceed the per-query wall-clock or RSS
+    limit are killed, which makes the stuck worker's Selenium call fail so the worker moves on with a new
+    browser. When a worker finishes, anything left of its tree is reaped, and stop() sweeps stray
+    Chrome processes still parented to this process.
+    """
+
+    def __init__(self, max_query_seconds=DEFAULT_MAX_QUERY_SECONDS, max_rss_mb=DEFAULT_MAX_BROWSER_RSS_MB,
+                 interval=WATCHDOG_INTERVAL_S, on_event=None):
+        self.max_query_seconds = max_query_seconds
+        self.max_rss_mb = max_rss_mb
+        self.interval = interval
+        self.on_event = on_event
+        self.lock = threading.Lock()
+        self.handles = set()
+        self.stats = {"workers_reaped": 0, "leaked_processes_reaped": 0}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _emit(self, event, **fields):
+        if self.on_event:
+            self.on_event(event, **fields)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="browser-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops monitoring and reaps stray browser processes under this process. Returns the stats."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.interval * 2)
+            self.thread = None
+        strays = [p for p in psutil.Process().children(recursive=True) if is_browser_process(p)]
+        if strays:
+            pids = kill_processes(strays)
+            self._count("leaked_processes_reaped", len(pids))
+            if pids:
+                self._emit("reaped", reason="shutdown_sweep", pids=pids)
+        return dict(self.stats)
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def register(self, query, driver):
+        pid = driver_pid(driver)
+        if pid is None:
+            return None
+        handle = BrowserHandle(query, pid)
+        with self.lock:
+            self.handles.add(handle)
+        return handle
+
+    def unregister(self, handle):
+        """Call after driver.quit(): kills whatever the quit left behind."""
+        if handle is None:
+            return
+        with self.lock:
+            self.handles.discard(handle)
+        leftovers = [p for p in handle.known.values() if _alive(p)]
+        if leftovers:
+            pids = kill_processes(leftovers)
+            if pids:
+                self._count("leaked_processes_reaped", len(pids))
+                self._emit("reaped", reason="leaked_after_quit", query=handle.query, pids=pids)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """One monitoring pass over every registered browser."""
+        with self.lock:
+            handles = list(self.handles)
+        for handle in handles:
+            if handle.reaped:
+                continue
+            processes = handle.refresh()
+            rss_mb = tree_rss_mb(processes)
+            elapsed = handle.elapsed()
+            if elapsed > self.max_query_seconds:
+                reason = "wall_clock"
+            elif rss_mb > self.max_rss_mb:
+                reason = "rss"
+            else:
+                continue
+            handle.reaped = reason
+            pids = kill_processes(processes)
+            self._count("workers_reaped")
+            logging.warning(f"Watchdog killed the browser for '{handle.query}' ({reason}: "
+                            f"{elapsed:.0f}s, {rss_mb:.0f} MB, {len(pids)} processes)")
+            self._emit("reaped", reason=reason, query=handle.query, elapsed_s=round(elapsed, 1),
+                       rss_mb=round(rss_mb, 1), pids=pids)
@@ -3,9 +3,20 @@ const fs = require('fs').promises;
 const path = require('path');
 const { queueLogger } = require('../../utils/logger');
 const { runQuery } = require('../../database/setup');
+const { profileArgs, profileReportPath, readProfileReport } = require('../../utils/pipelineProfile');
+
+// Batch mode: find-leads jobs that start within the batch window share one run of
+// FindLeadsAndAddSource.py --batch, which reads and cleans the Files/ archive once for all of them.
+// Job settings travel in a JSON file instead of being written into the script.
+const BATCH_ENABLED = process.env.FINDLEADS_BATCH === '1';
+const BATCH_WINDOW_MS = parseInt(process.env.FINDLEADS_BATCH_WINDOW_MS, 10) || 2000;
+const BATCH_MAX_JOBS = parseInt(process.env.FINDLEADS_BATCH_MAX_JOBS, 10) || 10;
+const BATCH_DIR = process.env.FINDLEADS_BATCH_DIR || './Outputs/batches';
+
+let pendingBatch = null;
 
 async function findleadsProcessor(job) {
-  const { jobId, businessTypes, zipCodes, states, outputFile, clientName } = job.data;
+  const { jobId, businessTypes, zipCodes, states, outputFile, clientName, delta } = job.data;
   
   queueLogger.info(`Starting findleads job ${jobId}`, { 
     businessTypes, 
@@ -23,14 +34,22 @@ async function findleadsProcessor(job) {
     // Update progress
     job.progress(10);
 
-    // Update FindLeadsAndAddSource.py configuration
-    await updateFindleadsConfig(businessTypes, zipCodes, states, outputFile);
-    
-    // Update progress
-    job.progress(20);
+    let profilePath = profileReportPath(jobId, 'findleads');
+    let batchResult = null;
+    if (BATCH_ENABLED) {
+      // Joins (or opens) the current batch; resolves once the shared run has written this job's output
+      batchResult = await runInBatch(job);
+      profilePath = batchResult.profilePath;
+    } else {
+      // Update FindLeadsAndAddSource.py configuration
+      await updateFindleadsConfig(businessTypes, zipCodes, states, outputFile);
 
-    // Execute Python findleads script
-    const result = await executePythonFindleads(job);
+      // Update progress
+      job.progress(20);
+
+      // Execute Python findleads script
+      await executePythonFindleads(job, profilePath);
+    }
     
     // Update progress
     job.progress(80);
@@ -57,7 +76,15 @@ async function findleadsProcessor(job) {
           outputFile,
           fileSize: outputStats?.size || 0,
           businessTypesProcessed: businessTypes?.length || 0,
-          zipCodesProcessed: zipCodes?.length || 0
+          zipCodesProcessed: zipCodes?.length || 0,
+          delta: Boolean(clientName && delta),
+          batch: batchResult ? {
+            batchId: batchResult.batchId,
+            jobs: batchResult.batchSize,
+            leads: batchResult.leads,
+            queriesFile: batchResult.queriesFile
+          } : null,
+          profile: await readProfileReport(profilePath)
         }),
         jobId
       ]
@@ -121,14 +148,12 @@ async function updateFindleadsConfig(businessTypes, zipCodes, states, outputFile
       );
     }
     
-    // Update state filter if provided
-    if (states && states.length > 0) {
-      const statesArray = states.map(s => `'${s}'`).join(', ');
-      findleadsContent = findleadsContent.replace(
-        /State_Filter\s*=\s*\[[^\]]*\]/,
-        `State_Filter = [${statesArray}]`
-      );
-    }
+    // Always rewrite the state filter so a previous job's states never carry over (empty = all states)
+    const statesArray = (states || []).map(s => `'${String(s).replace(/'/g, '')}'`).join(', ');
+    findleadsContent = findleadsContent.replace(
+      /State_Filter\s*=\s*\[[^\]]*\]/,
+      `State_Filter = [${statesArray}]`
+    );
     
     // Write the updated content back
     await fs.writeFile(findleadsPath, findleadsContent, 'utf8');
@@ -146,14 +171,81 @@ async function updateFindleadsConfig(businessTypes, zipCodes, states, outputFile
   }
 }
 
-async function executePythonFindleads(job) {
+function runInBatch(job) {
+  return new Promise((resolve, reject) => {
+    if (!pendingBatch) {
+      pendingBatch = { entries: [], timer: setTimeout(() => flushBatch(), BATCH_WINDOW_MS) };
+    }
+    pendingBatch.entries.push({ job, resolve, reject });
+    queueLogger.info(`Findleads job ${job.data.jobId} joined batch (${pendingBatch.entries.length} jobs)`);
+    if (pendingBatch.entries.length >= BATCH_MAX_JOBS) {
+      clearTimeout(pendingBatch.timer);
+      flushBatch();
+    }
+  });
+}
+
+async function flushBatch() {
+  const { entries } = pendingBatch;
+  pendingBatch = null;
+  const batchId = `findleads_batch_${Date.now()}`;
+  const jobsPath = path.join(BATCH_DIR, `${batchId}.json`);
+  const resultsPath = path.join(BATCH_DIR, `${batchId}_results.json`);
+  const profilePath = profileReportPath(batchId, 'findleads');
+
+  // Progress of the shared run is reported on every job in the batch
+  let progress = 20;
+  const batchJob = {
+    data: {},
+    progress(value) {
+      if (value === undefined) {
+        return progress;
+      }
+      progress = value;
+      entries.forEach(entry => entry.job.progress(value));
+    }
+  };
+
+  try {
+    await fs.mkdir(BATCH_DIR, { recursive: true });
+    await fs.writeFile(jobsPath, JSON.stringify(entries.map(entry => entry.job.data), null, 1), 'utf8');
+    queueLogger.info(`Running findleads batch ${batchId}`, { jobs: entries.length });
+    batchJob.progress(20);
+    await executePythonFindleads(batchJob, profilePath, ['--batch', jobsPath, '--batch_results', resultsPath]);
+    const results = JSON.parse(await fs.readFile(resultsPath, 'utf8'));
+    for (const { job, resolve, reject } of entries) {
+      const result = results[String(job.data.jobId)];
+      if (result && result.status === 'completed') {
+        resolve({ ...result, batchId, batchSize: entries.length, profilePath });
+      } else {
+        reject(new Error(`Findleads batch ${batchId}: ${result?.error || 'no result for this job'}`));
+      }
+    }
+  } catch (error) {
+    queueLogger.error(`Findleads batch ${batchId} failed`, { error: error.message });
+    entries.forEach(entry => entry.reject(error));
+  }
+}
+
+async function executePythonFindleads(job, profilePath, batchArgs = null) {
   return new Promise((resolve, reject) => {
     const pythonPath = process.env.PYTHON_INTERPRETER || 'python';
     const scriptPath = process.env.FINDLEADS_SCRIPT_PATH || './FindLeadsAndAddSource.py';
     
-    queueLogger.info(`Executing Python findleads: ${pythonPath} ${scriptPath}`);
+    const args = [scriptPath, ...profileArgs(profilePath), ...(batchArgs || [])];
+    // Record the delivery per customer; delta jobs only get leads not yet sent to that customer
+    // (batch runs carry each job's customer in the jobs file)
+    const { clientName, delta } = job.data;
+    if (clientName) {
+      args.push('--customer', clientName);
+      if (delta) {
+        args.push('--delta');
+      }
+    }
+    
+    queueLogger.info(`Executing Python findleads: ${pythonPath} ${args.join(' ')}`);
     
-    const pythonProcess = spawn(pythonPath, [scriptPath], {
+    const pythonProcess = spawn(pythonPath, args, {
       stdio: ['pipe', 'pipe', 'pipe'],
       cwd: process.cwd()
     });
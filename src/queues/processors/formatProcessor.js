@@ -4,6 +4,7 @@ const path = require('path');
 const { queueLogger } = require('../../utils/logger');
 const { runQuery } = require('../../database/setup');
 const { addProcessingJob } = require('../setup');
+const { profileArgs, profileReportPath, readProfileReport } = require('../../utils/pipelineProfile');
 
 async function formatProcessor(job) {
   const { jobId, inputFile, outputFile, parentJobId } = job.data;
@@ -34,7 +35,8 @@ async function formatProcessor(job) {
     job.progress(20);
 
     // Execute Python formatter script
-    const result = await executePythonFormatter(job);
+    const profilePath = profileReportPath(jobId, 'formatter');
+    const result = await executePythonFormatter(job, profilePath);
     
     // Update progress
     job.progress(80);
@@ -51,9 +53,10 @@ async function formatProcessor(job) {
     }
 
     // Update job status
+    const profile = await readProfileReport(profilePath);
     await runQuery(
-      'UPDATE processing_jobs SET status = ?, completed_at = CURRENT_TIMESTAMP, output_file = ? WHERE job_id = ?',
-      ['completed', outputFile, jobId]
+      'UPDATE processing_jobs SET status = ?, completed_at = CURRENT_TIMESTAMP, output_file = ?, results = ? WHERE job_id = ?',
+      ['completed', outputFile, JSON.stringify({ outputFile, profile }), jobId]
     );
 
     // Automatically trigger findleads job
@@ -110,14 +113,21 @@ async function updateFormatterConfig(inputFile, outputFile) {
   }
 }
 
-async function executePythonFormatter(job) {
+async function executePythonFormatter(job, profilePath) {
   return new Promise((resolve, reject) => {
     const pythonPath = process.env.PYTHON_INTERPRETER || 'python';
     const scriptPath = process.env.FORMATTER_SCRIPT_PATH || './formatter.py';
     
-    queueLogger.info(`Executing Python formatter: ${pythonPath} ${scriptPath}`);
+    // Stream large scraped CSVs in chunks to keep the formatter's memory bounded
+    const args = [scriptPath];
+    if (process.env.FORMATTER_CHUNK_SIZE) {
+      args.push('--chunksize', process.env.FORMATTER_CHUNK_SIZE);
+    }
+    args.push(...profileArgs(profilePath));
+    
+    queueLogger.info(`Executing Python formatter: ${pythonPath} ${args.join(' ')}`);
     
-    const pythonProcess = spawn(pythonPath, [scriptPath], {
+    const pythonProcess = spawn(pythonPath, args, {
       stdio: ['pipe', 'pipe', 'pipe'],
       cwd: process.cwd()
     });
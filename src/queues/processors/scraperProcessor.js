@@ -40,6 +40,18 @@ const MIN_REVIEW_COUNT = 4;
 const REQUIRED_REVIEW_TEXT = "ago";
 const US_ADDRESS_MARKER = "United States";
 const SCRAPED_NEW_SOURCE_NAME = "Scraped New"; // Source name for newly scraped leads
+// SCRAPER_STREAM=1: maintemp.py cleans leads in-process, upserts them into the leads table itself and
+// reports each stored lead as a 'lead_stored' telemetry event, so no CSV is written or read back
+const STREAM_PIPELINE = process.env.SCRAPER_STREAM === '1';
+// Scrape jobs run against a deadline (job.data.deadlineSeconds or SCRAPER_JOB_DEADLINE_S): maintemp.py skips
+// queries that cannot finish, lowers per-query limits as it nears and writes its leads before it. A scraper
+// still running SCRAPER_STOP_GRACE_MS past the deadline gets SIGTERM (it flushes and exits), then SIGKILL.
+const JOB_DEADLINE_S = parseInt(process.env.SCRAPER_JOB_DEADLINE_S, 10) || 30 * 60;
+const STOP_GRACE_MS = parseInt(process.env.SCRAPER_STOP_GRACE_MS, 10) || 60 * 1000;
+// With SCRAPER_WORK_QUEUE set, each scrape job drains its own batch (job-<jobId>): a batch's finished queries
+// are never leased again, so jobs sharing one would find nothing left to scrape. job.data.workBatch names a
+// batch several jobs (or hosts) drain together.
+const WORK_QUEUE_ENABLED = Boolean(process.env.SCRAPER_WORK_QUEUE);
 // const STATE_FILTER_ENABLED = false; // Set to true to enable state-specific filtering
 // const TARGET_STATES = ['WA']; // Define target states if STATE_FILTER_ENABLED is true
 
@@ -223,6 +235,7 @@ async function scraperProcessor(job) {
 
     let newLeadsCount = 0;
     let scrapedLeads = [];
+    let scraperTelemetry = null;
 
     // Only scrape if we have missing data
     if (optimizedQueries.length > 0) {
@@ -257,22 +270,26 @@ async function scraperProcessor(job) {
 
     // Execute Python scraper script
       const scraperResult = await executePythonScraper(job);
+      scraperTelemetry = scraperResult.telemetry;
     
       if (job.progress) {
         job.progress(70);
       }
 
-      // Process the scraped results
-      scrapedLeads = await getScrapedLeads();
+      // Process the scraped results. Streamed leads are already stored; batches the stream could not
+      // process were appended to the CSV instead and take the usual route.
+      const streamFailed = STREAM_PIPELINE && scraperTelemetry.stream && scraperTelemetry.stream.failedBatches > 0;
+      const csvLeads = !STREAM_PIPELINE || streamFailed ? await getScrapedLeads() : [];
       
       // Save newly scraped leads to the database
-      if (scrapedLeads && scrapedLeads.length > 0) {
-        const savedToDbCount = await saveNewLeadsToDatabase(scrapedLeads, jobId, jobData);
-        scraperLogger.info(`💾 Attempted to save ${scrapedLeads.length} scraped leads to DB, ${savedToDbCount} succeeded.`);
+      if (csvLeads && csvLeads.length > 0) {
+        const savedToDbCount = await saveNewLeadsToDatabase(csvLeads, jobId, jobData);
+        scraperLogger.info(`💾 Attempted to save ${csvLeads.length} scraped leads to DB, ${savedToDbCount} succeeded.`);
       }
+      scrapedLeads = STREAM_PIPELINE ? scraperTelemetry.streamedLeads.concat(csvLeads) : csvLeads;
       newLeadsCount = scrapedLeads.length;
       
-      scraperLogger.info(`🔍 Scraped ${newLeadsCount} new leads from CSV`);
+      scraperLogger.info(`🔍 Scraped ${newLeadsCount} new leads from ${STREAM_PIPELINE ? 'the lead stream' : 'CSV'}`);
     } else {
       scraperLogger.info(`⚡ Skipping scraping - all requested leads already exist in database`);
     }
@@ -373,7 +390,18 @@ async function scraperProcessor(job) {
       queries: queries.length,
       optimizedQueries: optimizedQueries.length,
       clientName: clientName,
-      outputFile: finalOutputFile
+      outputFile: finalOutputFile,
+      scraperTelemetry: scraperTelemetry ? {
+        stream: scraperTelemetry.stream,
+        queriesDone: scraperTelemetry.queriesDone,
+        leadsScraped: scraperTelemetry.leadsScraped,
+        leadsFailed: scraperTelemetry.leadsFailed,
+        deadline: scraperTelemetry.deadlineSummary || null,
+        // Queries were skipped, limited or cut short to meet the deadline
+        partial: Boolean(scraperTelemetry.deadline || (scraperTelemetry.deadlineSummary &&
+          (scraperTelemetry.deadlineSummary.skipped || scraperTelemetry.deadlineSummary.limited))),
+        summary: scraperTelemetry.summary
+      } : null
     };
 
   } catch (error) {
@@ -400,26 +428,53 @@ async function executePythonScraper(job) {
     const pythonPath = process.env.PYTHON_INTERPRETER || 'C:\\Python\\python.exe';
     const scriptPath = process.env.SCRAPER_SCRIPT_PATH || './maintemp.py';
     const maxResults = job.data.maxResults || 15; // Ensure a default if somehow undefined
+    const deadlineSeconds = job.data.deadlineSeconds || JOB_DEADLINE_S;
+    const scraperArgs = [scriptPath, '--max_results', maxResults.toString(), '--deadline', deadlineSeconds.toString()];
+    if (WORK_QUEUE_ENABLED || job.data.workBatch) {
+      scraperArgs.push('--batch', String(job.data.workBatch || `job-${job.data.jobId || job.id}`));
+    }
+    if (STREAM_PIPELINE) {
+      // Leads come back as telemetry events and the delivery is built below, so no workbook either
+      scraperArgs.push('--stream', '--stream_output', '');
+    }
     
-    scraperLogger.info(`🐍 Executing Python scraper: ${pythonPath} ${scriptPath} --max_results ${maxResults}`);
+    scraperLogger.info(`🐍 Executing Python scraper: ${pythonPath} ${scraperArgs.join(' ')}`);
     scraperLogger.info(`🔧 Current Working Directory (CWD): ${process.cwd()}`);
     scraperLogger.info(`🔧 System PATH: ${process.env.PATH}`);
     
-    const pythonProcess = spawn(pythonPath, [scriptPath, '--max_results', maxResults.toString()], {
+    const pythonProcess = spawn(pythonPath, scraperArgs, {
       stdio: ['pipe', 'pipe', 'pipe'],
       cwd: process.cwd()
     });
 
     let stdout = '';
     let stderr = '';
+    let lineBuffer = '';
+    const telemetry = { totalQueries: 0, queriesDone: 0, leadsScraped: 0, leadsFailed: 0, summary: null, streamedLeads: [], stream: null };
 
     pythonProcess.stdout.on('data', (data) => {
       const output = data.toString();
       stdout += output;
-      scraperLogger.info(`Scraper stdout: ${output.trim()}`);
-      
-      // Update job progress based on output patterns
-      if (output.includes('Processing Query:') && job.progress) {
+
+      // maintemp.py emits one JSON telemetry event per line; everything else is plain log text
+      lineBuffer += output;
+      const lines = lineBuffer.split('\n');
+      lineBuffer = lines.pop();
+      const textLines = [];
+      for (const line of lines) {
+        const event = parseTelemetryLine(line);
+        if (event) {
+          handleTelemetryEvent(event, telemetry, job);
+        } else if (line.trim()) {
+          textLines.push(line.trim());
+        }
+      }
+      if (textLines.length > 0) {
+        scraperLogger.info(`Scraper stdout: ${textLines.join('\n')}`);
+      }
+
+      // Fall back to output patterns when the scraper runs without telemetry
+      if (!telemetry.totalQueries && output.includes('Processing Query:') && job.progress) {
         job.progress(Math.min(job.progress() + 5, 75));
       }
     });
@@ -430,31 +485,120 @@ async function executePythonScraper(job) {
       scraperLogger.warn(`Scraper stderr: ${error.trim()}`);
     });
 
+    // Backstop for a scraper that overruns its own deadline
+    let stopSignal = null;
+    const stopTimer = setTimeout(() => {
+      stopSignal = 'SIGTERM';
+      scraperLogger.warn(`Scraper still running ${STOP_GRACE_MS / 1000}s past its ${deadlineSeconds}s deadline; sending SIGTERM`);
+      pythonProcess.kill('SIGTERM');
+    }, deadlineSeconds * 1000 + STOP_GRACE_MS);
+    const killTimer = setTimeout(() => {
+      stopSignal = 'SIGKILL';
+      scraperLogger.error('Scraper did not exit after SIGTERM; killing it');
+      pythonProcess.kill('SIGKILL');
+    }, deadlineSeconds * 1000 + 2 * STOP_GRACE_MS);
+
     pythonProcess.on('close', (code) => {
+      clearTimeout(stopTimer);
+      clearTimeout(killTimer);
+      const trailingEvent = parseTelemetryLine(lineBuffer);
+      if (trailingEvent) {
+        handleTelemetryEvent(trailingEvent, telemetry, job);
+      }
+      // After SIGTERM a clean exit (code 0) means the leads collected so far were written
       if (code === 0) {
         scraperLogger.info('✅ Python scraper completed successfully');
-        resolve({ stdout, stderr, exitCode: code });
+        resolve({ stdout, stderr, exitCode: code, telemetry });
       } else {
-        scraperLogger.error(`❌ Python scraper exited with code ${code}`, { stderr });
-        reject(new Error(`Scraper failed with exit code ${code}: ${stderr}`));
+        scraperLogger.error(`❌ Python scraper exited with code ${code}`, { stderr, stopSignal });
+        reject(new Error(stopSignal
+          ? `Scraper exceeded its ${deadlineSeconds}s deadline and was stopped with ${stopSignal}`
+          : `Scraper failed with exit code ${code}: ${stderr}`));
       }
     });
 
     pythonProcess.on('error', (error) => {
+      clearTimeout(stopTimer);
+      clearTimeout(killTimer);
       scraperLogger.error('❌ Failed to start Python scraper', { error: error.message });
       reject(new Error(`Failed to start scraper: ${error.message}`));
     });
-
-    // Set timeout for scraper execution (30 minutes)
-    /*
-    setTimeout(() => {
-      pythonProcess.kill('SIGTERM');
-      reject(new Error('Scraper execution timed out after 30 minutes'));
-    }, 30 * 60 * 1000);
-    */
   });
 }
 
+// Parse a JSON telemetry line from maintemp.py (tolerates a print() interleaved before the JSON)
+function parseTelemetryLine(line) {
+  if (!line) {
+    return null;
+  }
+  const start = line.indexOf('{"event"');
+  if (start === -1) {
+    return null;
+  }
+  try {
+    return JSON.parse(line.slice(start));
+  } catch (error) {
+    return null;
+  }
+}
+
+// Track scraper telemetry and map finished queries onto the 20-70% progress band
+function handleTelemetryEvent(event, telemetry, job) {
+  switch (event.event) {
+    case 'run_start':
+      telemetry.totalQueries = event.queries || 0;
+      break;
+    case 'lead':
+      if (event.status === 'ok') {
+        telemetry.leadsScraped += 1;
+      } else {
+        telemetry.leadsFailed += 1;
+        scraperLogger.warn(`Lead failed for query "${event.query}": ${event.error} ${event.message || ''}`.trim(), { timings: event.timings });
+      }
+      break;
+    case 'query_done':
+      telemetry.queriesDone += 1;
+      scraperLogger.info(`Query done (${telemetry.queriesDone}/${telemetry.totalQueries || '?'}): "${event.query}"`, {
+        status: event.status,
+        leads: event.leads,
+        error: event.error,
+        timings: event.timings
+      });
+      if (telemetry.totalQueries && job.progress) {
+        job.progress(20 + Math.round(50 * Math.min(telemetry.queriesDone / telemetry.totalQueries, 1)));
+      }
+      break;
+    case 'throttle':
+      telemetry.throttleEvents = (telemetry.throttleEvents || 0) + 1;
+      scraperLogger.warn(`Maps throttling detected (${event.reason}); all workers paused for ${event.pause_s}s, pacing ${event.rate_per_min}/min`);
+      break;
+    case 'reaped':
+      telemetry.browsersReaped = (telemetry.browsersReaped || 0) + 1;
+      scraperLogger.warn(`Scraper watchdog reaped browser processes (${event.reason})${event.query ? ` for "${event.query}"` : ''}`, { pids: event.pids, rssMb: event.rss_mb, elapsedS: event.elapsed_s });
+      break;
+    case 'deadline':
+      telemetry.deadline = { reason: event.stop_reason || 'time', running: event.running, pending: event.pending };
+      scraperLogger.warn(`⏱️ Scraper deadline reached (${telemetry.deadline.reason}): no new queries, ${event.running} running queries writing their leads`);
+      break;
+    case 'deadline_summary':
+      telemetry.deadlineSummary = { skipped: event.skipped, limited: event.limited, cutShort: event.cut_short, stopReason: event.stop_reason };
+      break;
+    case 'lead_stored':
+      telemetry.streamedLeads.push(event.lead);
+      break;
+    case 'stream_summary':
+      telemetry.stream = { received: event.received, kept: event.kept, stored: event.stored, failedBatches: event.failed_batches };
+      scraperLogger.info(`🌊 Lead stream: ${event.kept} of ${event.received} scraped leads kept, ${event.stored} stored`);
+      break;
+    case 'run_summary':
+      telemetry.summary = event;
+      scraperLogger.info('📈 Scraper timing summary', { counters: event.counters, stages: event.stages });
+      break;
+    default:
+      break;
+  }
+}
+
 async function processScrapedData(jobId) {
   let csvFile;
   if (process.env.LEADS_APART_FILE) {
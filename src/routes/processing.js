@@ -19,7 +19,8 @@ const findleadsJobSchema = Joi.object({
   zipCodes: Joi.array().items(Joi.string()).min(1).required(),
   states: Joi.array().items(Joi.string()).optional(),
   outputFile: Joi.string().optional(),
-  clientName: Joi.string().optional()
+  clientName: Joi.string().optional(),
+  delta: Joi.boolean().optional()
 });
 
 // Start formatting job
@@ -79,7 +80,7 @@ router.post('/findleads', async (req, res) => {
       });
     }
 
-    const { businessTypes, zipCodes, states, outputFile, clientName } = value;
+    const { businessTypes, zipCodes, states, outputFile, clientName, delta } = value;
     const jobId = uuidv4();
 
     // Generate output file name if not provided
@@ -93,7 +94,8 @@ router.post('/findleads', async (req, res) => {
       zipCodes,
       states,
       outputFile: finalOutputFile,
-      clientName
+      clientName,
+      delta
     });
 
     logger.info(`Started findleads job ${jobId}`, { 
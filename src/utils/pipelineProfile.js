@@ -0,0 +1,44 @@
+const fs = require('fs').promises;
+const path = require('path');
+
+// Python batch scripts write a per-stage time/rows/memory report when given --profile <path>.
+// Enabled with PIPELINE_PROFILE=1; the report is stored in processing_jobs.results.profile.
+
+function profileEnabled() {
+  return process.env.PIPELINE_PROFILE === '1';
+}
+
+function profileReportPath(jobId, script) {
+  const dir = process.env.PIPELINE_PROFILE_DIR || './Outputs/profiles';
+  return path.join(dir, `${jobId}_${script}.json`);
+}
+
+// ['--profile', reportPath] (plus '--cprofile' when PIPELINE_CPROFILE=1), or [] when profiling is off
+function profileArgs(reportPath) {
+  if (!profileEnabled()) {
+    return [];
+  }
+  const args = ['--profile', reportPath];
+  if (process.env.PIPELINE_CPROFILE === '1') {
+    args.push('--cprofile', reportPath.replace(/\.json$/, '.prof'));
+  }
+  return args;
+}
+
+async function readProfileReport(reportPath) {
+  if (!profileEnabled()) {
+    return null;
+  }
+  try {
+    return JSON.parse(await fs.readFile(reportPath, 'utf8'));
+  } catch (error) {
+    return null;
+  }
+}
+
+module.exports = {
+  profileEnabled,
+  profileReportPath,
+  profileArgs,
+  readProfileReport
+};
@@ -0,0 +1,310 @@
+import abc
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# =================== CONFIGURATION =================== #
+
+DEFAULT_WORK_QUEUE = "./Outputs/work_queue.sqlite3"
+DEFAULT_BATCH = "default"
+DEFAULT_LEASE_S = 120.0         # A lease not renewed for this long is handed to another worker
+HEARTBEAT_FRACTION = 1 / 3      # Leases are renewed every lease_s * this
+DEFAULT_MAX_ATTEMPTS = 3        # Leases (including expired ones) before a query is given up as failed
+POLL_INTERVAL_S = 5.0           # How often an idle host checks for expired leases to take over
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    batch TEXT NOT NULL,
+    item TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    result TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch, item)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_work_items_state ON work_items (batch, state, position);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Lease:
+    __slots__ = ("item", "token", "attempts", "worker")
+
+    def __init__(self, item, token, attempts, worker):
+        self.item = item
+        self.token = token
+        self.attempts = attempts
+        self.worker = worker
+
+# =================== BACKENDS =================== #
+
+class WorkQueue(abc.ABC):
+    """
+    A batch of queries shared by any number of scraper hosts. Workers lease one query at a time, renew the
+    lease while they scrape it and acknowledge it when done; a lease that is not renewed in time (the host
+    died or hung) expires and the query goes back to the queue for someone else. Backends implement:
+
+    enqueue(items) -> int          add items not already in the batch (in order); returns how many were new
+    lease(worker) -> Lease | None  next queued item (expired leases are re-queued first)
+    heartbeat(lease) -> bool       extend the lease; False when it expired and was taken over
+    ack(lease, result) -> bool     item finished; False when the lease was no longer ours
+    release(lease, result) -> bool give the item back for another attempt (failed after max_attempts)
+    outstanding() -> int           items queued or leased (0 = the batch is drained)
+    counts() -> dict               items per state
+    """
+
+    def __init__(self, batch=DEFAULT_BATCH, lease_s=DEFAULT_LEASE_S, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.batch = batch
+        self.lease_s = lease_s
+        self.max_attempts = max(1, max_attempts)
+
+    @abc.abstractmethod
+    def enqueue(self, items):
+        ...
+
+    @abc.abstractmethod
+    def lease(self, worker):
+        ...
+
+    @abc.abstractmethod
+    def heartbeat(self, lease):
+        ...
+
+    @abc.abstractmethod
+    def ack(self, lease, result="ok"):
+        ...
+
+    @abc.abstractmethod
+    def release(self, lease, result=None):
+        ...
+
+    @abc.abstractmethod
+    def outstanding(self):
+        ...
+
+    @abc.abstractmethod
+    def counts(self):
+        ...
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue in a SQLite file, for scraper processes on one machine or hosts sharing the file on storage
+    with working file locks. Every state change is one IMMEDIATE transaction, so two workers never lease
+    the same item. ':memory:' works for tests (one process only). Expiry uses wall-clock time, so
+    hosts sharing a file need roughly synchronised clocks (well inside lease_s).
+    """
+
+    def __init__(self, path=DEFAULT_WORK_QUEUE, batch=DEFAULT_BATCH, lease_s=DEFAULT_LEASE_S,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        super().__init__(batch, lease_s, max_attempts)
+        self.path = path
+        self.clock = clock
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript(SCHEMA)
+        self.stats = {"expired": 0, "lost": 0}
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, work):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, items):
+        now = self.clock()
+
+        def work(conn):
+            start = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM work_items WHERE batch = ?",
+                                 (self.batch,)).fetchone()[0]
+            added = 0
+            for offset, item in enumerate(items):
+                added += conn.execute(
+                    "INSERT OR IGNORE INTO work_items (batch, item, position, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.batch, item, start + offset, QUEUED, now)).rowcount
+            return added
+        return self._transaction(work)
+
+    def _expire(self, conn, now):
+        """Leases past their deadline go back to the queue (or fail once they have used every attempt)."""
+        expired = conn.execute(
+            "UPDATE work_items SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "result = CASE WHEN attempts >= ? THEN 'lease_expired' ELSE result END, "
+            "worker = NULL, lease_token = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE batch = ? AND state = ? AND lease_expires < ?",
+            (self.max_attempts, FAILED, QUEUED, self.max_attempts, now, self.batch, LEASED, now)).rowcount
+        if expired:
+            self.stats["expired"] += expired
+            logging.warning(f"Work queue '{self.batch}': {expired} expired leases taken back")
+        return expired
+
+    def lease(self, worker):
+        now = self.clock()
+
+        def work(conn):
+            self._expire(conn, now)
+            row = conn.execute("SELECT item, attempts FROM work_items WHERE batch = ? AND state = ? "
+                               "ORDER BY position LIMIT 1", (self.batch, QUEUED)).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute("UPDATE work_items SET state = ?, attempts = attempts + 1, worker = ?, lease_token = ?, "
+                         "lease_expires = ?, updated_at = ? WHERE batch = ? AND item = ?",
+                         (LEASED, worker, token, now + self.lease_s, now, self.batch, row[0]))
+            return Lease(row[0], token, row[1] + 1, worker)
+        return self._transaction(work)
+
+    def _update_own(self, lease, assignments, values):
+        """Applies an update only while the lease is still ours (same token, still leased)."""
+        def work(conn):
+            updated = conn.execute(
+                f"UPDATE work_items SET {assignments}, updated_at = ? "
+                "WHERE batch = ? AND item = ? AND state = ? AND lease_token = ?",
+                (*values, self.clock(), self.batch, lease.item, LEASED, lease.token)).rowcount
+            if not updated:
+                self.stats["lost"] += 1
+            return bool(updated)
+        return self._transaction(work)
+
+    def heartbeat(self, lease):
+        return self._update_own(lease, "lease_expires = ?", (self.clock() + self.lease_s,))
+
+    def ack(self, lease, result="ok"):
+        return self._update_own(lease, "state = ?, result = ?, worker = NULL, lease_token = NULL, lease_expires = NULL",
+                                (DONE, result))
+
+    def release(self, lease, result=None):
+        state = FAILED if lease.attempts >= self.max_attempts else QUEUED
+        return self._update_own(lease, "state = ?, result = ?, worker = NULL, lease_token = NULL, lease_expires = NULL",
+                                (state, result))
+
+    def outstanding(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM work_items WHERE batch = ? AND state IN (?, ?)",
+                                     (self.batch, QUEUED, LEASED)).fetchone()[0]
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM work_items WHERE batch = ? GROUP BY state",
+                                     (self.batch,)).fetchall()
+        counts = {state: 0 for state in (QUEUED, LEASED, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def reset(self, include_done=False):
+        """Puts failed (and with include_done, finished) items back in the queue with fresh attempts."""
+        states = (FAILED, DONE) if include_done else (FAILED,)
+
+        def work(conn):
+            return conn.execute(
+                f"UPDATE work_items SET state = ?, attempts = 0, result = NULL, updated_at = ? "
+                f"WHERE batch = ? AND state IN ({', '.join('?' for _ in states)})",
+                (QUEUED, self.clock(), self.batch, *states)).rowcount
+        return self._transaction(work)
+
+
+# "sqlite:<path>" or a plain path; further backends (Redis, a Postgres table) register here
+BACKENDS = {"sqlite": SQLiteWorkQueue}
+
+
+def open_work_queue(url, batch=DEFAULT_BATCH, **options):
+    scheme, sep, location = url.partition(":")
+    if sep and scheme in BACKENDS:
+        return BACKENDS[scheme](location, batch=batch, **options)
+    return SQLiteWorkQueue(url, batch=batch, **options)
+
+# =================== HEARTBEATS =================== #
+
+class LeaseKeeper:
+    """Renews every lease this host holds from one background thread; reports leases taken over by others."""
+
+    def __init__(self, work_queue, on_lost=None):
+        self.work_queue = work_queue
+        self.on_lost = on_lost
+        self.leases = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def hold(self, lease):
+        with self.lock:
+            self.leases[lease.token] = lease
+
+    def drop(self, lease):
+        with self.lock:
+            self.leases.pop(lease.token, None)
+
+    def _run(self):
+        interval = max(1.0, self.work_queue.lease_s * HEARTBEAT_FRACTION)
+        while not self.stop_event.wait(interval):
+            with self.lock:
+                leases = list(self.leases.values())
+            for lease in leases:
+                try:
+                    renewed = self.work_queue.heartbeat(lease)
+                except sqlite3.Error as e:
+                    # A busy or briefly unreachable store: try again next round, the lease has slack
+                    logging.warning(f"Lease heartbeat failed for {lease.item}: {e}")
+                    continue
+                if not renewed:
+                    self.drop(lease)
+                    if self.on_lost:
+                        self.on_lost(lease)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Inspect, seed or reset a shared scraper work queue.")
+    parser.add_argument("batch")
+    parser.add_argument("--work_queue", default=DEFAULT_WORK_QUEUE, help="Queue location ('sqlite:<path>' or a path)")
+    parser.add_argument("--enqueue", default=None, help="Queries file to add to the batch (one query per line)")
+    parser.add_argument("--reset", action="store_true", help="Re-queue the batch's failed queries")
+    args = parser.parse_args()
+    work_queue = open_work_queue(args.work_queue, args.batch)
+    if args.enqueue:
+        with open(args.enqueue, mode='r', encoding='utf-8') as file:
+            added = work_queue.enqueue([line.strip() for line in file if line.strip()])
+        logging.info(f"Added {added} queries to batch '{args.batch}'")
+    if args.reset:
+        logging.info(f"Re-queued {work_queue.reset()} failed queries")
+    print(json.dumps(work_queue.counts(), indent=2))
+    work_queue.close()